@@ -1,23 +1,58 @@
 import asyncio
+import bisect
 import collections
 import contextlib
+import csv
+import ctypes
+import ctypes.util
+import glob
 import hashlib
+import heapq
+import importlib.util
+import io
+import itertools
 import logging
 import os
 import platform
+import random
 import re
 import shutil
 import signal
+import sqlite3
+import struct
 import subprocess
 import sys
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import fields as dataclass_fields
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+from urllib.parse import parse_qs, urljoin, urlparse, urlunparse
 
 import aiofiles
 import aiohttp
 import orjson
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 if platform.system() != "Windows":
     import uvloop
 
@@ -35,14 +70,109 @@ from rich.text import Text
 BASE_DIR = Path(__file__).resolve().parent
 CONFIG_FILE_PATH = BASE_DIR / "config.json"
 LOG_FILE_PATH = BASE_DIR / "log.log"
+LIVE_HISTORY_FILE_PATH = BASE_DIR / "live_history.json"
+COORDINATION_DB_FILE_PATH = BASE_DIR / "coordination.db"
+ENCODER_PROBE_CACHE_FILE_PATH = BASE_DIR / "encoder_probe_cache.json"
+TRANSCODE_QUEUE_DB_FILE_PATH = BASE_DIR / "transcode_queue.db"
 
 DEFAULT_RESCAN_INTERVAL_SECONDS = 60
 MIN_RESCAN_INTERVAL_SECONDS = 1
 MAX_RESCAN_INTERVAL_SECONDS = 3600
 DEFAULT_OUTPUT_FORMAT = "ts"
 SUPPORTED_OUTPUT_FORMATS = {"ts", "mkv", "webm"}
+DEFAULT_PIPE_MODE = "relay"
+SUPPORTED_PIPE_MODES = {"relay", "direct"}
+DIRECT_PIPE_BUFFER_BYTES = 1024 * 1024
+DEFAULT_RECORDING_BACKEND = "subprocess"
+SUPPORTED_RECORDING_BACKENDS = {"subprocess", "library", "native"}
+# Concurrent encode sessions per hardware encoder family
+DEFAULT_HARDWARE_SESSION_LIMITS = {
+    "nvenc": 8,
+    "qsv": 8,
+    "amf": 4,
+    "vaapi": 8,
+    "videotoolbox": 4,
+}
+SUPPORTED_HARDWARE_SESSION_FALLBACKS = {"software", "copy"}
+# libx265 presets from slowest to fastest; QSV uses veryslow..veryfast
+X265_PRESETS = (
+    "placebo",
+    "veryslow",
+    "slower",
+    "slow",
+    "medium",
+    "fast",
+    "faster",
+    "veryfast",
+    "superfast",
+    "ultrafast",
+)
+STREAMLINK_LIBRARY_THREADS = 32
+HLS_SEGMENT_RETRIES = 3
+HLS_PLAYLIST_MAX_FAILURES = 5
+HLS_PLAYLIST_RELOAD_MIN_SECONDS = 0.5
+HLS_TOKEN_REFRESH_BEFORE_SECONDS = 3 * 60 * 60
+# Segment fetch time relative to segment duration that moves the thread count
+SEGMENT_TUNING_RAISE_LOAD = 0.6
+SEGMENT_TUNING_LOWER_LOAD = 0.2
+SEGMENT_TUNING_SAMPLES = 6
+SEGMENT_TUNING_SMOOTHING = 0.3
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+TS_SNIFF_PACKETS = 4
+TS_TABLE_RESEND_PACKETS = 4096
 FFMPEG_FINALIZE_TIMEOUT_SECONDS = 60
 RECORDING_SHUTDOWN_TIMEOUT_SECONDS = 90
+MAX_RECORDING_WORKERS = 64
+WORKER_ENV_VAR = "CHZZK_REKODA_WORKER"
+WORKER_HASH_REPLICAS = 64
+WORKER_EVENT_INTERVAL_SECONDS = 0.5
+WORKER_EVENT_LINE_LIMIT = 4 * 1024 * 1024
+WORKER_RESTART_DELAY_SECONDS = 5
+WORKER_SHUTDOWN_TIMEOUT_SECONDS = (
+    RECORDING_SHUTDOWN_TIMEOUT_SECONDS + FFMPEG_FINALIZE_TIMEOUT_SECONDS
+)
+COORDINATION_NODE_EXPIRY_LEASES = 10
+WARM_POOL_REFRESH_SECONDS = 15
+RECONNECT_BASE_DELAY_SECONDS = 1
+RECONNECT_MAX_DELAY_SECONDS = 10
+# Settings a reconnect can pick up without restarting ffmpeg
+RECONNECT_SOURCE_FIELDS = {
+    "cookies",
+    "stream_segment_threads",
+    "segment_thread_tuning",
+    "recording_backend",
+}
+WARM_FFMPEG_MAX_AGE_SECONDS = 10 * 60
+WARM_OUTPUT_POLL_SECONDS = 0.2
+TRANSCODE_POLL_SECONDS = 60
+TRANSCODE_HEARTBEAT_SECONDS = 30
+# A running job whose process stopped heartbeating goes back to the queue
+TRANSCODE_STALE_SECONDS = 5 * 60
+TRANSCODE_MAX_ATTEMPTS = 3
+# Imports streamlink up front, then runs the CLI once the argv line arrives on stdin.
+STREAMLINK_WARM_BOOTSTRAP = (
+    "import json, sys\n"
+    "from streamlink_cli.main import main\n"
+    "sys.argv = json.loads(sys.stdin.readline())\n"
+    "sys.exit(main())\n"
+)
+COORDINATION_LIVE_RETENTION_SECONDS = 30 * 24 * 3600
+LIVE_STATUS_POLL_CONCURRENCY = 8
+CONFIG_POLL_INTERVAL_SECONDS = 2
+CONFIG_WATCH_FALLBACK_SECONDS = 60
+API_REQUESTS_PER_SECOND = 10
+API_REQUEST_BURST = 20
+API_MAX_RETRIES = 3
+API_RETRY_BASE_DELAY_SECONDS = 0.5
+API_RETRY_MAX_DELAY_SECONDS = 30
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+LIVE_DETAIL_CACHE_TTL_SECONDS = 3
+LIVE_HISTORY_MAX_EVENTS = 60
+LIVE_HISTORY_RECENT_DAYS = 60
+ADAPTIVE_POLL_MIN_MATCHES = 2
+ADAPTIVE_POLL_ACTIVE_DAYS = 3
+ADAPTIVE_POLL_BACKOFF_STEP = 30
 
 # Global console instance for Rich
 console = Console()
@@ -51,6 +181,9 @@ console = Console()
 channel_progress: Dict[str, Dict[str, Any]] = {}
 channel_progress_lock = asyncio.Lock()
 
+# Files waiting in or running through background post-processing, by stage
+post_processing_depth: Dict[str, int] = {}
+
 # Create a queue for log messages
 log_queue: asyncio.Queue = asyncio.Queue()
 
@@ -185,6 +318,26 @@ KNOWN_AV1_ENCODERS = {
 }
 AV1_SOFTWARE_FALLBACK_ENCODERS = ("libsvtav1", "libaom-av1")
 AV1_ENCODER_PROBE_CACHE: Dict[Tuple[str, str, str, str, str], Tuple[bool, str]] = {}
+ENCODER_PROBE_TIMEOUT_SECONDS = 15
+ENCODER_PROBE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Hardware encoders also fail while sessions are used up or the GPU is busy,
+# so a failed probe is only trusted for a few minutes.
+ENCODER_PROBE_FAILURE_TTL_SECONDS = 10 * 60
+VAAPI_RENDER_NODE = "renderD128"
+# Hardware encoders that can't work unless ffmpeg also lists the matching hwaccel
+ENCODER_REQUIRED_HWACCELS = {
+    "hevc_vaapi": "vaapi",
+    "av1_vaapi": "vaapi",
+    "hevc_qsv": "qsv",
+    "av1_qsv": "qsv",
+    "hevc_videotoolbox": "videotoolbox",
+}
+OUTPUT_FORMAT_MUXERS = {"ts": "mpegts", "mkv": "matroska", "webm": "webm"}
+SEGMENT_LIST_POLL_SECONDS = 2
+REMUX_FORMAT_MUXERS = {"mp4": "mp4", "mkv": "matroska"}
+FFMPEG_DURATION_PATTERN = re.compile(r"Duration: (\d+:\d+:\d+\.\d+)")
+# Probes currently running, keyed by their command line, so callers share one ffmpeg
+encoder_probe_tasks: Dict[Tuple[str, ...], asyncio.Task] = {}
 PLUGIN_DIR_PATH = BASE_DIR / "plugin"
 
 # Max filename length constants
@@ -263,6 +416,16 @@ def normalize_output_format(value: Any) -> str:
     return text if text in SUPPORTED_OUTPUT_FORMATS else DEFAULT_OUTPUT_FORMAT
 
 
+def normalize_pipe_mode(value: Any) -> str:
+    text = str(value or DEFAULT_PIPE_MODE).strip().lower()
+    return text if text in SUPPORTED_PIPE_MODES else DEFAULT_PIPE_MODE
+
+
+def normalize_recording_backend(value: Any) -> str:
+    text = str(value or DEFAULT_RECORDING_BACKEND).strip().lower()
+    return text if text in SUPPORTED_RECORDING_BACKENDS else DEFAULT_RECORDING_BACKEND
+
+
 def normalize_hevc_settings(value: Any) -> Dict[str, Any]:
     defaults = {
         "enable": False,
@@ -317,6 +480,320 @@ def normalize_av1_settings(value: Any) -> Dict[str, Any]:
     return settings
 
 
+def normalize_ts_passthrough_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "resend_tables": True, "fix_continuity": True}
+    if not isinstance(value, dict):
+        return defaults
+    return {key: bool(value.get(key, default)) for key, default in defaults.items()}
+
+
+def normalize_spool_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "memory_mb": 64, "disk_mb": 1024, "directory": ""}
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["memory_mb"] = clamp_int(
+        settings.get("memory_mb"), default=defaults["memory_mb"], min_value=1, max_value=4096
+    )
+    settings["disk_mb"] = clamp_int(
+        settings.get("disk_mb"), default=defaults["disk_mb"], min_value=0, max_value=1024 * 1024
+    )
+    settings["directory"] = CONTROL_CHARS_REMOVER.sub(
+        "", str(settings.get("directory") or "")
+    ).strip()
+    return settings
+
+
+def normalize_warm_pool_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "max_ffmpeg": 4, "streamlink_spares": 1}
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["max_ffmpeg"] = clamp_int(
+        settings.get("max_ffmpeg"), default=defaults["max_ffmpeg"], min_value=0, max_value=64
+    )
+    settings["streamlink_spares"] = clamp_int(
+        settings.get("streamlink_spares"),
+        default=defaults["streamlink_spares"],
+        min_value=0,
+        max_value=16,
+    )
+    return settings
+
+
+def normalize_reconnect_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "window_seconds": 60}
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["window_seconds"] = clamp_int(
+        settings.get("window_seconds"),
+        default=defaults["window_seconds"],
+        min_value=1,
+        max_value=3600,
+    )
+    return settings
+
+
+def normalize_preset_governor_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "min_speed": 0.95,
+        "window_seconds": 60,
+        "allow_copy": True,
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    try:
+        min_speed = float(settings.get("min_speed"))
+    except (TypeError, ValueError):
+        min_speed = defaults["min_speed"]
+    settings["min_speed"] = min(max(min_speed, 0.5), 1.0)
+    settings["window_seconds"] = clamp_int(
+        settings.get("window_seconds"),
+        default=defaults["window_seconds"],
+        min_value=10,
+        max_value=3600,
+    )
+    settings["allow_copy"] = bool(settings.get("allow_copy", True))
+    return settings
+
+
+def normalize_clock_time(value: Any) -> str:
+    """Normalize an "HH:MM" setting; anything else becomes "" (no limit)."""
+    hours, _, minutes = str(value or "").strip().partition(":")
+    if not hours.isdigit() or not minutes.isdigit():
+        return ""
+    if int(hours) > 23 or int(minutes) > 59:
+        return ""
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def normalize_remux_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "format": "mp4",
+        "workers": 1,
+        "niceness": 10,
+        "delete_source": False,
+        "duration_tolerance_seconds": 2,
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    remux_format = str(settings.get("format") or "").strip().lower().lstrip(".")
+    settings["format"] = remux_format if remux_format in REMUX_FORMAT_MUXERS else "mp4"
+    settings["workers"] = clamp_int(
+        settings.get("workers"), default=defaults["workers"], min_value=1, max_value=16
+    )
+    settings["niceness"] = clamp_int(
+        settings.get("niceness"), default=defaults["niceness"], min_value=0, max_value=19
+    )
+    settings["delete_source"] = bool(settings.get("delete_source", False))
+    settings["duration_tolerance_seconds"] = clamp_int(
+        settings.get("duration_tolerance_seconds"),
+        default=defaults["duration_tolerance_seconds"],
+        min_value=0,
+        max_value=600,
+    )
+    return settings
+
+
+def normalize_segmentation_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "segment_seconds": 3600, "max_size_mb": 0}
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["segment_seconds"] = clamp_int(
+        settings.get("segment_seconds"),
+        default=defaults["segment_seconds"],
+        min_value=60,
+        max_value=24 * 3600,
+    )
+    settings["max_size_mb"] = clamp_int(
+        settings.get("max_size_mb"), default=0, min_value=0, max_value=1024 * 1024
+    )
+    return settings
+
+
+def normalize_rendition_settings(value: Any) -> Dict[str, Any]:
+    """Normalize one transcoded output recorded next to the copy archive."""
+    defaults = {
+        "name": "proxy",
+        "codec": "hevc",
+        "format": "mkv",
+        "height": 480,
+        "bitrate": "800k",
+        "max_bitrate": "1200k",
+        "preset": "",
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["name"] = sanitize_filename_component(settings.get("name"), fallback="proxy")
+    codec = str(settings.get("codec") or "").strip().lower()
+    settings["codec"] = codec if codec in {"hevc", "av1"} else "hevc"
+    settings["height"] = clamp_int(
+        settings.get("height"), default=defaults["height"], min_value=0, max_value=4320
+    )
+    encoder_settings = {
+        key: settings[key]
+        for key in ("encoder", "bitrate", "max_bitrate", "preset")
+        if settings.get(key)
+    }
+    encoder_settings["enable"] = True
+    if settings["codec"] == "av1":
+        settings.update(normalize_av1_settings(encoder_settings))
+        settings["format"] = recording_format_for(settings.get("format"), settings)
+    else:
+        settings.update(normalize_hevc_settings(encoder_settings))
+        recording_format = normalize_output_format(settings.get("format"))
+        # WebM can't hold HEVC.
+        settings["format"] = "mkv" if recording_format == "webm" else recording_format
+    return settings
+
+
+def normalize_multi_output_settings(value: Any) -> Dict[str, Any]:
+    settings = {"enable": False, "renditions": [{}]}
+    if isinstance(value, dict):
+        settings |= value
+    settings["enable"] = bool(settings.get("enable", False))
+    renditions = settings.get("renditions")
+    if not isinstance(renditions, list):
+        renditions = [{}]
+    normalized = {}
+    for rendition in renditions:
+        rendition = normalize_rendition_settings(rendition)
+        # Renditions share the archive's file name, so the names must differ.
+        normalized.setdefault(rendition["name"].lower(), MappingProxyType(rendition))
+    settings["renditions"] = tuple(normalized.values())
+    return settings
+
+
+def normalize_deferred_transcode_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "concurrency": 1,
+        "niceness": 10,
+        "start_time": "",
+        "end_time": "",
+        "keep_source": False,
+        "database": "",
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["concurrency"] = clamp_int(
+        settings.get("concurrency"),
+        default=defaults["concurrency"],
+        min_value=1,
+        max_value=16,
+    )
+    settings["niceness"] = clamp_int(
+        settings.get("niceness"),
+        default=defaults["niceness"],
+        min_value=0,
+        max_value=19,
+    )
+    settings["start_time"] = normalize_clock_time(settings.get("start_time"))
+    settings["end_time"] = normalize_clock_time(settings.get("end_time"))
+    settings["keep_source"] = bool(settings.get("keep_source", False))
+    settings["database"] = CONTROL_CHARS_REMOVER.sub(
+        "", str(settings.get("database") or "")
+    ).strip()
+    return settings
+
+
+def normalize_hardware_session_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "fallback": "software",
+        "max_sessions": DEFAULT_HARDWARE_SESSION_LIMITS,
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    fallback = str(settings.get("fallback") or "").strip().lower()
+    settings["fallback"] = (
+        fallback if fallback in SUPPORTED_HARDWARE_SESSION_FALLBACKS else "software"
+    )
+    raw_limits = settings.get("max_sessions")
+    raw_limits = raw_limits if isinstance(raw_limits, dict) else {}
+    settings["max_sessions"] = {
+        family: clamp_int(
+            raw_limits.get(family), default=default, min_value=1, max_value=64
+        )
+        for family, default in DEFAULT_HARDWARE_SESSION_LIMITS.items()
+    }
+    return settings
+
+
+def normalize_segment_thread_tuning_settings(value: Any) -> Dict[str, Any]:
+    defaults = {"enable": False, "min_threads": 1, "max_threads": 8}
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["min_threads"] = clamp_int(
+        settings.get("min_threads"),
+        default=defaults["min_threads"],
+        min_value=1,
+        max_value=16,
+    )
+    settings["max_threads"] = clamp_int(
+        settings.get("max_threads"),
+        default=defaults["max_threads"],
+        min_value=settings["min_threads"],
+        max_value=16,
+    )
+    return settings
+
+
+def normalize_coordination_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "database": "",
+        "node_id": "",
+        "lease_seconds": 30,
+    }
+    settings = defaults | value if isinstance(value, dict) else dict(defaults)
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["database"] = CONTROL_CHARS_REMOVER.sub(
+        "", str(settings.get("database") or "")
+    ).strip()
+    node_id = CONTROL_CHARS_REMOVER.sub("", str(settings.get("node_id") or "")).strip()
+    settings["node_id"] = node_id or platform.node() or "recorder"
+    settings["lease_seconds"] = clamp_int(
+        settings.get("lease_seconds"),
+        default=defaults["lease_seconds"],
+        min_value=5,
+        max_value=600,
+    )
+    return settings
+
+
+def normalize_adaptive_polling_settings(value: Any) -> Dict[str, Any]:
+    defaults = {
+        "enable": False,
+        "fast_interval": 5,
+        "max_interval": 600,
+        "window_minutes": 30,
+    }
+    if not isinstance(value, dict):
+        return defaults
+
+    settings = defaults | value
+    settings["enable"] = bool(settings.get("enable", False))
+    settings["fast_interval"] = clamp_int(
+        settings.get("fast_interval"),
+        default=defaults["fast_interval"],
+        min_value=MIN_RESCAN_INTERVAL_SECONDS,
+        max_value=MAX_RESCAN_INTERVAL_SECONDS,
+    )
+    settings["max_interval"] = clamp_int(
+        settings.get("max_interval"),
+        default=defaults["max_interval"],
+        min_value=MIN_RESCAN_INTERVAL_SECONDS,
+        max_value=24 * 3600,
+    )
+    settings["window_minutes"] = clamp_int(
+        settings.get("window_minutes"),
+        default=defaults["window_minutes"],
+        min_value=1,
+        max_value=12 * 60,
+    )
+    return settings
+
+
 def normalize_channels(value: Any) -> List[Dict[str, Any]]:
     if not isinstance(value, list):
         return []
@@ -427,647 +904,3411 @@ async def wait_for_task_completion(
         return False
 
 
-class RecordingProcessSandbox:
-    def __init__(self, channel_name: str, channel_id: str) -> None:
-        self.channel_name = channel_name
-        self.channel_id = channel_id
-        self.stream_process: Optional[asyncio.subprocess.Process] = None
-        self.ffmpeg_process: Optional[asyncio.subprocess.Process] = None
-        self._tasks: List[asyncio.Task] = []
-        self._cancel_on_cleanup: List[asyncio.Task] = []
+async def wait_for_shutdown(timeout: float) -> bool:
+    """Sleep for timeout seconds; return True early if shutdown was requested."""
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(shutdown_event.wait(), timeout=timeout)
+    return shutdown_event.is_set()
 
-    async def start_streamlink(
-        self, command: List[str]
-    ) -> asyncio.subprocess.Process:
-        self.stream_process = await create_isolated_subprocess_exec(
-            *command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        return self.stream_process
 
-    async def start_ffmpeg(self, command: List[str]) -> asyncio.subprocess.Process:
-        self.ffmpeg_process = await create_isolated_subprocess_exec(
-            *command,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        return self.ffmpeg_process
+_streamlink_plugin_class: Any = None
+_streamlink_executor: Optional[ThreadPoolExecutor] = None
 
-    def create_task(
-        self, coro: Any, cancel_on_cleanup: bool = False
-    ) -> asyncio.Task:
-        task = asyncio.create_task(coro)
-        if cancel_on_cleanup:
-            self._cancel_on_cleanup.append(task)
-        else:
-            self._tasks.append(task)
-        return task
 
-    async def cleanup(self) -> None:
-        await terminate_process(
-            self.ffmpeg_process, f"ffmpeg [{self.channel_name}/{self.channel_id}]"
+def load_streamlink_plugin() -> Any:
+    """Import streamlink and the bundled Chzzk plugin once per process."""
+    global _streamlink_plugin_class
+    if _streamlink_plugin_class is None:
+        spec = importlib.util.spec_from_file_location(
+            "chzzk_rekoda_plugin", PLUGIN_DIR_PATH / "chzzk.py"
         )
-        await terminate_process(
-            self.stream_process, f"streamlink [{self.channel_name}/{self.channel_id}]"
+        if spec is None or spec.loader is None:
+            raise RuntimeError(f"Could not load the Chzzk plugin from {PLUGIN_DIR_PATH}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _streamlink_plugin_class = module.__plugin__
+    return _streamlink_plugin_class
+
+
+def streamlink_executor() -> ThreadPoolExecutor:
+    global _streamlink_executor
+    if _streamlink_executor is None:
+        _streamlink_executor = ThreadPoolExecutor(
+            max_workers=STREAMLINK_LIBRARY_THREADS,
+            thread_name_prefix="streamlink",
         )
-        for task in self._cancel_on_cleanup:
-            if not task.done():
-                task.cancel()
-        if self._cancel_on_cleanup:
-            await asyncio.gather(*self._cancel_on_cleanup, return_exceptions=True)
+    return _streamlink_executor
 
-        for task in self._tasks:
-            await drain_task(task)
-        self._tasks.clear()
-        self._cancel_on_cleanup.clear()
 
+def open_streamlink_library_stream(
+    url: str,
+    cookies: Mapping[str, str],
+    stream_segment_threads: int,
+    ffmpeg_path: Path,
+    handoff_path: Optional[Path],
+) -> Any:
+    from streamlink import Streamlink
+    from streamlink.options import Options
+
+    # Mirrors the options record_stream passes to the streamlink CLI.
+    session = Streamlink(
+        {
+            "hls-live-restart": True,
+            "hls-segment-stream-data": True,
+            "stream-segment-threads": stream_segment_threads,
+            "ffmpeg-ffmpeg": str(ffmpeg_path),
+            "ffmpeg-copyts": True,
+            "ffmpeg-start-at-zero": True,
+        },
+        plugins_builtin=False,
+    )
+    session.plugins.update({"chzzk": load_streamlink_plugin()})
+    session.http.headers.update(get_auth_headers(cookies))
+
+    plugin_options = Options()
+    if handoff_path is not None:
+        plugin_options.set("live-detail-file", str(handoff_path))
+    streams = session.streams(url, options=plugin_options)
+    stream = streams.get("best") if streams else None
+    if stream is None:
+        raise RuntimeError(f"No playable streams found on {url}")
+    return stream.open()
 
-async def pipe_stream_to_stdin(
-    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, channel_name: str
-) -> None:
-    try:
-        while not shutdown_event.is_set():
-            chunk = await reader.read(256 * 1024)
+
+class StreamlinkLibraryStream:
+    """Reads a stream through the streamlink API on the shared worker thread pool."""
+
+    def __init__(self, channel_name: str) -> None:
+        self.channel_name = channel_name
+        self.returncode: Optional[int] = None
+        self._stream_fd: Any = None
+        self._pending = b""
+
+    async def open(
+        self,
+        url: str,
+        cookies: Mapping[str, str],
+        stream_segment_threads: int,
+        ffmpeg_path: Path,
+        handoff_path: Optional[Path],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        self._stream_fd = await loop.run_in_executor(
+            streamlink_executor(),
+            open_streamlink_library_stream,
+            url,
+            cookies,
+            stream_segment_threads,
+            ffmpeg_path,
+            handoff_path,
+        )
+
+    async def peek(self, size: int) -> bytes:
+        """Read the first bytes of the stream; pump() writes them out first."""
+        loop = asyncio.get_running_loop()
+        while self._stream_fd is not None and len(self._pending) < size:
+            chunk = await loop.run_in_executor(
+                streamlink_executor(), self._stream_fd.read, size - len(self._pending)
+            )
             if not chunk:
                 break
-            writer.write(chunk)
-            await writer.drain()
-    except (BrokenPipeError, ConnectionResetError):
-        logger.debug(f"ffmpeg stdin closed while piping stream for {channel_name}.")
-    except Exception as e:
-        logger.error(f"Error piping stream to ffmpeg for {channel_name}: {e}")
-    finally:
-        if not writer.is_closing():
-            writer.close()
-            with contextlib.suppress(Exception):
-                await writer.wait_closed()
+            self._pending += chunk
+        return self._pending
 
+    async def pump(self, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        executor = streamlink_executor()
+        try:
+            if self._pending:
+                writer.write(self._pending)
+                self._pending = b""
+                await writer.drain()
+            while self._stream_fd is not None and not shutdown_event.is_set():
+                chunk = await loop.run_in_executor(
+                    executor, self._stream_fd.read, 256 * 1024
+                )
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+            self.returncode = 0
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"ffmpeg stdin closed while piping stream for {self.channel_name}.")
+            self.returncode = 0
+        except Exception as e:
+            logger.error(f"streamlink failed while reading {self.channel_name}: {e}")
+            self.returncode = 1
+        finally:
+            await self.close()
+            if not writer.is_closing():
+                writer.close()
+                with contextlib.suppress(Exception):
+                    await writer.wait_closed()
+
+    async def close(self) -> None:
+        stream_fd, self._stream_fd = self._stream_fd, None
+        if stream_fd is not None:
+            # Closing wakes a worker thread that is blocked in read().
+            await asyncio.get_running_loop().run_in_executor(
+                streamlink_executor(), stream_fd.close
+            )
 
-async def read_log_stream(
-    stream: Optional[asyncio.StreamReader], process_name: str, channel_id: str
-) -> None:
-    if stream is None:
-        return
 
-    while not stream.at_eof():
-        line = await stream.readline()
-        if not line:
-            break
-        line_str = line.decode(errors="replace").strip()
-        if not line_str:
-            continue
+HLS_ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+HLS_QUALITY_PATTERN = re.compile(r"\d+p(?:\d+)?")
+STREAMLINK_QUEUED_SEGMENT_PATTERN = re.compile(
+    r"Queuing HLSSegment\(num=(\d+),.*?duration=([\d.]+)"
+)
+STREAMLINK_SEGMENT_COMPLETE_PATTERN = re.compile(r"Segment (\d+) complete")
 
-        if process_name == "streamlink":
-            logger.info(f"{process_name} stderr [{channel_id}]: {line_str}")
-        else:
-            logger.debug(f"{process_name} stderr [{channel_id}]: {line_str}")
 
+@dataclass(frozen=True)
+class HLSSegment:
+    sequence: int
+    uri: str
+    duration: float
+    map_uri: Optional[str]
+    discontinuity: bool
 
-async def setup_paths() -> Optional[Path]:
-    os_name = platform.system()
 
-    if os_name == "Windows":
-        logger.info("Running on Windows.")
-        bundled_ffmpeg = BASE_DIR / "ffmpeg" / "bin" / "ffmpeg.exe"
-        if bundled_ffmpeg.exists():
-            logger.info(f"Using bundled ffmpeg at: {bundled_ffmpeg}")
-            return bundled_ffmpeg
+@dataclass(frozen=True)
+class HLSMediaPlaylist:
+    target_duration: float
+    segments: Tuple[HLSSegment, ...]
+    ended: bool
 
-        ffmpeg_on_path = shutil.which("ffmpeg")
-        if ffmpeg_on_path:
-            ffmpeg_path = Path(ffmpeg_on_path)
-            logger.info(f"Using ffmpeg from PATH at: {ffmpeg_path}")
-            return ffmpeg_path
 
-        logger.error("ffmpeg not found. Run install.bat or add ffmpeg to PATH.")
-    else:
-        ffmpeg_on_path = shutil.which("ffmpeg")
-        if ffmpeg_on_path:
-            ffmpeg_path = Path(ffmpeg_on_path)
-            logger.info(f"Running on {os_name}. ffmpeg found at: {ffmpeg_path}")
-            return ffmpeg_path
+def rewrite_chzzk_cdn_host(url: str) -> str:
+    parsed = urlparse(url)
+    if parsed.hostname == "livecloud.pstatic.net":
+        return urlunparse(parsed._replace(netloc="nlive-streaming.navercdn.com"))
+    return url
 
-        logger.error("ffmpeg not found on the system PATH.")
 
+def hls_playlist_quality(url: str) -> Optional[str]:
+    for part in urlparse(url).path.split("/"):
+        if HLS_QUALITY_PATTERN.fullmatch(part):
+            return part
     return None
 
 
-async def load_json_async(file_path: Path) -> Any:
-    if not file_path.exists():
-        return None
-    try:
-        async with aiofiles.open(file_path, "rb") as file:
-            content = await file.read()
-            return orjson.loads(content)
-    except orjson.JSONDecodeError as e:
-        logger.error(f"JSON decode error in {file_path}: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Error loading JSON from {file_path}: {e}")
-        return None
+def url_expire_time(url: str) -> Optional[int]:
+    exp_values = parse_qs(urlparse(url).query).get("exp")
+    if exp_values and exp_values[0].isdigit():
+        return int(exp_values[0])
+    return None
 
 
-async def load_config_async() -> Dict[str, Any]:
-    config = await load_json_async(CONFIG_FILE_PATH)
-    if not config:
-        return {}
-    return config
-
-
-async def load_settings() -> (
-    Tuple[
-        int,
-        int,
-        List[Dict[str, Any]],
-        Dict[str, int],
-        Dict[str, Any],
-        Dict[str, Any],
-        str,
+def parse_hls_attributes(text: str) -> Dict[str, str]:
+    return {
+        key: value.strip('"') for key, value in HLS_ATTRIBUTE_PATTERN.findall(text)
+    }
+
+
+def hls_media_paths(live_info: Mapping[str, Any]) -> List[str]:
+    try:
+        playback = orjson.loads(live_info.get("livePlaybackJson") or "null")
+    except orjson.JSONDecodeError:
+        return []
+    if not isinstance(playback, dict):
+        return []
+    return [
+        media["path"]
+        for media in playback.get("media") or []
+        if isinstance(media, dict)
+        and media.get("mediaId") == "HLS"
+        and media.get("protocol") == "HLS"
+        and media.get("path")
     ]
-):
-    config = await load_config_async()
 
-    timeout = clamp_int(
-        config.get("timeout"),
-        default=DEFAULT_RESCAN_INTERVAL_SECONDS,
-        min_value=MIN_RESCAN_INTERVAL_SECONDS,
-        max_value=MAX_RESCAN_INTERVAL_SECONDS,
-    )
-    stream_segment_threads = clamp_int(
-        config.get("stream_segment_threads"), default=2, min_value=1, max_value=16
-    )
-    channels = normalize_channels(config.get("channels", []))
-    raw_delays = config.get("delays", {})
-    delays = {
-        str(key): clamp_int(value, default=0, min_value=0, max_value=3600)
-        for key, value in raw_delays.items()
-    } if isinstance(raw_delays, dict) else {}
-    hevc_settings = normalize_hevc_settings(config.get("hevc_settings"))
-    av1_settings = normalize_av1_settings(config.get("av1_settings"))
-    if av1_settings.get("enable"):
-        hevc_settings["enable"] = False
-    output_format = normalize_output_format(config.get("output_format"))
 
-    return (
-        timeout,
-        stream_segment_threads,
-        channels,
-        delays,
-        hevc_settings,
-        av1_settings,
-        output_format,
-    )
+def parse_hls_master_playlist(text: str, base_url: str) -> List[Tuple[int, str]]:
+    variants = []
+    bandwidth: Optional[int] = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attributes = parse_hls_attributes(line.split(":", 1)[1])
+            bandwidth = clamp_int(attributes.get("BANDWIDTH"), 0, 0, 2**62)
+        elif line and not line.startswith("#") and bandwidth is not None:
+            variants.append((bandwidth, urljoin(base_url, line)))
+            bandwidth = None
+    return sorted(variants)
+
+
+def parse_hls_media_playlist(text: str, base_url: str) -> HLSMediaPlaylist:
+    target_duration = 2.0
+    sequence = 0
+    duration = 0.0
+    map_uri: Optional[str] = None
+    discontinuity = False
+    ended = False
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-TARGETDURATION:"):
+            with contextlib.suppress(ValueError):
+                target_duration = float(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            sequence = clamp_int(line.split(":", 1)[1], 0, 0, 2**62)
+        elif line.startswith("#EXT-X-MAP:"):
+            uri = parse_hls_attributes(line.split(":", 1)[1]).get("URI")
+            map_uri = urljoin(base_url, uri) if uri else None
+        elif line.startswith("#EXTINF:"):
+            with contextlib.suppress(ValueError):
+                duration = float(line.split(":", 1)[1].split(",", 1)[0])
+        elif line.startswith("#EXT-X-DISCONTINUITY") and not line.startswith(
+            "#EXT-X-DISCONTINUITY-SEQUENCE"
+        ):
+            discontinuity = True
+        elif line.startswith("#EXT-X-ENDLIST"):
+            ended = True
+        elif line and not line.startswith("#"):
+            segments.append(
+                HLSSegment(
+                    sequence, urljoin(base_url, line), duration, map_uri, discontinuity
+                )
+            )
+            sequence += 1
+            duration = 0.0
+            discontinuity = False
+    return HLSMediaPlaylist(target_duration, tuple(segments), ended)
 
 
-def cookie_header_from(cookies: Dict[str, str]) -> str:
-    nid_aut = sanitize_cookie_value(cookies.get("NID_AUT", ""))
-    nid_ses = sanitize_cookie_value(cookies.get("NID_SES", ""))
-    return f"NID_AUT={nid_aut}; NID_SES={nid_ses}"
+class SegmentThreadTuner:
+    """Picks a channel's segment download threads from measured fetch latency.
 
+    The load is the smoothed ratio of segment fetch time to segment duration;
+    near real time another thread is added, and when fetches are comfortably
+    fast one is given back.
+    """
 
-def get_auth_headers(cookies: Dict[str, str]) -> Dict[str, str]:
-    return {
-        "User-Agent": "Mozilla/5.0 (X11; Unix x86_64)",
-        "Cookie": cookie_header_from(cookies),
-        "Origin": "https://chzzk.naver.com",
-        "DNT": "1",
-        "Sec-GPC": "1",
-        "Connection": "keep-alive",
-        "Referer": "",
-    }
+    def __init__(self, channel_name: str, threads: int) -> None:
+        self.channel_name = channel_name
+        self.threads = threads
+        self.min_threads = threads
+        self.max_threads = threads
+        self.load: Optional[float] = None
+        self._samples = 0
+        self._queued: Dict[int, Tuple[float, float]] = {}
+
+    def configure(self, settings: Mapping[str, Any]) -> int:
+        self.min_threads = settings["min_threads"]
+        self.max_threads = settings["max_threads"]
+        self.threads = min(max(self.threads, self.min_threads), self.max_threads)
+        return self.threads
+
+    def observe(self, fetch_seconds: float, segment_seconds: float) -> None:
+        if segment_seconds <= 0:
+            return
+        load = fetch_seconds / segment_seconds
+        if self.load is None:
+            self.load = load
+        else:
+            self.load += SEGMENT_TUNING_SMOOTHING * (load - self.load)
+        self._samples += 1
+        if self._samples < SEGMENT_TUNING_SAMPLES:
+            return
 
+        threads = self.threads
+        if self.load >= SEGMENT_TUNING_RAISE_LOAD:
+            threads = min(threads + 1, self.max_threads)
+        elif self.load <= SEGMENT_TUNING_LOWER_LOAD:
+            threads = max(threads - 1, self.min_threads)
+        if threads != self.threads:
+            logger.info(
+                f"Segment fetches for {self.channel_name} take {self.load:.0%} of "
+                f"real time; using {threads} segment threads."
+            )
+            self.threads = threads
+            # Let the new thread count settle before judging it.
+            self._samples = 0
+
+    def observe_streamlink_log(self, line: str) -> bool:
+        """Time segments from streamlink debug output; True if the line was consumed."""
+        match = STREAMLINK_QUEUED_SEGMENT_PATTERN.search(line)
+        if match:
+            self._queued[int(match.group(1))] = (time.monotonic(), float(match.group(2)))
+            return True
+        match = STREAMLINK_SEGMENT_COMPLETE_PATTERN.search(line)
+        if match:
+            queued = self._queued.pop(int(match.group(1)), None)
+            if queued is not None:
+                queued_at, duration = queued
+                self.observe(time.monotonic() - queued_at, duration)
+            # Segments that never complete must not pile up.
+            for number in [n for n in self._queued if n < int(match.group(1))]:
+                del self._queued[number]
+            return True
+        return False
 
-def streamlink_http_header_args(cookies: Dict[str, str]) -> List[str]:
-    headers = [f"Cookie={cookie_header_from(cookies)}"]
-    headers.extend(
-        [
-            "User-Agent=Mozilla/5.0 (X11; Unix x86_64)",
-            "Origin=https://chzzk.naver.com",
-            "DNT=1",
-            "Sec-GPC=1",
-            "Connection=keep-alive",
-            "Referer=",
-        ]
-    )
 
-    args = []
-    for header in headers:
-        args.extend(["--http-header", header])
-    return args
+segment_thread_tuners: Dict[str, SegmentThreadTuner] = {}
 
 
-async def get_session_cookies() -> Dict[str, str]:
-    config = await load_config_async()
-    cookies = config.get("cookies", {})
-    if not isinstance(cookies, dict):
-        return {"NID_AUT": "", "NID_SES": ""}
-    return {
-        "NID_AUT": sanitize_cookie_value(cookies.get("NID_AUT", "")),
-        "NID_SES": sanitize_cookie_value(cookies.get("NID_SES", "")),
-    }
+def segment_thread_tuner(config: "ChannelRecordingConfig") -> Optional[SegmentThreadTuner]:
+    """Return the channel's tuner, kept across recordings, or None when tuning is off."""
+    if not config.segment_thread_tuning.get("enable"):
+        return None
+    channel_id = str(config.channel.get("id", "Unknown"))
+    tuner = segment_thread_tuners.get(channel_id)
+    if tuner is None:
+        tuner = segment_thread_tuners[channel_id] = SegmentThreadTuner(
+            config.channel.get("name", "Unknown"), config.stream_segment_threads
+        )
+    tuner.configure(config.segment_thread_tuning)
+    return tuner
 
 
-async def get_live_info(
-    channel: Dict[str, Any], headers: Dict[str, str], session: aiohttp.ClientSession
-) -> Tuple[str, Dict[str, Any]]:
-    logger.debug(f"Fetching live info for channel: {channel.get('name', 'Unknown')}")
-    try:
-        async with session.get(
-            LIVE_DETAIL_API.format(channel_id=channel["id"]), headers=headers
-        ) as response:
-            response.raise_for_status()
-            data = await response.json()
-            logger.debug(
-                f"Successfully fetched live info for channel: {channel.get('name', 'Unknown')}"
+class PresetGovernor:
+    """Moves a channel's live encode to faster presets when it can't keep up.
+
+    ffmpeg's speed= is averaged over the whole encode, so the recent rate is
+    derived from out_time over a sliding window instead. A slow encode is
+    flagged and the faster preset is used from the next ffmpeg start.
+    """
+
+    def __init__(self, channel_name: str) -> None:
+        self.channel_name = channel_name
+        self.settings: Mapping[str, Any] = {}
+        self.steps = 0
+        self.pending = False
+        self.speed: Optional[float] = None
+        self._base: Any = None
+        self._samples: collections.deque = collections.deque()
+
+    def configure(self, settings: Mapping[str, Any], base: Any) -> None:
+        self.settings = settings
+        if base != self._base:
+            # New encoder settings from the config start over at the configured preset.
+            self._base = base
+            self.steps = 0
+            self.pending = False
+
+    def apply(
+        self, hevc_settings: Mapping[str, Any], av1_settings: Mapping[str, Any]
+    ) -> Tuple[Mapping[str, Any], Mapping[str, Any]]:
+        """Return the settings with this channel's preset steps applied."""
+        if av1_settings.get("enable"):
+            selected, default_preset = av1_settings, "8"
+        elif hevc_settings.get("enable"):
+            selected, default_preset = hevc_settings, "ultrafast"
+        else:
+            return hevc_settings, av1_settings
+        governed = dict(selected)
+        for _ in range(self.steps):
+            preset = faster_preset(
+                str(governed.get("encoder", "")), governed.get("preset", default_preset)
             )
+            if preset is not None:
+                governed["preset"] = preset
+            elif self.settings.get("allow_copy"):
+                governed["enable"] = False
+                break
+        if selected is av1_settings:
+            return hevc_settings, governed
+        return governed, av1_settings
+
+    def start(self) -> None:
+        """Forget the previous encode's samples when a new ffmpeg starts."""
+        self._samples.clear()
+        self.speed = None
+
+    def observe(self, out_time_seconds: float, now: float) -> Optional[float]:
+        samples = self._samples
+        samples.append((now, out_time_seconds))
+        window = self.settings.get("window_seconds", 60)
+        while len(samples) > 2 and now - samples[1][0] >= window:
+            samples.popleft()
+        elapsed = now - samples[0][0]
+        if elapsed <= 0:
+            return self.speed
+        self.speed = (out_time_seconds - samples[0][1]) / elapsed
+        if (
+            not self.pending
+            and elapsed >= window
+            and self.speed < self.settings.get("min_speed", 0.95)
+        ):
+            self.pending = True
+            logger.warning(
+                f"Encoding for {self.channel_name} runs at {self.speed:.2f}x real time; "
+                "switching to a faster preset at the next restart."
+            )
+        return self.speed
 
-            content = data.get("content", {})
-            status = content.get("status", "")
-            if status == "CLOSE":
-                logger.info(
-                    f"The channel '{channel.get('name', 'Unknown')}' is not currently live."
-                )
-            if status == "BLOCK":
-                logger.info(
-                    f"The channel '{channel.get('name', 'Unknown')}' is blocked."
-                )
-                return status, {}
-            return status, content
-    except aiohttp.ClientError as e:
-        logger.error(
-            f"HTTP error occurred while fetching live info for {channel.get('name', 'Unknown')}: {e}"
-        )
-    except Exception as e:
-        logger.error(
-            f"Failed to fetch live info for {channel.get('name', 'Unknown')}: {e}"
+    def escalate(self) -> None:
+        """Commit a pending slowdown so the next encode uses the faster preset."""
+        if not self.pending:
+            return
+        self.pending = False
+        self.steps += 1
+        logger.info(
+            f"Encoder preset for {self.channel_name} stepped up "
+            f"{self.steps} level(s) from the configured one."
         )
-    return "", {}
 
 
-def shorten_filename(filename: str) -> str:
-    if filename.endswith(".part"):
-        final_name = filename[: -len(".part")]
-        name, final_ext = os.path.splitext(final_name)
-        compound_ext = f"{final_ext}.part"
-    else:
-        name, compound_ext = os.path.splitext(filename)
+preset_governors: Dict[str, PresetGovernor] = {}
 
-    filename_bytes = filename.encode("utf-8")
-    if len(filename_bytes) > MAX_FILENAME_BYTES:
-        hash_value = hashlib.sha256(filename_bytes).hexdigest()[:MAX_HASH_LENGTH]
-        max_name_length = MAX_FILENAME_BYTES - (
-            len(compound_ext.encode("utf-8")) + MAX_HASH_LENGTH + 1
-        )
-        shortened_name_bytes = name.encode("utf-8")[:max_name_length]
-        shortened_name = shortened_name_bytes.decode("utf-8", "ignore")
-        shortened_filename = f"{shortened_name}_{hash_value}{compound_ext}"
-        logger.warning(
-            f"Filename '{filename}' is too long. Shortening to '{shortened_filename}'."
+
+def preset_governor(config: "ChannelRecordingConfig") -> Optional[PresetGovernor]:
+    """Return the channel's governor, kept across recordings, or None when it is off."""
+    if not config.preset_governor.get("enable"):
+        return None
+    channel_id = str(config.channel.get("id", "Unknown"))
+    governor = preset_governors.get(channel_id)
+    if governor is None:
+        governor = preset_governors[channel_id] = PresetGovernor(
+            config.channel.get("name", "Unknown")
         )
-        return shortened_filename
+    governor.configure(
+        config.preset_governor,
+        (tuple(config.hevc_settings.items()), tuple(config.av1_settings.items())),
+    )
+    return governor
+
+
+class NativeHLSStream:
+    """Downloads a Chzzk HLS stream on the event loop with parallel segment prefetch."""
+
+    def __init__(
+        self,
+        client: "ChzzkApiClient",
+        channel: Mapping[str, Any],
+        headers: Dict[str, str],
+        parallelism: int,
+        tuner: Optional[SegmentThreadTuner] = None,
+    ) -> None:
+        self.client = client
+        self.channel = channel
+        self.channel_name = channel.get("name", "Unknown")
+        self.headers = headers
+        self.returncode: Optional[int] = None
+        self._playlist_url: Optional[str] = None
+        self._parallelism = max(1, parallelism)
+        self._tuner = tuner
+        self._active_downloads = 0
+        self._download_slots = asyncio.Condition()
+        prefetch = max(self._parallelism, tuner.max_threads if tuner else 1)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch * 4)
+        self._maps: Dict[str, bytes] = {}
+        self._current_map: Optional[str] = None
+        self._pending = b""
+        self._producer: Optional[asyncio.Task] = None
+        self._downloads: Set[asyncio.Task] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._renew_lock = asyncio.Lock()
+        self._renewed_from: Optional[str] = None
+        self._renewed_uris: Dict[int, str] = {}
+        self._closed = False
+
+    async def _fetch(self, url: str) -> bytes:
+        async with self.client.session.get(url, headers=self.headers) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _select_playlist(
+        self, live_info: Mapping[str, Any], quality: Optional[str]
+    ) -> Optional[str]:
+        for media_path in hls_media_paths(live_info):
+            master_url = rewrite_chzzk_cdn_host(media_path)
+            text = (await self._fetch(master_url)).decode(errors="replace")
+            variants = parse_hls_master_playlist(text, master_url)
+            if not variants:
+                continue
+            for _, variant_url in variants:
+                if quality is not None and hls_playlist_quality(variant_url) == quality:
+                    return rewrite_chzzk_cdn_host(variant_url)
+            return rewrite_chzzk_cdn_host(variants[-1][1])
+        return None
 
-    return filename
+    async def open(self, live_info: Mapping[str, Any]) -> None:
+        self._playlist_url = await self._select_playlist(live_info, None)
+        if self._playlist_url is None:
+            raise RuntimeError(f"No HLS playlist available for {self.channel_name}")
+
+    async def _refresh_playlist_url(self) -> bool:
+        """Re-resolve the playlist to get a new token, keeping the current quality."""
+        logger.debug(f"Refreshing the HLS playlist URL for {self.channel_name}.")
+        self.client.invalidate(self.channel["id"])
+        status, live_info = await get_live_info(self.channel, self.headers, self.client)
+        if status != "OPEN":
+            return False
+        quality = hls_playlist_quality(self._playlist_url or "")
+        playlist_url = await self._select_playlist(live_info, quality)
+        if playlist_url is None:
+            return False
+        self._playlist_url = playlist_url
+        return True
 
+    async def _refresh_token(self, stale_url: Optional[str]) -> bool:
+        """Refresh the playlist URL once for every caller that saw `stale_url` expire."""
+        if self._playlist_url != stale_url:
+            return True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_playlist_url())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _renewed_segment_uri(
+        self, segment: HLSSegment, listed_from: Optional[str]
+    ) -> Optional[str]:
+        """The segment's URI in the refreshed playlist, which carries the new token."""
+        try:
+            if not await self._refresh_token(listed_from):
+                return None
+            async with self._renew_lock:
+                if self._renewed_from != self._playlist_url:
+                    playlist_url = self._playlist_url
+                    text = (await self._fetch(playlist_url)).decode(errors="replace")
+                    playlist = parse_hls_media_playlist(text, playlist_url)
+                    self._renewed_uris = {item.sequence: item.uri for item in playlist.segments}
+                    self._renewed_from = playlist_url
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"Could not refresh the HLS token for {self.channel_name}: {e}")
+            return None
+        return self._renewed_uris.get(segment.sequence)
+
+    def _token_expiring(self) -> bool:
+        expire = url_expire_time(self._playlist_url or "")
+        return (
+            expire is not None
+            and time.time() >= expire - HLS_TOKEN_REFRESH_BEFORE_SECONDS
+        )
 
-def format_size(size_bytes: float) -> str:
-    if size_bytes <= 0:
-        return "0 B"
-    size_names = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    return f"{size_bytes:.2f} {size_names[i]}"
+    def _download_limit(self) -> int:
+        return self._tuner.threads if self._tuner is not None else self._parallelism
 
+    async def _download_segment(
+        self, segment: HLSSegment, listed_from: Optional[str]
+    ) -> Optional[bytes]:
+        # A condition instead of a semaphore so the tuner can resize the limit live.
+        async with self._download_slots:
+            await self._download_slots.wait_for(
+                lambda: self._active_downloads < self._download_limit()
+            )
+            self._active_downloads += 1
+        try:
+            uri = segment.uri
+            renewed = False
+            for attempt in range(HLS_SEGMENT_RETRIES):
+                started = time.monotonic()
+                try:
+                    data = await self._fetch(uri)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.debug(
+                        f"Segment {segment.sequence} of {self.channel_name} failed "
+                        f"(attempt {attempt + 1}/{HLS_SEGMENT_RETRIES}): {e}"
+                    )
+                    if getattr(e, "status", None) in (403, 404) and not renewed:
+                        # The token in the URI expired; fetch the segment with a fresh one.
+                        renewed = True
+                        renewed_uri = await self._renewed_segment_uri(segment, listed_from)
+                        if renewed_uri is not None:
+                            uri = renewed_uri
+                            continue
+                    await asyncio.sleep(0.5 * (attempt + 1))
+                    continue
+                if self._tuner is not None:
+                    self._tuner.observe(time.monotonic() - started, segment.duration)
+                return data
+            return None
+        finally:
+            async with self._download_slots:
+                self._active_downloads -= 1
+                self._download_slots.notify_all()
+
+    async def _produce(self) -> None:
+        next_sequence: Optional[int] = None
+        failures = 0
+        while True:
+            if self._token_expiring():
+                await self._refresh_token(self._playlist_url)
+            try:
+                text = (await self._fetch(self._playlist_url)).decode(errors="replace")
+                failures = 0
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                failures += 1
+                logger.debug(f"Playlist reload failed for {self.channel_name}: {e}")
+                status = getattr(e, "status", None)
+                if status in (403, 404) or failures >= HLS_PLAYLIST_MAX_FAILURES:
+                    if not await self._refresh_token(self._playlist_url):
+                        return
+                    failures = 0
+                await asyncio.sleep(min(0.5 * 2**failures, 10))
+                continue
 
-time_pattern = re.compile(r"(\d+):(\d+):(\d+)\.(\d+)")
+            playlist = parse_hls_media_playlist(text, self._playlist_url)
+            segments = playlist.segments
+            if (
+                next_sequence is not None
+                and segments
+                and segments[-1].sequence < next_sequence - 2 * len(segments)
+            ):
+                # The media sequence restarted, e.g. after the encoder reconnected.
+                next_sequence = None
+
+            queued = 0
+            for segment in segments:
+                if next_sequence is not None and segment.sequence < next_sequence:
+                    continue
+                download = asyncio.create_task(
+                    self._download_segment(segment, self._playlist_url)
+                )
+                self._downloads.add(download)
+                download.add_done_callback(self._downloads.discard)
+                await self._queue.put((segment, download))
+                next_sequence = segment.sequence + 1
+                queued += 1
+
+            if playlist.ended:
+                return
+            reload_delay = playlist.target_duration if queued else playlist.target_duration / 2
+            await asyncio.sleep(max(HLS_PLAYLIST_RELOAD_MIN_SECONDS, reload_delay))
+
+    async def _produce_until_end(self) -> None:
+        try:
+            await self._produce()
+        finally:
+            if not self._closed:
+                await self._queue.put(None)
+
+    def _start(self) -> None:
+        if self._producer is None:
+            self._producer = asyncio.create_task(self._produce_until_end())
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return None
+            segment, download = item
+            await asyncio.wait([download])
+            if download.cancelled():
+                return None
+            data = download.result()
+            if data is None:
+                logger.warning(
+                    f"Skipping segment {segment.sequence} of {self.channel_name} after repeated failures."
+                )
+                continue
+            if segment.map_uri and segment.map_uri != self._current_map:
+                if segment.map_uri not in self._maps:
+                    self._maps[segment.map_uri] = await self._fetch(segment.map_uri)
+                self._current_map = segment.map_uri
+                data = self._maps[segment.map_uri] + data
+            return data
+
+    async def peek(self, size: int) -> bytes:
+        """Download the first bytes of the stream; pump() writes them out first."""
+        self._start()
+        while len(self._pending) < size:
+            chunk = await self._next_chunk()
+            if chunk is None:
+                break
+            self._pending += chunk
+        return self._pending
 
+    async def pump(self, writer: asyncio.StreamWriter) -> None:
+        self._start()
+        try:
+            chunk, self._pending = self._pending, b""
+            while chunk is not None and not self._closed:
+                if chunk:
+                    writer.write(chunk)
+                    await writer.drain()
+                chunk = await self._next_chunk()
+            if not self._closed:
+                # Surface playlist failures that ended the download.
+                await self._producer
+            self.returncode = 0
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"ffmpeg stdin closed while piping stream for {self.channel_name}.")
+            self.returncode = 0
+        except asyncio.CancelledError:
+            self.returncode = 0
+            raise
+        except Exception as e:
+            logger.error(f"Native HLS download failed for {self.channel_name}: {e}")
+            self.returncode = 1
+        finally:
+            await self.close()
+            if not writer.is_closing():
+                writer.close()
+                with contextlib.suppress(Exception):
+                    await writer.wait_closed()
+
+    async def close(self) -> None:
+        self._closed = True
+        tasks = [*self._downloads]
+        if self._producer is not None:
+            tasks.append(self._producer)
+        if self._refresh_task is not None:
+            tasks.append(self._refresh_task)
+        for task in tasks:
+            task.cancel()
+        with contextlib.suppress(asyncio.QueueFull):
+            # Wake a pump() that is waiting for the next segment.
+            self._queue.put_nowait(None)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_direct_pipe() -> Tuple[int, int]:
+    read_fd, write_fd = os.pipe()
+    set_pipe_size = getattr(fcntl, "F_SETPIPE_SZ", None) if fcntl else None
+    if set_pipe_size is not None:
+        try:
+            fcntl.fcntl(write_fd, set_pipe_size, DIRECT_PIPE_BUFFER_BYTES)
+        except OSError as e:
+            # Unprivileged processes are capped by /proc/sys/fs/pipe-max-size.
+            logger.debug(f"Could not enlarge the streamlink to ffmpeg pipe: {e}")
+    return read_fd, write_fd
 
-def parse_time(time_str):
-    logger.debug(f"Parsing out_time: {time_str}")
-    match = time_pattern.match(time_str)
-    if not match:
-        return 0
-    hours, minutes, seconds, fractions = match.groups()
-    total_seconds = (
-        int(hours) * 3600
-        + int(minutes) * 60
-        + int(seconds)
-        + int(fractions) / (10 ** len(fractions))
-    )
-    return total_seconds
 
+def close_fd(fd: Optional[int]) -> None:
+    if fd is not None:
+        with contextlib.suppress(OSError):
+            os.close(fd)
 
-async def read_stream(
-    stream: asyncio.StreamReader, channel_id: str, stream_type: str
-) -> None:
-    summary: Dict[str, str] = {}
-    speed_samples = collections.deque(maxlen=5)
 
-    prev_total_size = None
-    prev_time = None
+class RecordingProcessSandbox:
+    def __init__(
+        self, channel_name: str, channel_id: str, pipe_mode: str = DEFAULT_PIPE_MODE
+    ) -> None:
+        self.channel_name = channel_name
+        self.channel_id = channel_id
+        self.pipe_mode = pipe_mode
+        self.stream_process: Optional[asyncio.subprocess.Process] = None
+        self.stream_reader: Any = None
+        self.ffmpeg_process: Optional[asyncio.subprocess.Process] = None
+        self.output_writer: Optional[TSPassthroughWriter] = None
+        self.segment_tuner: Optional[SegmentThreadTuner] = None
+        self._tasks: List[asyncio.Task] = []
+        self._cancel_on_cleanup: List[asyncio.Task] = []
+        self._temp_files: List[Path] = []
+        self._pipe_read_fd: Optional[int] = None
+
+    @property
+    def relays_stream(self) -> bool:
+        """Whether stream data passes through this process on its way to ffmpeg."""
+        return self.pipe_mode != "direct"
+
+    @property
+    def stream_returncode(self) -> Optional[int]:
+        if self.stream_reader is not None:
+            return self.stream_reader.returncode
+        if self.stream_process is not None:
+            return self.stream_process.returncode
+        return None
 
-    while not stream.at_eof():
-        try:
-            line = await stream.readline()
-            if not line:
-                break
-            line_str = line.decode(errors="ignore").strip()
+    def add_temp_file(self, path: Path) -> None:
+        self._temp_files.append(path)
+
+    def attach_stream_reader(self, reader: Any) -> Any:
+        """Feed ffmpeg from an in-process reader instead of a streamlink process."""
+        self.pipe_mode = "relay"
+        self.stream_reader = reader
+        return reader
+
+    async def open_passthrough_writer(
+        self, path: Path, settings: Mapping[str, Any]
+    ) -> "TSPassthroughWriter":
+        self.output_writer = await TSPassthroughWriter(
+            path,
+            self.channel_id,
+            resend_tables=settings.get("resend_tables", True),
+            fix_continuity=settings.get("fix_continuity", True),
+        ).open()
+        return self.output_writer
+
+    async def stop_stream(self) -> None:
+        if self.stream_reader is not None:
+            await self.stream_reader.close()
+        await terminate_process(
+            self.stream_process, f"streamlink [{self.channel_name}/{self.channel_id}]"
+        )
 
-            # Add log
-            logger.debug(f"ffmpeg {stream_type} [{channel_id}]: {line_str}")
+    async def start_streamlink(
+        self, command: List[str]
+    ) -> asyncio.subprocess.Process:
+        stdout: Any = asyncio.subprocess.PIPE
+        write_fd = None
+        if not self.relays_stream:
+            # streamlink writes straight into ffmpeg's stdin; the kernel moves the bytes.
+            self._pipe_read_fd, write_fd = create_direct_pipe()
+            stdout = write_fd
+        try:
+            self.stream_process = await create_isolated_subprocess_exec(
+                *command,
+                stdout=stdout,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        finally:
+            # Only streamlink may hold the write end, or ffmpeg never sees EOF.
+            close_fd(write_fd)
+        return self.stream_process
 
-            if "=" not in line_str:
-                continue
+    async def adopt_streamlink(
+        self, process: asyncio.subprocess.Process, command: List[str]
+    ) -> asyncio.subprocess.Process:
+        """Hand the command line to a pre-imported streamlink from the warm pool."""
+        self.stream_process = process
+        process.stdin.write(orjson.dumps(command) + b"\n")
+        await process.stdin.drain()
+        process.stdin.close()
+        return process
+
+    def adopt_ffmpeg(
+        self, process: asyncio.subprocess.Process
+    ) -> asyncio.subprocess.Process:
+        self.ffmpeg_process = process
+        return process
 
-            key, value = line_str.split("=", 1)
-            summary[key.strip()] = value.strip()
+    async def start_ffmpeg(self, command: List[str]) -> asyncio.subprocess.Process:
+        stdin: Any = asyncio.subprocess.PIPE
+        if self._pipe_read_fd is not None:
+            stdin = self._pipe_read_fd
+        try:
+            self.ffmpeg_process = await create_isolated_subprocess_exec(
+                *command,
+                stdin=stdin,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        finally:
+            close_fd(self._pipe_read_fd)
+            self._pipe_read_fd = None
+        return self.ffmpeg_process
 
-            if key.strip() == "progress":
-                total_size_str = summary.get("total_size", "0")
-                out_time_str = summary.get("out_time", "0")
+    def create_task(
+        self, coro: Any, cancel_on_cleanup: bool = False
+    ) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        if cancel_on_cleanup:
+            self._cancel_on_cleanup.append(task)
+        else:
+            self._tasks.append(task)
+        return task
 
-                try:
-                    total_size = int(total_size_str)
-                except ValueError:
-                    total_size = 0
+    async def cleanup(self) -> None:
+        await terminate_process(
+            self.ffmpeg_process, f"ffmpeg [{self.channel_name}/{self.channel_id}]"
+        )
+        await self.stop_stream()
+        for task in self._cancel_on_cleanup:
+            if not task.done():
+                task.cancel()
+        if self._cancel_on_cleanup:
+            await asyncio.gather(*self._cancel_on_cleanup, return_exceptions=True)
 
-                total_size_formatted = format_size(total_size)
+        for task in self._tasks:
+            await drain_task(task)
+        self._tasks.clear()
+        self._cancel_on_cleanup.clear()
+        if self.output_writer is not None:
+            self.output_writer.close()
+            await self.output_writer.wait_closed()
 
-                # Convert out_time to seconds
-                out_time_seconds = parse_time(out_time_str)
+        for path in self._temp_files:
+            with contextlib.suppress(OSError):
+                path.unlink(missing_ok=True)
+        self._temp_files.clear()
+        close_fd(self._pipe_read_fd)
+        self._pipe_read_fd = None
 
-                # Calculate bitrate
-                if out_time_seconds > 0:
-                    bitrate = (total_size * 8) / out_time_seconds  # bits per second
-                    bitrate_kbps = bitrate / 1000  # Convert to kbps
-                    bitrate_formatted = f"{bitrate_kbps:.2f} kbps"
-                else:
-                    bitrate_formatted = "N/A"
 
-                # Calculate download speed
-                current_time = time.time()
-                if prev_total_size is not None and prev_time is not None:
-                    bytes_diff = total_size - prev_total_size
-                    time_diff = current_time - prev_time
-                    if time_diff > 0:
-                        instant_speed = bytes_diff / time_diff  # Bytes per second
-                        speed_samples.append(instant_speed)
-                        average_speed = sum(speed_samples) / len(speed_samples)
-                        download_speed_formatted = format_size(average_speed) + "/s"
-                    else:
-                        download_speed_formatted = "N/A"
-                    prev_total_size = total_size
-                    prev_time = current_time
-                else:
-                    download_speed_formatted = "N/A"
-                    prev_total_size = total_size
-                    prev_time = current_time
+async def pipe_stream_to_stdin(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    channel_name: str,
+    head: bytes = b"",
+) -> None:
+    try:
+        if head:
+            writer.write(head)
+            await writer.drain()
+        while not shutdown_event.is_set():
+            chunk = await reader.read(256 * 1024)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        logger.debug(f"ffmpeg stdin closed while piping stream for {channel_name}.")
+    except Exception as e:
+        logger.error(f"Error piping stream to ffmpeg for {channel_name}: {e}")
+    finally:
+        if not writer.is_closing():
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
 
-                # Update progress data
-                async with channel_progress_lock:
-                    if channel_id in channel_progress:
-                        channel_progress[channel_id].update(
-                            {
-                                "bitrate": bitrate_formatted,
-                                "download_speed": download_speed_formatted,
-                                "total_size": total_size_formatted,
-                                "out_time": out_time_str,
-                            }
-                        )
 
-                summary.clear()
-        except Exception as e:
-            logger.error(f"Error occurred while reading stream for {channel_id}: {e}")
-            break
+class ReconnectableInput:
+    """Writer handed to one stream source that leaves the real target open on close."""
 
+    def __init__(self, target: Any) -> None:
+        self.target = target
+        self._closing = False
 
-def bitrate_to_kbps(value: Any) -> Optional[int]:
-    text = str(value or "").strip().lower()
-    if not text:
-        return None
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            raise BrokenPipeError("stream source input is closed")
+        self.target.write(data)
 
-    try:
-        if text.endswith("m"):
-            return int(text[:-1]) * 1000
-        if text.endswith("k"):
-            return int(text[:-1])
-        return int(text)
-    except ValueError:
-        return None
+    async def drain(self) -> None:
+        await self.target.drain()
 
+    def is_closing(self) -> bool:
+        return self._closing or self.target.is_closing()
 
-def calculate_bufsize(max_bitrate: str, fallback: str = "16000k") -> str:
-    max_val = bitrate_to_kbps(max_bitrate)
-    if max_val is None:
-        return fallback
-    return f"{max_val * 2}k"
+    def close(self) -> None:
+        self._closing = True
 
+    async def wait_closed(self) -> None:
+        return None
 
-def capped_vbr_args(bitrate: str, max_bitrate: str, bufsize: str) -> List[str]:
-    bitrate_value = bitrate_to_kbps(bitrate)
-    max_bitrate_value = bitrate_to_kbps(max_bitrate)
-    if (
-        bitrate_value is not None
-        and max_bitrate_value is not None
-        and max_bitrate_value <= bitrate_value
-    ):
-        return []
-    return ["-maxrate", max_bitrate, "-bufsize", bufsize]
 
+class SpoolBuffer:
+    """StreamWriter-like buffer that keeps ingest flowing while ffmpeg stalls.
 
-def numeric_preset(value: Any, default: str) -> str:
-    text = str(value or default).strip()
-    return text if text.isdigit() else default
+    Data is kept in memory up to memory_limit and then spills to an anonymous
+    temporary file up to disk_limit; ingest only blocks once both are full.
+    """
 
+    def __init__(
+        self,
+        target: Any,
+        channel_id: str,
+        memory_limit: int,
+        disk_limit: int,
+        directory: Optional[Path] = None,
+    ) -> None:
+        self.target = target
+        self.channel_id = channel_id
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.directory = directory
+        self.peak_bytes = 0
+        self._memory: collections.deque = collections.deque()
+        self._memory_bytes = 0
+        self._incoming = bytearray()
+        self._disk_file: Any = None
+        self._disk_read_pos = 0
+        self._disk_write_pos = 0
+        self._disk_executor: Optional[ThreadPoolExecutor] = None
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closing = False
+        self._broken = False
+        self._finished = asyncio.Event()
+        self._reported_at = 0.0
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._memory_bytes + self._disk_write_pos - self._disk_read_pos
+
+    @property
+    def capacity(self) -> int:
+        return self.memory_limit + self.disk_limit
+
+    def write(self, data: bytes) -> None:
+        if self._broken:
+            raise BrokenPipeError("spool consumer is closed")
+        self._incoming += data
+
+    async def _run_disk(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._disk_executor is None:
+            self._disk_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"spool-{self.channel_id}"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._disk_executor, func, *args)
 
-def nvenc_preset(value: Any, default: str = "p4") -> str:
-    text = str(value or default).strip().lower()
-    if text.startswith("p") and len(text) == 2 and text[1].isdigit():
-        return text
-    if "fast" in text or "super" in text or "ultra" in text:
-        return "p1"
-    if "slow" in text:
-        return "p6"
-    return default
+    def _disk_write(self, data: bytes, position: int) -> None:
+        if self._disk_file is None:
+            self._disk_file = tempfile.TemporaryFile(
+                dir=str(self.directory) if self.directory else None
+            )
+        self._disk_file.seek(position)
+        self._disk_file.write(data)
+        self._disk_file.flush()
+
+    def _disk_read(self, position: int, size: int) -> bytes:
+        self._disk_file.seek(position)
+        return self._disk_file.read(size)
+
+    async def drain(self) -> None:
+        while self._incoming:
+            if self._broken:
+                raise BrokenPipeError("spool consumer is closed")
+            if self.buffered_bytes >= self.capacity:
+                self._writable.clear()
+                await self._writable.wait()
+                continue
+            data = bytes(self._incoming[: self.capacity - self.buffered_bytes])
+            del self._incoming[: len(data)]
+            spilling = self._disk_write_pos > self._disk_read_pos
+            if not spilling and self._memory_bytes + len(data) <= self.memory_limit:
+                self._memory.append(data)
+                self._memory_bytes += len(data)
+            else:
+                # Once data spills, keep appending to disk so order is preserved.
+                # The position is reserved up front; the single disk thread runs
+                # reads after the writes queued before them.
+                position = self._disk_write_pos
+                self._disk_write_pos += len(data)
+                await self._run_disk(self._disk_write, data, position)
+            self.peak_bytes = max(self.peak_bytes, self.buffered_bytes)
+            self._readable.set()
+        await self._report()
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        while True:
+            if self._memory:
+                chunk = self._memory.popleft()
+                self._memory_bytes -= len(chunk)
+                return chunk
+            if self._disk_read_pos < self._disk_write_pos:
+                size = min(256 * 1024, self._disk_write_pos - self._disk_read_pos)
+                chunk = await self._run_disk(self._disk_read, self._disk_read_pos, size)
+                self._disk_read_pos += len(chunk)
+                if self._disk_read_pos >= self._disk_write_pos:
+                    # Rewind so the spool file does not grow without bound.
+                    self._disk_read_pos = self._disk_write_pos = 0
+                return chunk
+            if self._closing:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+
+    async def pump(self) -> None:
+        """Feed buffered data to the target until the spool is closed and empty."""
+        try:
+            while True:
+                chunk = await self._next_chunk()
+                self._writable.set()
+                if chunk is None:
+                    break
+                self.target.write(chunk)
+                await self.target.drain()
+                await self._report()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"ffmpeg stdin closed while draining the spool for {self.channel_id}.")
+        except Exception as e:
+            logger.error(f"Error draining the spool for {self.channel_id}: {e}")
+        finally:
+            self._broken = True
+            self._writable.set()
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._disk_file is not None:
+                with contextlib.suppress(OSError):
+                    await self._run_disk(self._disk_file.close)
+            if self._disk_executor is not None:
+                self._disk_executor.shutdown(wait=False)
+            if self.peak_bytes > self.memory_limit:
+                logger.info(
+                    f"Spool for {self.channel_id} peaked at {format_size(self.peak_bytes)}."
+                )
+            if not self.target.is_closing():
+                self.target.close()
+                with contextlib.suppress(Exception):
+                    await self.target.wait_closed()
+            self._finished.set()
+
+    async def _report(self) -> None:
+        now = time.monotonic()
+        if now - self._reported_at < 1:
+            return
+        self._reported_at = now
+        fill = self.buffered_bytes
+        async with channel_progress_lock:
+            if self.channel_id in channel_progress:
+                channel_progress[self.channel_id]["spool"] = (
+                    f"{format_size(fill)} ({fill * 100 / self.capacity:.0f}%)"
+                )
 
+    def is_closing(self) -> bool:
+        return self._closing
 
-def audio_stripped_encoding_args(args: List[str]) -> List[str]:
-    stripped = []
-    skip_next = False
-    audio_options = {"-c:a", "-b:a"}
-    for arg in args:
-        if skip_next:
-            skip_next = False
-            continue
-        if arg in audio_options:
-            skip_next = True
-            continue
-        stripped.append(arg)
-    return stripped
+    def close(self) -> None:
+        self._closing = True
+        self._readable.set()
 
+    async def wait_closed(self) -> None:
+        # Ingest is done once the spool accepted everything; ffmpeg drains it later.
+        return None
 
-def summarize_probe_error(message: str) -> str:
-    for line in message.splitlines():
-        line = line.strip()
-        if line:
-            return line[:300]
-    return "no diagnostic output"
 
+async def read_stream_head(reader: asyncio.StreamReader, size: int) -> bytes:
+    head = b""
+    while len(head) < size:
+        chunk = await reader.read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
 
-def probe_av1_encoder(
-    ffmpeg_path: Path, av1_settings: Dict[str, Any]
-) -> Tuple[bool, str]:
-    encoder = str(av1_settings.get("encoder", "libsvtav1"))
-    cache_key = (
-        str(ffmpeg_path),
-        encoder,
-        str(av1_settings.get("bitrate", "2500k")),
-        str(av1_settings.get("max_bitrate", "10000k")),
-        str(av1_settings.get("preset", "8")),
-    )
-    if cache_key in AV1_ENCODER_PROBE_CACHE:
-        return AV1_ENCODER_PROBE_CACHE[cache_key]
 
-    input_args = [str(ffmpeg_path), "-hide_banner", "-loglevel", "error"]
-    if encoder == "av1_vaapi":
-        input_args.extend(
-            [
-                "-init_hw_device",
-                "vaapi=vaapi0:/dev/dri/renderD128",
-                "-filter_hw_device",
-                "vaapi0",
-            ]
-        )
-    input_args.extend(
-        [
-            "-f",
-            "lavfi",
-            "-i",
-            "testsrc2=size=64x64:rate=1",
-            "-frames:v",
-            "1",
-        ]
-    )
+def looks_like_mpegts(data: bytes) -> bool:
+    """Whether data starts with a few MPEG-TS packets in a row."""
+    if len(data) < TS_PACKET_SIZE:
+        return False
+    packets = min(TS_SNIFF_PACKETS, len(data) // TS_PACKET_SIZE)
+    return all(data[index * TS_PACKET_SIZE] == TS_SYNC_BYTE for index in range(packets))
+
+
+def find_ts_sync(data: bytearray, start: int = 0) -> int:
+    """Return the offset of the next packet boundary, or -1 if none is buffered."""
+    index = data.find(TS_SYNC_BYTE, start)
+    while index != -1 and index + TS_PACKET_SIZE < len(data):
+        if data[index + TS_PACKET_SIZE] == TS_SYNC_BYTE:
+            return index
+        index = data.find(TS_SYNC_BYTE, index + 1)
+    return -1
+
+
+def parse_pat_pmt_pids(packet: bytes) -> Set[int]:
+    """Return the PMT PIDs announced by a PAT packet that starts a section."""
+    if not packet[1] & 0x40:
+        return set()
+    offset = 4
+    if packet[3] & 0x20:
+        offset += 1 + packet[4]
+    if offset >= TS_PACKET_SIZE:
+        return set()
+    offset += 1 + packet[offset]  # pointer_field
+    section = packet[offset:]
+    if len(section) < 12 or section[0] != 0x00:
+        return set()
+    section_length = ((section[1] & 0x0F) << 8) | section[2]
+    end = min(3 + section_length - 4, len(section))
+    pids = set()
+    for entry in range(8, end - 3, 4):
+        program_number = (section[entry] << 8) | section[entry + 1]
+        if program_number:
+            pids.add(((section[entry + 2] & 0x1F) << 8) | section[entry + 3])
+    return pids
+
+
+class TSPassthroughWriter:
+    """StreamWriter-like sink that appends MPEG-TS packets straight to a file."""
+
+    def __init__(
+        self,
+        path: Path,
+        channel_id: str,
+        resend_tables: bool = True,
+        fix_continuity: bool = True,
+    ) -> None:
+        self.path = path
+        self.channel_id = channel_id
+        self.resend_tables = resend_tables
+        self.fix_continuity = fix_continuity
+        self.returncode: Optional[int] = None
+        self.bytes_written = 0
+        self._file: Any = None
+        self._buffer = bytearray()
+        self._closing = False
+        self._close_task: Optional[asyncio.Task] = None
+        self._closed = asyncio.Event()
+        self._continuity: Dict[int, int] = {}
+        self._pmt_pids: Set[int] = set()
+        self._tables: Dict[int, bytes] = {}
+        self._packets_since_pat = 0
+        self._discontinuity_packets = 0
+        self._discontinuity_marked: Set[int] = set()
+        self._started_at = time.monotonic()
+        self._speed_sample: Tuple[float, int] = (self._started_at, 0)
+
+    async def open(self) -> "TSPassthroughWriter":
+        self._file = await aiofiles.open(self.path, "ab")
+        return self
+
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            raise BrokenPipeError("TS passthrough writer is closed")
+        self._buffer += data
+
+    def mark_discontinuity(self) -> None:
+        """Flag the next packets as a discontinuity after the input was reconnected."""
+        self._discontinuity_packets = TS_TABLE_RESEND_PACKETS
+        self._discontinuity_marked.clear()
+        # The dropped input's last packet will never be completed; the new one starts fresh.
+        del self._buffer[len(self._buffer) // TS_PACKET_SIZE * TS_PACKET_SIZE :]
+
+    def _rewrite_packets(self, data: bytearray) -> bytearray:
+        output = bytearray()
+        for offset in range(0, len(data), TS_PACKET_SIZE):
+            packet = data[offset : offset + TS_PACKET_SIZE]
+            pid = ((packet[1] & 0x1F) << 8) | packet[2]
+            if self._discontinuity_packets:
+                self._discontinuity_packets -= 1
+                if pid != 0x1FFF and pid not in self._discontinuity_marked:
+                    self._discontinuity_marked.add(pid)
+                    if packet[3] & 0x20 and packet[4]:
+                        packet[5] |= 0x80  # discontinuity_indicator
+                    else:
+                        # No adaptation field flags to set; flag the PID in a packet of its own.
+                        output += self._discontinuity_packet(packet)
+            if pid == 0:
+                self._pmt_pids = parse_pat_pmt_pids(packet) or self._pmt_pids
+                self._tables[pid] = bytes(packet)
+                self._packets_since_pat = 0
+            elif pid in self._pmt_pids and packet[1] & 0x40:
+                self._tables[pid] = bytes(packet)
+            elif (
+                self.resend_tables
+                and self._tables
+                and self._packets_since_pat >= TS_TABLE_RESEND_PACKETS
+            ):
+                # Let players that join mid-file find the programs again.
+                for table in self._tables.values():
+                    output += self._fix_continuity(bytearray(table))
+                self._packets_since_pat = 0
+            output += self._fix_continuity(packet)
+            self._packets_since_pat += 1
+        return output
+
+    def _discontinuity_packet(self, packet: bytearray) -> bytes:
+        """An adaptation-only packet flagging a discontinuity ahead of `packet`."""
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        # Packets without payload don't advance the counter, so this one carries
+        # the value `packet` continues from once it has been renumbered.
+        counter = (packet[3] - 1) & 0x0F
+        if self.fix_continuity:
+            counter = self._continuity.get(pid, counter)
+        header = bytes([TS_SYNC_BYTE, packet[1] & 0x1F, packet[2], 0x20 | counter])
+        return header + bytes([TS_PACKET_SIZE - 5, 0x80]) + b"\xff" * (TS_PACKET_SIZE - 6)
+
+    def _fix_continuity(self, packet: bytearray) -> bytearray:
+        if not self.fix_continuity:
+            return packet
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        if pid == 0x1FFF or not packet[3] & 0x10:
+            return packet
+        counter = (self._continuity.get(pid, (packet[3] - 1) & 0x0F) + 1) & 0x0F
+        self._continuity[pid] = counter
+        packet[3] = (packet[3] & 0xF0) | counter
+        return packet
+
+    def _take_packets(self) -> bytearray:
+        """Remove the whole packets buffered so far, skipping bytes that are out of sync."""
+        packets = bytearray()
+        offset = 0
+        while len(self._buffer) - offset >= TS_PACKET_SIZE:
+            if self._buffer[offset] != TS_SYNC_BYTE:
+                start = find_ts_sync(self._buffer, offset)
+                if start == -1:
+                    # Keep one partial packet around so a sync byte split across writes survives.
+                    offset = len(self._buffer) - TS_PACKET_SIZE
+                    break
+                logger.debug(
+                    f"Skipped {start - offset} bytes to resync TS packets for {self.channel_id}."
+                )
+                offset = start
+            end = offset + (len(self._buffer) - offset) // TS_PACKET_SIZE * TS_PACKET_SIZE
+            sync_bytes = bytes(self._buffer[offset:end:TS_PACKET_SIZE])
+            aligned = len(sync_bytes) - len(sync_bytes.lstrip(bytes([TS_SYNC_BYTE])))
+            packets += self._buffer[offset : offset + aligned * TS_PACKET_SIZE]
+            offset += aligned * TS_PACKET_SIZE
+        del self._buffer[:offset]
+        return packets
+
+    async def drain(self) -> None:
+        data = self._take_packets()
+        if not data:
+            return
+        if self.resend_tables or self.fix_continuity or self._discontinuity_packets:
+            data = self._rewrite_packets(data)
+        await self._file.write(data)
+        self.bytes_written += len(data)
+        await self._update_progress()
+
+    async def _update_progress(self) -> None:
+        now = time.monotonic()
+        sample_time, sample_bytes = self._speed_sample
+        if now - sample_time < 1:
+            return
+        speed = (self.bytes_written - sample_bytes) / (now - sample_time)
+        self._speed_sample = (now, self.bytes_written)
+        elapsed = now - self._started_at
+        hours, remainder = divmod(elapsed, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        async with channel_progress_lock:
+            if self.channel_id in channel_progress:
+                channel_progress[self.channel_id].update(
+                    {
+                        "bitrate": f"{self.bytes_written * 8 / elapsed / 1000:.2f} kbps",
+                        "download_speed": format_size(speed) + "/s",
+                        "total_size": format_size(self.bytes_written),
+                        "out_time": f"{int(hours):02d}:{int(minutes):02d}:{seconds:09.6f}",
+                    }
+                )
 
-    video_args = audio_stripped_encoding_args(
-        build_av1_encoding_args(av1_settings, "mkv")
-    )
-    probe_cmd = input_args + video_args + ["-an", "-f", "null", "-"]
+    async def _finish(self) -> None:
+        try:
+            await self.drain()
+            await self._file.flush()
+            self.returncode = 0
+        except OSError as e:
+            logger.error(f"Failed to write TS passthrough output {self.path}: {e}")
+            self.returncode = 1
+        finally:
+            with contextlib.suppress(OSError):
+                await self._file.close()
+            self._closed.set()
 
-    try:
-        result = subprocess.run(
-            probe_cmd,
-            capture_output=True,
-            text=True,
-            timeout=15,
-            check=False,
-        )
-        message = (result.stderr or result.stdout or "").strip()
-        probe_result = (result.returncode == 0, message)
-    except (OSError, subprocess.SubprocessError) as e:
-        probe_result = (False, str(e))
-
-    AV1_ENCODER_PROBE_CACHE[cache_key] = probe_result
-    return probe_result
+    def is_closing(self) -> bool:
+        return self._closing
 
+    def close(self) -> None:
+        if not self._closing:
+            self._closing = True
+            self._close_task = asyncio.create_task(self._finish())
 
-def resolve_av1_settings_for_recording(
-    av1_settings: Dict[str, Any], ffmpeg_path: Path
-) -> Dict[str, Any]:
-    if not av1_settings.get("enable", False):
-        return av1_settings
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
 
-    active_settings = dict(av1_settings)
-    selected_encoder = str(active_settings.get("encoder", "libsvtav1"))
-    encoder_works, probe_message = probe_av1_encoder(ffmpeg_path, active_settings)
-    if encoder_works:
-        return active_settings
+    async def wait(self) -> Optional[int]:
+        await self._closed.wait()
+        return self.returncode
 
-    logger.warning(
-        f"AV1 encoder '{selected_encoder}' is not usable with the current "
-        f"FFmpeg/hardware setup: {summarize_probe_error(probe_message)}"
-    )
 
-    for fallback_encoder in AV1_SOFTWARE_FALLBACK_ENCODERS:
-        if fallback_encoder == selected_encoder:
+async def read_log_stream(
+    stream: Optional[asyncio.StreamReader],
+    process_name: str,
+    channel_id: str,
+    tuner: Optional[SegmentThreadTuner] = None,
+) -> None:
+    if stream is None:
+        return
+
+    while not stream.at_eof():
+        line = await stream.readline()
+        if not line:
+            break
+        line_str = line.decode(errors="replace").strip()
+        if not line_str:
             continue
-        fallback_settings = dict(active_settings)
-        fallback_settings["encoder"] = fallback_encoder
-        fallback_works, fallback_message = probe_av1_encoder(
-            ffmpeg_path, fallback_settings
-        )
-        if fallback_works:
-            logger.warning(
-                f"Using AV1 encoder '{fallback_encoder}' instead of "
-                f"'{selected_encoder}' for this recording."
-            )
-            return fallback_settings
-        logger.warning(
-            f"AV1 fallback encoder '{fallback_encoder}' is not usable: "
-            f"{summarize_probe_error(fallback_message)}"
-        )
 
-    disabled_settings = dict(active_settings)
-    disabled_settings["enable"] = False
-    logger.warning("No usable AV1 encoder found. Recording without AV1 encoding.")
-    return disabled_settings
+        if tuner is not None and (
+            tuner.observe_streamlink_log(line_str) or "][debug]" in line_str
+        ):
+            logger.debug(f"{process_name} stderr [{channel_id}]: {line_str}")
+        elif process_name == "streamlink":
+            logger.info(f"{process_name} stderr [{channel_id}]: {line_str}")
+        else:
+            logger.debug(f"{process_name} stderr [{channel_id}]: {line_str}")
 
 
-def build_hevc_probe_args(hevc_settings: Dict[str, Any]) -> List[str]:
-    encoder = hevc_settings.get("encoder", "libx265")
-    bitrate = hevc_settings.get("bitrate", "2500k")
-    max_bitrate = hevc_settings.get("max_bitrate", "10000k")
-    preset = str(hevc_settings.get("preset", "ultrafast")).strip()
-    bufsize = calculate_bufsize(max_bitrate)
+async def setup_paths() -> Optional[Path]:
+    os_name = platform.system()
 
-    if encoder == "hevc_nvenc":
-        return [
-            "-c:v",
-            "hevc_nvenc",
-            "-preset",
-            nvenc_preset(preset),
-            "-b:v",
-            bitrate,
-            "-maxrate",
-            max_bitrate,
-            "-bufsize",
-            bufsize,
-            "-rc",
-            "vbr",
-        ]
-    if encoder == "hevc_qsv":
-        return [
-            "-c:v",
-            "hevc_qsv",
-            "-preset",
-            preset,
-            "-b:v",
-            bitrate,
-            "-maxrate",
-            max_bitrate,
-            "-bufsize",
-            bufsize,
-        ]
-    if encoder == "hevc_amf":
-        return [
-            "-c:v",
-            "hevc_amf",
-            "-usage",
-            "transcoding",
-            "-rc",
-            "vbr_peak",
-            "-b:v",
-            bitrate,
-            "-maxrate",
-            max_bitrate,
-            "-bufsize",
-            bufsize,
+    if os_name == "Windows":
+        logger.info("Running on Windows.")
+        bundled_ffmpeg = BASE_DIR / "ffmpeg" / "bin" / "ffmpeg.exe"
+        if bundled_ffmpeg.exists():
+            logger.info(f"Using bundled ffmpeg at: {bundled_ffmpeg}")
+            return bundled_ffmpeg
+
+        ffmpeg_on_path = shutil.which("ffmpeg")
+        if ffmpeg_on_path:
+            ffmpeg_path = Path(ffmpeg_on_path)
+            logger.info(f"Using ffmpeg from PATH at: {ffmpeg_path}")
+            return ffmpeg_path
+
+        logger.error("ffmpeg not found. Run install.bat or add ffmpeg to PATH.")
+    else:
+        ffmpeg_on_path = shutil.which("ffmpeg")
+        if ffmpeg_on_path:
+            ffmpeg_path = Path(ffmpeg_on_path)
+            logger.info(f"Running on {os_name}. ffmpeg found at: {ffmpeg_path}")
+            return ffmpeg_path
+
+        logger.error("ffmpeg not found on the system PATH.")
+
+    return None
+
+
+def normalize_cookies(value: Any) -> Dict[str, str]:
+    if not isinstance(value, dict):
+        return {"NID_AUT": "", "NID_SES": ""}
+    return {
+        "NID_AUT": sanitize_cookie_value(value.get("NID_AUT", "")),
+        "NID_SES": sanitize_cookie_value(value.get("NID_SES", "")),
+    }
+
+
+@dataclass(frozen=True)
+class RecorderSettings:
+    timeout: int
+    stream_segment_threads: int
+    channels: Tuple[Mapping[str, Any], ...]
+    delays: Mapping[str, int]
+    hevc_settings: Mapping[str, Any]
+    av1_settings: Mapping[str, Any]
+    output_format: str
+    pipe_mode: str
+    recording_backend: str
+    ts_passthrough: Mapping[str, Any]
+    spool: Mapping[str, Any]
+    warm_pool: Mapping[str, Any]
+    reconnect: Mapping[str, Any]
+    segment_thread_tuning: Mapping[str, Any]
+    hardware_sessions: Mapping[str, Any]
+    deferred_transcode: Mapping[str, Any]
+    preset_governor: Mapping[str, Any]
+    multi_output: Mapping[str, Any]
+    segmentation: Mapping[str, Any]
+    remux: Mapping[str, Any]
+    adaptive_polling: Mapping[str, Any]
+    workers: int
+    coordination: Mapping[str, Any]
+    cookies: Mapping[str, str]
+
+
+def parse_settings(config: Any) -> RecorderSettings:
+    if not isinstance(config, dict):
+        config = {}
+
+    timeout = clamp_int(
+        config.get("timeout"),
+        default=DEFAULT_RESCAN_INTERVAL_SECONDS,
+        min_value=MIN_RESCAN_INTERVAL_SECONDS,
+        max_value=MAX_RESCAN_INTERVAL_SECONDS,
+    )
+    stream_segment_threads = clamp_int(
+        config.get("stream_segment_threads"), default=2, min_value=1, max_value=16
+    )
+    channels = normalize_channels(config.get("channels", []))
+    raw_delays = config.get("delays", {})
+    delays = {
+        str(key): clamp_int(value, default=0, min_value=0, max_value=3600)
+        for key, value in raw_delays.items()
+    } if isinstance(raw_delays, dict) else {}
+    hevc_settings = normalize_hevc_settings(config.get("hevc_settings"))
+    av1_settings = normalize_av1_settings(config.get("av1_settings"))
+    if av1_settings.get("enable"):
+        hevc_settings["enable"] = False
+    output_format = normalize_output_format(config.get("output_format"))
+    adaptive_polling = normalize_adaptive_polling_settings(
+        config.get("adaptive_polling")
+    )
+
+    return RecorderSettings(
+        timeout=timeout,
+        stream_segment_threads=stream_segment_threads,
+        channels=tuple(MappingProxyType(channel) for channel in channels),
+        delays=MappingProxyType(delays),
+        hevc_settings=MappingProxyType(hevc_settings),
+        av1_settings=MappingProxyType(av1_settings),
+        output_format=output_format,
+        pipe_mode=normalize_pipe_mode(config.get("pipe_mode")),
+        recording_backend=normalize_recording_backend(config.get("recording_backend")),
+        ts_passthrough=MappingProxyType(
+            normalize_ts_passthrough_settings(config.get("ts_passthrough"))
+        ),
+        spool=MappingProxyType(normalize_spool_settings(config.get("spool"))),
+        warm_pool=MappingProxyType(normalize_warm_pool_settings(config.get("warm_pool"))),
+        reconnect=MappingProxyType(normalize_reconnect_settings(config.get("reconnect"))),
+        segment_thread_tuning=MappingProxyType(
+            normalize_segment_thread_tuning_settings(config.get("segment_thread_tuning"))
+        ),
+        hardware_sessions=MappingProxyType(
+            normalize_hardware_session_settings(config.get("hardware_sessions"))
+        ),
+        deferred_transcode=MappingProxyType(
+            normalize_deferred_transcode_settings(config.get("deferred_transcode"))
+        ),
+        preset_governor=MappingProxyType(
+            normalize_preset_governor_settings(config.get("preset_governor"))
+        ),
+        multi_output=MappingProxyType(
+            normalize_multi_output_settings(config.get("multi_output"))
+        ),
+        segmentation=MappingProxyType(
+            normalize_segmentation_settings(config.get("segmentation"))
+        ),
+        remux=MappingProxyType(normalize_remux_settings(config.get("remux"))),
+        adaptive_polling=MappingProxyType(adaptive_polling),
+        workers=clamp_int(
+            config.get("workers"), default=1, min_value=1, max_value=MAX_RECORDING_WORKERS
+        ),
+        coordination=MappingProxyType(
+            normalize_coordination_settings(config.get("coordination"))
+        ),
+        cookies=MappingProxyType(normalize_cookies(config.get("cookies"))),
+    )
+
+
+class InotifyWatcher:
+    """Minimal inotify binding that reports changes to one file in a directory."""
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_name = os.fsencode(file_path.name)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (
+            self.IN_CLOSE_WRITE
+            | self.IN_MOVED_FROM
+            | self.IN_MOVED_TO
+            | self.IN_CREATE
+            | self.IN_DELETE
+        )
+        # Watch the directory: editors and settings.py replace the file atomically.
+        if libc.inotify_add_watch(self._fd, os.fsencode(file_path.parent), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, "inotify_add_watch failed")
+
+    @classmethod
+    def create(cls, file_path: Path) -> Optional["InotifyWatcher"]:
+        if platform.system() != "Linux":
+            return None
+        try:
+            return cls(file_path)
+        except (OSError, AttributeError) as e:
+            logger.debug(f"inotify is unavailable, polling {file_path} instead: {e}")
+            return None
+
+    def _read_matches(self) -> bool:
+        matched = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return matched
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                _, _, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset : offset + name_length].rstrip(b"\0")
+                offset += name_length
+                matched = matched or name == self.file_name
+
+    async def wait(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        loop.add_reader(self._fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(self._fd)
+        return self._read_matches()
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError):
+            os.close(self._fd)
+
+
+class ConfigService:
+    """Parses config.json once per real change and publishes immutable snapshots."""
+
+    def __init__(self, file_path: Path = CONFIG_FILE_PATH) -> None:
+        self.file_path = file_path
+        self.snapshot = parse_settings({})
+        self._stat_signature: Optional[Tuple[int, int]] = None
+        self._digest: Optional[bytes] = None
+        self._updated = asyncio.Event()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def reload(self, force: bool = False) -> bool:
+        signature = self._stat()
+        if not force and signature == self._stat_signature:
+            return False
+        self._stat_signature = signature
+
+        content = b""
+        if signature is not None:
+            try:
+                async with aiofiles.open(self.file_path, "rb") as file:
+                    content = await file.read()
+            except OSError as e:
+                logger.error(f"Error loading JSON from {self.file_path}: {e}")
+                return False
+
+        # Touching the file or rewriting identical content is not a change.
+        digest = hashlib.sha256(content).digest()
+        if not force and digest == self._digest:
+            return False
+
+        try:
+            config = orjson.loads(content) if content else {}
+        except orjson.JSONDecodeError as e:
+            logger.error(f"JSON decode error in {self.file_path}: {e}")
+            return False
+
+        self._digest = digest
+        self.snapshot = parse_settings(config)
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+        logger.debug(f"Loaded configuration from {self.file_path}.")
+        return True
+
+    async def wait_for_update(self) -> RecorderSettings:
+        await self._updated.wait()
+        return self.snapshot
+
+    async def watch(self) -> None:
+        watcher = InotifyWatcher.create(self.file_path)
+        try:
+            while not shutdown_event.is_set():
+                if watcher is not None:
+                    # Still re-check occasionally in case an event was missed.
+                    await watcher.wait(CONFIG_WATCH_FALLBACK_SECONDS)
+                else:
+                    await asyncio.sleep(CONFIG_POLL_INTERVAL_SECONDS)
+                await self.reload()
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+
+config_service = ConfigService()
+
+
+def cookie_header_from(cookies: Mapping[str, str]) -> str:
+    nid_aut = sanitize_cookie_value(cookies.get("NID_AUT", ""))
+    nid_ses = sanitize_cookie_value(cookies.get("NID_SES", ""))
+    return f"NID_AUT={nid_aut}; NID_SES={nid_ses}"
+
+
+def get_auth_headers(cookies: Mapping[str, str]) -> Dict[str, str]:
+    return {
+        "User-Agent": "Mozilla/5.0 (X11; Unix x86_64)",
+        "Cookie": cookie_header_from(cookies),
+        "Origin": "https://chzzk.naver.com",
+        "DNT": "1",
+        "Sec-GPC": "1",
+        "Connection": "keep-alive",
+        "Referer": "",
+    }
+
+
+def streamlink_http_header_args(cookies: Mapping[str, str]) -> List[str]:
+    headers = [f"Cookie={cookie_header_from(cookies)}"]
+    headers.extend(
+        [
+            "User-Agent=Mozilla/5.0 (X11; Unix x86_64)",
+            "Origin=https://chzzk.naver.com",
+            "DNT=1",
+            "Sec-GPC=1",
+            "Connection=keep-alive",
+            "Referer=",
+        ]
+    )
+
+    args = []
+    for header in headers:
+        args.extend(["--http-header", header])
+    return args
+
+
+class TokenBucket:
+    """Async token bucket that spaces out requests to a steady average rate."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def penalize(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def retry_after_seconds(response: aiohttp.ClientResponse) -> Optional[float]:
+    value = response.headers.get("Retry-After", "").strip()
+    if not value.isdigit():
+        return None
+    return min(float(value), API_RETRY_MAX_DELAY_SECONDS)
+
+
+class ChzzkApiClient:
+    """Rate-limited Chzzk API client with retries and in-flight request coalescing."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        rate: float = API_REQUESTS_PER_SECOND,
+        burst: float = API_REQUEST_BURST,
+        max_retries: int = API_MAX_RETRIES,
+        cache_ttl: float = LIVE_DETAIL_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.session = session
+        self.max_retries = max_retries
+        self.cache_ttl = cache_ttl
+        self._bucket = TokenBucket(rate, burst)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+    async def get_live_detail(
+        self, channel_id: str, headers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        cached = self._cache.get(channel_id)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        task = self._inflight.get(channel_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_live_detail(channel_id, headers))
+            self._inflight[channel_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(channel_id, None))
+        # Shield the shared request so one cancelled caller does not fail the others.
+        return await asyncio.shield(task)
+
+    def invalidate(self, channel_id: str) -> None:
+        self._cache.pop(channel_id, None)
+
+    async def _fetch_live_detail(
+        self, channel_id: str, headers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        data = await self._request_json(
+            LIVE_DETAIL_API.format(channel_id=channel_id), headers
+        )
+        self._cache[channel_id] = (time.monotonic(), data)
+        return data
+
+    def _backoff_delay(self, attempt: int) -> float:
+        ceiling = min(
+            API_RETRY_MAX_DELAY_SECONDS, API_RETRY_BASE_DELAY_SECONDS * 2**attempt
+        )
+        return random.uniform(ceiling / 2, ceiling)
+
+    async def _request_json(self, url: str, headers: Dict[str, str]) -> Any:
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if (
+                        response.status not in RETRYABLE_HTTP_STATUSES
+                        or attempt >= self.max_retries
+                    ):
+                        response.raise_for_status()
+                        return orjson.loads(await response.read())
+                    delay = retry_after_seconds(response) or self._backoff_delay(
+                        attempt
+                    )
+                    reason = f"HTTP {response.status}"
+                    if response.status == 429:
+                        # Throttled: hold back every caller, not just this one.
+                        self._bucket.penalize(delay)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                reason = str(e) or type(e).__name__
+
+            attempt += 1
+            logger.debug(
+                f"Retrying {url} in {delay:.1f}s after {reason} "
+                f"(attempt {attempt}/{self.max_retries})."
+            )
+            await asyncio.sleep(delay)
+
+
+async def get_live_info(
+    channel: Mapping[str, Any], headers: Dict[str, str], client: ChzzkApiClient
+) -> Tuple[str, Dict[str, Any]]:
+    logger.debug(f"Fetching live info for channel: {channel.get('name', 'Unknown')}")
+    try:
+        data = await client.get_live_detail(channel["id"], headers)
+        logger.debug(
+            f"Successfully fetched live info for channel: {channel.get('name', 'Unknown')}"
+        )
+
+        content = data.get("content") or {}
+        status = content.get("status", "")
+        if status == "CLOSE":
+            logger.info(
+                f"The channel '{channel.get('name', 'Unknown')}' is not currently live."
+            )
+        if status == "BLOCK":
+            logger.info(
+                f"The channel '{channel.get('name', 'Unknown')}' is blocked."
+            )
+            return status, {}
+        return status, content
+    except aiohttp.ClientError as e:
+        logger.error(
+            f"HTTP error occurred while fetching live info for {channel.get('name', 'Unknown')}: {e}"
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to fetch live info for {channel.get('name', 'Unknown')}: {e}"
+        )
+    return "", {}
+
+
+def write_live_detail_handoff(
+    channel_id: str, live_info: Dict[str, Any]
+) -> Optional[Path]:
+    if not live_info.get("livePlaybackJson"):
+        return None
+
+    handoff = {
+        "channel_id": channel_id,
+        "fetched_at": time.time(),
+        "response": orjson.dumps({"code": 200, "content": live_info}).decode(),
+    }
+    try:
+        fd, path = tempfile.mkstemp(prefix="chzzk-live-detail-", suffix=".json")
+        with os.fdopen(fd, "wb") as file:
+            file.write(orjson.dumps(handoff))
+    except OSError as e:
+        logger.debug(f"Could not write live detail handoff for {channel_id}: {e}")
+        return None
+    return Path(path)
+
+
+def shorten_filename(filename: str) -> str:
+    if filename.endswith(".part"):
+        final_name = filename[: -len(".part")]
+        name, final_ext = os.path.splitext(final_name)
+        compound_ext = f"{final_ext}.part"
+    else:
+        name, compound_ext = os.path.splitext(filename)
+
+    filename_bytes = filename.encode("utf-8")
+    if len(filename_bytes) > MAX_FILENAME_BYTES:
+        hash_value = hashlib.sha256(filename_bytes).hexdigest()[:MAX_HASH_LENGTH]
+        max_name_length = MAX_FILENAME_BYTES - (
+            len(compound_ext.encode("utf-8")) + MAX_HASH_LENGTH + 1
+        )
+        shortened_name_bytes = name.encode("utf-8")[:max_name_length]
+        shortened_name = shortened_name_bytes.decode("utf-8", "ignore")
+        shortened_filename = f"{shortened_name}_{hash_value}{compound_ext}"
+        logger.warning(
+            f"Filename '{filename}' is too long. Shortening to '{shortened_filename}'."
+        )
+        return shortened_filename
+
+    return filename
+
+
+def format_size(size_bytes: float) -> str:
+    if size_bytes <= 0:
+        return "0 B"
+    size_names = ["B", "KB", "MB", "GB", "TB"]
+    i = 0
+    while size_bytes >= 1024 and i < len(size_names) - 1:
+        size_bytes /= 1024.0
+        i += 1
+    return f"{size_bytes:.2f} {size_names[i]}"
+
+
+time_pattern = re.compile(r"(\d+):(\d+):(\d+)\.(\d+)")
+
+
+def parse_time(time_str):
+    logger.debug(f"Parsing out_time: {time_str}")
+    match = time_pattern.match(time_str)
+    if not match:
+        return 0
+    hours, minutes, seconds, fractions = match.groups()
+    total_seconds = (
+        int(hours) * 3600
+        + int(minutes) * 60
+        + int(seconds)
+        + int(fractions) / (10 ** len(fractions))
+    )
+    return total_seconds
+
+
+async def read_stream(
+    stream: asyncio.StreamReader,
+    channel_id: str,
+    stream_type: str,
+    governor: Optional[PresetGovernor] = None,
+) -> None:
+    summary: Dict[str, str] = {}
+    speed_samples = collections.deque(maxlen=5)
+
+    prev_total_size = None
+    prev_time = None
+
+    while not stream.at_eof():
+        try:
+            line = await stream.readline()
+            if not line:
+                break
+            line_str = line.decode(errors="ignore").strip()
+
+            # Add log
+            logger.debug(f"ffmpeg {stream_type} [{channel_id}]: {line_str}")
+
+            if "=" not in line_str:
+                continue
+
+            key, value = line_str.split("=", 1)
+            summary[key.strip()] = value.strip()
+
+            if key.strip() == "progress":
+                total_size_str = summary.get("total_size", "0")
+                out_time_str = summary.get("out_time", "0")
+
+                try:
+                    total_size = int(total_size_str)
+                except ValueError:
+                    total_size = 0
+
+                total_size_formatted = format_size(total_size)
+
+                # Convert out_time to seconds
+                out_time_seconds = parse_time(out_time_str)
+
+                # Calculate bitrate
+                if out_time_seconds > 0:
+                    bitrate = (total_size * 8) / out_time_seconds  # bits per second
+                    bitrate_kbps = bitrate / 1000  # Convert to kbps
+                    bitrate_formatted = f"{bitrate_kbps:.2f} kbps"
+                else:
+                    bitrate_formatted = "N/A"
+
+                # Calculate download speed
+                current_time = time.time()
+                if prev_total_size is not None and prev_time is not None:
+                    bytes_diff = total_size - prev_total_size
+                    time_diff = current_time - prev_time
+                    if time_diff > 0:
+                        instant_speed = bytes_diff / time_diff  # Bytes per second
+                        speed_samples.append(instant_speed)
+                        average_speed = sum(speed_samples) / len(speed_samples)
+                        download_speed_formatted = format_size(average_speed) + "/s"
+                    else:
+                        download_speed_formatted = "N/A"
+                    prev_total_size = total_size
+                    prev_time = current_time
+                else:
+                    download_speed_formatted = "N/A"
+                    prev_total_size = total_size
+                    prev_time = current_time
+
+                progress_update = {
+                    "bitrate": bitrate_formatted,
+                    "download_speed": download_speed_formatted,
+                    "total_size": total_size_formatted,
+                    "out_time": out_time_str,
+                }
+                if governor is not None:
+                    encode_speed = governor.observe(out_time_seconds, time.monotonic())
+                    if encode_speed is not None:
+                        progress_update["encode_speed"] = f"{encode_speed:.2f}x"
+
+                # Update progress data
+                async with channel_progress_lock:
+                    if channel_id in channel_progress:
+                        channel_progress[channel_id].update(progress_update)
+
+                summary.clear()
+        except Exception as e:
+            logger.error(f"Error occurred while reading stream for {channel_id}: {e}")
+            break
+
+
+def bitrate_to_kbps(value: Any) -> Optional[int]:
+    text = str(value or "").strip().lower()
+    if not text:
+        return None
+
+    try:
+        if text.endswith("m"):
+            return int(text[:-1]) * 1000
+        if text.endswith("k"):
+            return int(text[:-1])
+        return int(text)
+    except ValueError:
+        return None
+
+
+def calculate_bufsize(max_bitrate: str, fallback: str = "16000k") -> str:
+    max_val = bitrate_to_kbps(max_bitrate)
+    if max_val is None:
+        return fallback
+    return f"{max_val * 2}k"
+
+
+def capped_vbr_args(bitrate: str, max_bitrate: str, bufsize: str) -> List[str]:
+    bitrate_value = bitrate_to_kbps(bitrate)
+    max_bitrate_value = bitrate_to_kbps(max_bitrate)
+    if (
+        bitrate_value is not None
+        and max_bitrate_value is not None
+        and max_bitrate_value <= bitrate_value
+    ):
+        return []
+    return ["-maxrate", max_bitrate, "-bufsize", bufsize]
+
+
+def numeric_preset(value: Any, default: str) -> str:
+    text = str(value or default).strip()
+    return text if text.isdigit() else default
+
+
+def nvenc_preset(value: Any, default: str = "p4") -> str:
+    text = str(value or default).strip().lower()
+    if text.startswith("p") and len(text) == 2 and text[1].isdigit():
+        return text
+    if "fast" in text or "super" in text or "ultra" in text:
+        return "p1"
+    if "slow" in text:
+        return "p6"
+    return default
+
+
+def faster_preset(encoder: str, preset: Any) -> Optional[str]:
+    """The next faster preset for an encoder, or None if it has none."""
+    text = str(preset or "").strip().lower()
+    if encoder in {"libx265", "hevc_qsv", "av1_qsv"}:
+        ladder = X265_PRESETS if encoder == "libx265" else X265_PRESETS[1:-2]
+        if text not in ladder:
+            return None
+        index = ladder.index(text)
+        return ladder[index + 1] if index + 1 < len(ladder) else None
+    if encoder in {"hevc_nvenc", "av1_nvenc"}:
+        level = int(nvenc_preset(text)[1])
+        return f"p{level - 1}" if level > 1 else None
+    if encoder == "libsvtav1":
+        level = int(numeric_preset(text, "8"))
+        return str(min(level + 2, 13)) if level < 13 else None
+    if encoder == "libaom-av1":
+        level = int(numeric_preset(text, "6"))
+        return str(level + 1) if level < 8 else None
+    return None
+
+
+def audio_stripped_encoding_args(args: List[str]) -> List[str]:
+    stripped = []
+    skip_next = False
+    audio_options = {"-c:a", "-b:a"}
+    for arg in args:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in audio_options:
+            skip_next = True
+            continue
+        stripped.append(arg)
+    return stripped
+
+
+def summarize_probe_error(message: str) -> str:
+    for line in message.splitlines():
+        line = line.strip()
+        if line:
+            return line[:300]
+    return "no diagnostic output"
+
+
+@dataclass(frozen=True)
+class FfmpegCapabilities:
+    encoders: FrozenSet[str]
+    hwaccels: FrozenSet[str]
+    muxers: FrozenSet[str]
+    bsfs: FrozenSet[str]
+
+    def missing_for_encoder(self, encoder: str) -> Optional[str]:
+        """Why an encoder can't work with this ffmpeg, or None if it might."""
+        if encoder not in self.encoders:
+            return f"ffmpeg was built without the {encoder} encoder"
+        hwaccel = ENCODER_REQUIRED_HWACCELS.get(encoder)
+        if hwaccel is not None and hwaccel not in self.hwaccels:
+            return f"ffmpeg was built without {hwaccel} hardware acceleration"
+        return None
+
+    def missing_for_format(self, recording_format: str) -> Optional[str]:
+        muxer = OUTPUT_FORMAT_MUXERS.get(recording_format)
+        if muxer is not None and muxer not in self.muxers:
+            return f"ffmpeg was built without the {muxer} muxer"
+        if recording_format == "ts":
+            for bsf in ("h264_mp4toannexb", "aac_adtstoasc"):
+                if bsf not in self.bsfs:
+                    return f"ffmpeg was built without the {bsf} bitstream filter"
+        if recording_format == "webm" and "libopus" not in self.encoders:
+            return "ffmpeg was built without the libopus encoder"
+        return None
+
+
+def parse_ffmpeg_component_table(text: str) -> FrozenSet[str]:
+    """Names from `ffmpeg -encoders`/`-muxers`, listed below a dashed separator."""
+    names = set()
+    in_table = False
+    for line in text.splitlines():
+        parts = line.split()
+        if not in_table:
+            in_table = bool(parts) and set(parts[0]) == {"-"}
+            continue
+        if len(parts) >= 2:
+            names.update(parts[1].split(","))
+    return frozenset(names)
+
+
+def parse_ffmpeg_name_list(text: str) -> FrozenSet[str]:
+    """Names from `ffmpeg -hwaccels`/`-bsfs`, one per line below a header."""
+    return frozenset(
+        line.strip()
+        for line in text.splitlines()
+        if line.strip() and not line.rstrip().endswith(":")
+    )
+
+
+async def read_ffmpeg_listing(ffmpeg_path: Path, option: str) -> str:
+    process = await create_isolated_subprocess_exec(
+        str(ffmpeg_path),
+        "-hide_banner",
+        option,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(
+            process.communicate(), timeout=ENCODER_PROBE_TIMEOUT_SECONDS
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        await terminate_process(process, f"ffmpeg {option}")
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg {option} exited with code {process.returncode}")
+    return stdout.decode(errors="replace")
+
+
+async def scan_ffmpeg_capabilities(ffmpeg_path: Path) -> Optional[FfmpegCapabilities]:
+    try:
+        encoders, hwaccels, muxers, bsfs = await asyncio.gather(
+            *(
+                read_ffmpeg_listing(ffmpeg_path, option)
+                for option in ("-encoders", "-hwaccels", "-muxers", "-bsfs")
+            )
+        )
+    except (OSError, RuntimeError, asyncio.TimeoutError) as e:
+        logger.warning(f"Could not list ffmpeg capabilities; probing encoders directly: {e}")
+        return None
+    capabilities = FfmpegCapabilities(
+        encoders=parse_ffmpeg_component_table(encoders),
+        hwaccels=parse_ffmpeg_name_list(hwaccels),
+        muxers=parse_ffmpeg_component_table(muxers),
+        bsfs=parse_ffmpeg_name_list(bsfs),
+    )
+    hwaccel_text = ", ".join(sorted(capabilities.hwaccels)) or "none"
+    logger.info(
+        f"ffmpeg has {len(capabilities.encoders)} encoders and "
+        f"{len(capabilities.muxers)} muxers; hardware acceleration: {hwaccel_text}."
+    )
+    return capabilities
+
+
+ffmpeg_capability_scans: Dict[str, asyncio.Task] = {}
+
+
+async def get_ffmpeg_capabilities(ffmpeg_path: Path) -> Optional[FfmpegCapabilities]:
+    """Scan an ffmpeg binary once per run; None if it couldn't be scanned."""
+    task = ffmpeg_capability_scans.get(str(ffmpeg_path))
+    if task is None:
+        task = asyncio.create_task(scan_ffmpeg_capabilities(ffmpeg_path))
+        ffmpeg_capability_scans[str(ffmpeg_path)] = task
+    return await asyncio.shield(task)
+
+
+def hash_file(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hardware_encoder_identity() -> str:
+    """Describe the GPU driver and render device that hardware encoder probes ran on."""
+    parts = []
+    with contextlib.suppress(OSError):
+        # The first line names the NVIDIA kernel module version.
+        with open("/proc/driver/nvidia/version", encoding="utf-8") as f:
+            parts.append(f.readline().strip())
+    device = Path("/sys/class/drm") / VAAPI_RENDER_NODE / "device"
+    for name in ("vendor", "device"):
+        with contextlib.suppress(OSError):
+            parts.append((device / name).read_text(encoding="utf-8").strip())
+    with contextlib.suppress(OSError):
+        parts.append(os.path.basename(os.path.realpath(device / "driver")))
+    return "|".join(parts)
+
+
+def probe_entry_expired(entry: Any, now: float) -> bool:
+    if not isinstance(entry, dict):
+        return True
+    ttl = (
+        ENCODER_PROBE_CACHE_TTL_SECONDS
+        if entry.get("works")
+        else ENCODER_PROBE_FAILURE_TTL_SECONDS
+    )
+    return now - entry.get("probed_at", 0) > ttl
+
+
+class EncoderProbeCache:
+    """Encoder probe results kept across restarts, next to config.json.
+
+    Results are grouped per ffmpeg path and dropped as a group when the binary
+    (size, mtime, SHA-256) or the GPU driver/device changes.
+    """
+
+    def __init__(self, file_path: Path = ENCODER_PROBE_CACHE_FILE_PATH) -> None:
+        self.file_path = file_path
+        self._entries: Optional[Dict[str, Any]] = None
+        self._identities: Dict[Tuple[str, int, int], str] = {}
+        self._lock = asyncio.Lock()
+
+    async def _load(self) -> Dict[str, Any]:
+        async with self._lock:
+            if self._entries is None:
+                try:
+                    data = orjson.loads(await asyncio.to_thread(self.file_path.read_bytes))
+                except FileNotFoundError:
+                    data = {}
+                except (OSError, orjson.JSONDecodeError) as e:
+                    logger.warning(
+                        f"Ignoring unreadable encoder probe cache at {self.file_path}: {e}"
+                    )
+                    data = {}
+                self._entries = data if isinstance(data, dict) else {}
+            return self._entries
+
+    async def _identity(self, ffmpeg_path: str) -> str:
+        stat = await asyncio.to_thread(os.stat, ffmpeg_path)
+        stat_key = (ffmpeg_path, stat.st_size, stat.st_mtime_ns)
+        identity = self._identities.get(stat_key)
+        if identity is None:
+            file_hash, hardware = await asyncio.gather(
+                asyncio.to_thread(hash_file, Path(ffmpeg_path)),
+                asyncio.to_thread(hardware_encoder_identity),
+            )
+            identity = f"{stat.st_size}:{stat.st_mtime_ns}:{file_hash}:{hardware}"
+            self._identities[stat_key] = identity
+        return identity
+
+    async def _probes(self, ffmpeg_path: str) -> Dict[str, Any]:
+        identity = await self._identity(ffmpeg_path)
+        entries = await self._load()
+        group = entries.get(ffmpeg_path)
+        if not isinstance(group, dict) or group.get("identity") != identity:
+            # ffmpeg was upgraded or the GPU driver changed; earlier results don't apply.
+            group = entries[ffmpeg_path] = {"identity": identity, "probes": {}}
+        return group["probes"]
+
+    async def get(self, probe_cmd: List[str]) -> Optional[Tuple[bool, str]]:
+        try:
+            probes = await self._probes(probe_cmd[0])
+        except OSError:
+            return None
+        entry = probes.get(" ".join(probe_cmd[1:]))
+        if probe_entry_expired(entry, time.time()):
+            return None
+        return bool(entry.get("works")), str(entry.get("message", ""))
+
+    async def put(self, probe_cmd: List[str], result: Tuple[bool, str]) -> None:
+        try:
+            probes = await self._probes(probe_cmd[0])
+        except OSError:
+            return
+        now = time.time()
+        for key in [key for key, entry in probes.items() if probe_entry_expired(entry, now)]:
+            del probes[key]
+        probes[" ".join(probe_cmd[1:])] = {
+            "works": result[0],
+            "message": result[1],
+            "probed_at": now,
+        }
+        entries = await self._load()
+        try:
+            async with self._lock:
+                await asyncio.to_thread(save_json_secure, self.file_path, entries)
+        except OSError as e:
+            logger.warning(f"Failed to save the encoder probe cache: {e}")
+
+
+encoder_probe_cache = EncoderProbeCache()
+
+
+async def execute_encoder_probe(probe_cmd: List[str]) -> Tuple[bool, str, bool]:
+    """Run one probe; returns (works, message, conclusive)."""
+    try:
+        process = await create_isolated_subprocess_exec(
+            *probe_cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        return False, str(e), False
+
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(), timeout=ENCODER_PROBE_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        await terminate_process(process, "ffmpeg encoder probe")
+        message = f"Encoder probe timed out after {ENCODER_PROBE_TIMEOUT_SECONDS} seconds"
+        return False, message, False
+    except asyncio.CancelledError:
+        await terminate_process(process, "ffmpeg encoder probe")
+        raise
+    message = (stderr or stdout or b"").decode(errors="replace").strip()
+    return process.returncode == 0, message, True
+
+
+async def cached_encoder_probe(probe_cmd: List[str]) -> Tuple[bool, str]:
+    cached = await encoder_probe_cache.get(probe_cmd)
+    if cached is not None:
+        return cached
+    works, message, conclusive = await execute_encoder_probe(probe_cmd)
+    if conclusive:
+        # Timeouts and launch errors may be transient; probe again next time.
+        await encoder_probe_cache.put(probe_cmd, (works, message))
+    return works, message
+
+
+async def run_encoder_probe(probe_cmd: List[str]) -> Tuple[bool, str]:
+    """Run an encoder probe, joining an identical probe that is already running."""
+    key = tuple(probe_cmd)
+    task = encoder_probe_tasks.get(key)
+    if task is None:
+        task = asyncio.create_task(cached_encoder_probe(probe_cmd))
+        encoder_probe_tasks[key] = task
+        task.add_done_callback(lambda _: encoder_probe_tasks.pop(key, None))
+    # One caller giving up must not kill the probe the others are waiting on.
+    return await asyncio.shield(task)
+
+
+async def probe_av1_encoder(
+    ffmpeg_path: Path, av1_settings: Dict[str, Any]
+) -> Tuple[bool, str]:
+    encoder = str(av1_settings.get("encoder", "libsvtav1"))
+    cache_key = (
+        str(ffmpeg_path),
+        encoder,
+        str(av1_settings.get("bitrate", "2500k")),
+        str(av1_settings.get("max_bitrate", "10000k")),
+        str(av1_settings.get("preset", "8")),
+    )
+    if cache_key in AV1_ENCODER_PROBE_CACHE:
+        return AV1_ENCODER_PROBE_CACHE[cache_key]
+    capabilities = await get_ffmpeg_capabilities(ffmpeg_path)
+    missing = capabilities.missing_for_encoder(encoder) if capabilities else None
+    if missing is not None:
+        # No test encode needed for an encoder this ffmpeg doesn't have
+        AV1_ENCODER_PROBE_CACHE[cache_key] = (False, missing)
+        return AV1_ENCODER_PROBE_CACHE[cache_key]
+
+    input_args = [str(ffmpeg_path), "-hide_banner", "-loglevel", "error"]
+    if encoder == "av1_vaapi":
+        input_args.extend(
+            [
+                "-init_hw_device",
+                "vaapi=vaapi0:/dev/dri/renderD128",
+                "-filter_hw_device",
+                "vaapi0",
+            ]
+        )
+    input_args.extend(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=64x64:rate=1",
+            "-frames:v",
+            "1",
+        ]
+    )
+
+    video_args = audio_stripped_encoding_args(
+        build_av1_encoding_args(av1_settings, "mkv")
+    )
+    probe_cmd = input_args + video_args + ["-an", "-f", "null", "-"]
+
+    probe_result = await run_encoder_probe(probe_cmd)
+    if probe_result[0]:
+        # Failures are left to the probe cache, which retries them after a while.
+        AV1_ENCODER_PROBE_CACHE[cache_key] = probe_result
+    return probe_result
+
+
+async def resolve_av1_settings_for_recording(
+    av1_settings: Dict[str, Any], ffmpeg_path: Path
+) -> Dict[str, Any]:
+    if not av1_settings.get("enable", False):
+        return av1_settings
+
+    active_settings = dict(av1_settings)
+    selected_encoder = str(active_settings.get("encoder", "libsvtav1"))
+    encoder_works, probe_message = await probe_av1_encoder(ffmpeg_path, active_settings)
+    if encoder_works:
+        return active_settings
+
+    logger.warning(
+        f"AV1 encoder '{selected_encoder}' is not usable with the current "
+        f"FFmpeg/hardware setup: {summarize_probe_error(probe_message)}"
+    )
+
+    for fallback_encoder in AV1_SOFTWARE_FALLBACK_ENCODERS:
+        if fallback_encoder == selected_encoder:
+            continue
+        fallback_settings = dict(active_settings)
+        fallback_settings["encoder"] = fallback_encoder
+        fallback_works, fallback_message = await probe_av1_encoder(
+            ffmpeg_path, fallback_settings
+        )
+        if fallback_works:
+            logger.warning(
+                f"Using AV1 encoder '{fallback_encoder}' instead of "
+                f"'{selected_encoder}' for this recording."
+            )
+            return fallback_settings
+        logger.warning(
+            f"AV1 fallback encoder '{fallback_encoder}' is not usable: "
+            f"{summarize_probe_error(fallback_message)}"
+        )
+
+    disabled_settings = dict(active_settings)
+    disabled_settings["enable"] = False
+    logger.warning("No usable AV1 encoder found. Recording without AV1 encoding.")
+    return disabled_settings
+
+
+def build_hevc_probe_args(hevc_settings: Dict[str, Any]) -> List[str]:
+    encoder = hevc_settings.get("encoder", "libx265")
+    bitrate = hevc_settings.get("bitrate", "2500k")
+    max_bitrate = hevc_settings.get("max_bitrate", "10000k")
+    preset = str(hevc_settings.get("preset", "ultrafast")).strip()
+    bufsize = calculate_bufsize(max_bitrate)
+
+    if encoder == "hevc_nvenc":
+        return [
+            "-c:v",
+            "hevc_nvenc",
+            "-preset",
+            nvenc_preset(preset),
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-rc",
+            "vbr",
+        ]
+    if encoder == "hevc_qsv":
+        return [
+            "-c:v",
+            "hevc_qsv",
+            "-preset",
+            preset,
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+        ]
+    if encoder == "hevc_amf":
+        return [
+            "-c:v",
+            "hevc_amf",
+            "-usage",
+            "transcoding",
+            "-rc",
+            "vbr_peak",
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+        ]
+    if encoder == "hevc_vaapi":
+        return [
+            "-vf",
+            "format=nv12,hwupload",
+            "-c:v",
+            "hevc_vaapi",
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+        ]
+    if encoder == "hevc_videotoolbox":
+        return [
+            "-c:v",
+            "hevc_videotoolbox",
+            "-allow_sw",
+            "1",
+            "-realtime",
+            "true",
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+        ]
+    return [
+        "-c:v",
+        "libx265",
+        "-preset",
+        preset,
+        "-b:v",
+        bitrate,
+        "-maxrate",
+        max_bitrate,
+        "-bufsize",
+        bufsize,
+        "-tune",
+        "zerolatency",
+    ]
+
+
+async def probe_hevc_encoder(
+    ffmpeg_path: Path, hevc_settings: Dict[str, Any]
+) -> Tuple[bool, str]:
+    encoder = str(hevc_settings.get("encoder", "libx265"))
+    cache_key = (
+        str(ffmpeg_path),
+        encoder,
+        str(hevc_settings.get("bitrate", "2500k")),
+        str(hevc_settings.get("max_bitrate", "10000k")),
+        str(hevc_settings.get("preset", "ultrafast")),
+    )
+    if cache_key in HEVC_ENCODER_PROBE_CACHE:
+        return HEVC_ENCODER_PROBE_CACHE[cache_key]
+    capabilities = await get_ffmpeg_capabilities(ffmpeg_path)
+    missing = capabilities.missing_for_encoder(encoder) if capabilities else None
+    if missing is not None:
+        # No test encode needed for an encoder this ffmpeg doesn't have
+        HEVC_ENCODER_PROBE_CACHE[cache_key] = (False, missing)
+        return HEVC_ENCODER_PROBE_CACHE[cache_key]
+
+    input_args = [str(ffmpeg_path), "-hide_banner", "-loglevel", "error"]
+    if encoder == "hevc_vaapi":
+        input_args.extend(
+            [
+                "-init_hw_device",
+                "vaapi=vaapi0:/dev/dri/renderD128",
+                "-filter_hw_device",
+                "vaapi0",
+            ]
+        )
+    input_args.extend(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=64x64:rate=1",
+            "-frames:v",
+            "1",
+        ]
+    )
+
+    probe_cmd = input_args + build_hevc_probe_args(hevc_settings) + [
+        "-an",
+        "-f",
+        "null",
+        "-",
+    ]
+
+    probe_result = await run_encoder_probe(probe_cmd)
+    if probe_result[0]:
+        # Failures are left to the probe cache, which retries them after a while.
+        HEVC_ENCODER_PROBE_CACHE[cache_key] = probe_result
+    return probe_result
+
+
+async def resolve_hevc_settings_for_recording(
+    hevc_settings: Dict[str, Any], ffmpeg_path: Path
+) -> Dict[str, Any]:
+    if not hevc_settings.get("enable", False):
+        return hevc_settings
+
+    active_settings = dict(hevc_settings)
+    selected_encoder = str(active_settings.get("encoder", "libx265"))
+    encoder_works, probe_message = await probe_hevc_encoder(ffmpeg_path, active_settings)
+    if encoder_works:
+        return active_settings
+
+    logger.warning(
+        f"HEVC encoder '{selected_encoder}' is not usable with the current "
+        f"FFmpeg/hardware setup: {summarize_probe_error(probe_message)}"
+    )
+
+    for fallback_encoder in HEVC_SOFTWARE_FALLBACK_ENCODERS:
+        if fallback_encoder == selected_encoder:
+            continue
+        fallback_settings = dict(active_settings)
+        fallback_settings["encoder"] = fallback_encoder
+        fallback_works, fallback_message = await probe_hevc_encoder(
+            ffmpeg_path, fallback_settings
+        )
+        if fallback_works:
+            logger.warning(
+                f"Using HEVC encoder '{fallback_encoder}' instead of "
+                f"'{selected_encoder}' for this recording."
+            )
+            return fallback_settings
+        logger.warning(
+            f"HEVC fallback encoder '{fallback_encoder}' is not usable: "
+            f"{summarize_probe_error(fallback_message)}"
+        )
+
+    disabled_settings = dict(active_settings)
+    disabled_settings["enable"] = False
+    logger.warning("No usable HEVC encoder found. Recording without HEVC encoding.")
+    return disabled_settings
+
+
+def build_av1_encoding_args(
+    av1_settings: Dict[str, Any], recording_format: str
+) -> List[str]:
+    encoder = av1_settings.get("encoder", "libsvtav1")
+    bitrate = av1_settings.get("bitrate", "2500k")
+    max_bitrate = av1_settings.get("max_bitrate", "10000k")
+    preset = str(av1_settings.get("preset", "8")).strip()
+    bufsize = calculate_bufsize(max_bitrate)
+
+    if encoder == "libaom-av1":
+        encoding_args = [
+            "-c:v",
+            "libaom-av1",
+            "-cpu-used",
+            numeric_preset(preset, "6"),
+            "-b:v",
+            bitrate,
+            *capped_vbr_args(bitrate, max_bitrate, bufsize),
+        ]
+    elif encoder == "av1_nvenc":
+        encoding_args = [
+            "-c:v",
+            "av1_nvenc",
+            "-preset",
+            nvenc_preset(preset),
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-rc",
+            "vbr",
+        ]
+    elif encoder == "av1_qsv":
+        encoding_args = [
+            "-c:v",
+            "av1_qsv",
+            "-preset",
+            preset,
+            "-b:v",
+            bitrate,
+            *capped_vbr_args(bitrate, max_bitrate, bufsize),
+        ]
+    elif encoder == "av1_amf":
+        encoding_args = [
+            "-c:v",
+            "av1_amf",
+            "-usage",
+            "transcoding",
+            "-rc",
+            "vbr_peak",
+            "-b:v",
+            bitrate,
+            *capped_vbr_args(bitrate, max_bitrate, bufsize),
+        ]
+    elif encoder == "av1_vaapi":
+        encoding_args = [
+            "-vf",
+            "format=nv12,hwupload",
+            "-c:v",
+            "av1_vaapi",
+            "-rc_mode",
+            "VBR",
+            "-b:v",
+            bitrate,
+            *capped_vbr_args(bitrate, max_bitrate, bufsize),
+        ]
+    else:
+        encoding_args = [
+            "-c:v",
+            "libsvtav1",
+            "-preset",
+            numeric_preset(preset, "8"),
+            "-b:v",
+            bitrate,
+            "-svtav1-params",
+            "rc=1",
+        ]
+
+    if recording_format == "webm":
+        encoding_args.extend(["-c:a", "libopus", "-b:a", "128k"])
+    else:
+        encoding_args.extend(["-c:a", "copy"])
+
+    return encoding_args
+
+
+@dataclass(frozen=True)
+class ChannelRecordingConfig:
+    channel: Mapping[str, Any]
+    cookies: Mapping[str, str]
+    stream_segment_threads: int
+    hevc_settings: Mapping[str, Any]
+    av1_settings: Mapping[str, Any]
+    output_format: str
+    pipe_mode: str
+    recording_backend: str
+    ts_passthrough: Mapping[str, Any]
+    spool: Mapping[str, Any]
+    reconnect: Mapping[str, Any]
+    segment_thread_tuning: Mapping[str, Any]
+    hardware_sessions: Mapping[str, Any]
+    deferred_transcode: Mapping[str, Any]
+    preset_governor: Mapping[str, Any]
+    multi_output: Mapping[str, Any]
+    segmentation: Mapping[str, Any]
+    remux: Mapping[str, Any]
+
+    @classmethod
+    def from_settings(
+        cls, channel: Mapping[str, Any], settings: RecorderSettings
+    ) -> "ChannelRecordingConfig":
+        return cls(
+            channel=channel,
+            cookies=settings.cookies,
+            stream_segment_threads=settings.stream_segment_threads,
+            hevc_settings=settings.hevc_settings,
+            av1_settings=settings.av1_settings,
+            output_format=settings.output_format,
+            pipe_mode=settings.pipe_mode,
+            recording_backend=settings.recording_backend,
+            ts_passthrough=settings.ts_passthrough,
+            spool=settings.spool,
+            reconnect=settings.reconnect,
+            segment_thread_tuning=settings.segment_thread_tuning,
+            hardware_sessions=settings.hardware_sessions,
+            deferred_transcode=settings.deferred_transcode,
+            preset_governor=settings.preset_governor,
+            multi_output=settings.multi_output,
+            segmentation=settings.segmentation,
+            remux=settings.remux,
+        )
+
+    def changed_fields(self, other: "ChannelRecordingConfig") -> List[str]:
+        changed = [
+            key
+            for key in sorted(set(self.channel) | set(other.channel))
+            if self.channel.get(key) != other.channel.get(key)
+        ]
+        for field in dataclass_fields(self):
+            if field.name != "channel" and getattr(self, field.name) != getattr(
+                other, field.name
+            ):
+                changed.append(field.name)
+        return changed
+
+
+def diff_channel_configs(
+    old: Mapping[str, ChannelRecordingConfig],
+    new: Mapping[str, ChannelRecordingConfig],
+) -> Tuple[Set[str], Set[str], Dict[str, List[str]]]:
+    added = set(new) - set(old)
+    removed = set(old) - set(new)
+    updated = {}
+    for channel_id in set(old) & set(new):
+        changed = old[channel_id].changed_fields(new[channel_id])
+        if changed:
+            updated[channel_id] = changed
+    return added, removed, updated
+
+
+class ActiveRecording:
+    """A running recording plus any settings waiting for its next reconnect."""
+
+    def __init__(self, config: ChannelRecordingConfig) -> None:
+        self.config = config
+        self.pending_config: Optional[ChannelRecordingConfig] = None
+        self.task: Optional[asyncio.Task] = None
+        # Set when the file was ended on purpose while the channel is still live,
+        # so the next file starts right away instead of after the rescan interval.
+        self.restart_now = False
+
+    def stage(self, config: ChannelRecordingConfig) -> List[str]:
+        changed = self.config.changed_fields(config)
+        self.pending_config = config if changed else None
+        return changed
+
+    def apply_pending(self) -> List[str]:
+        if self.pending_config is None:
+            return []
+        changed = self.config.changed_fields(self.pending_config)
+        self.config, self.pending_config = self.pending_config, None
+        return changed
+
+
+def recording_format_for(output_format: str, av1_settings: Mapping[str, Any]) -> str:
+    recording_format = normalize_output_format(output_format)
+    if av1_settings.get("enable") and recording_format == "ts":
+        return "mkv"
+    return recording_format
+
+
+def encoder_session_family(encoder: str) -> Optional[str]:
+    """The hardware family whose sessions an encoder uses, e.g. hevc_nvenc -> nvenc."""
+    family = encoder.rsplit("_", 1)[-1]
+    return family if family in DEFAULT_HARDWARE_SESSION_LIMITS else None
+
+
+class HardwareSessionScheduler:
+    """Counts hardware encoder sessions per family against configured limits.
+
+    NVENC, QSV and AMF refuse sessions past a driver limit and ffmpeg only
+    finds out once it is recording, so sessions are granted up front instead.
+    Limits are per machine: with several recording workers each one counts
+    only its own sessions, so every worker gets a fixed share of the limit.
+    """
+
+    def __init__(self) -> None:
+        self.active: Dict[str, int] = {}
+
+    @staticmethod
+    def worker_limit(limit: Optional[int]) -> Optional[int]:
+        """This worker's share of a limit; the shares add up to the limit."""
+        shard = worker_shard_from_env()
+        if limit is None or shard is None:
+            return limit
+        index, count = shard
+        return limit // count + (1 if index < limit % count else 0)
+
+    def available(self, family: str, limit: Optional[int]) -> bool:
+        limit = self.worker_limit(limit)
+        return limit is None or self.active.get(family, 0) < limit
+
+    def try_acquire(self, family: str, limit: Optional[int]) -> bool:
+        if not self.available(family, limit):
+            return False
+        self.active[family] = self.active.get(family, 0) + 1
+        return True
+
+    def release(self, family: str) -> None:
+        remaining = self.active.get(family, 0) - 1
+        if remaining > 0:
+            self.active[family] = remaining
+        else:
+            self.active.pop(family, None)
+
+
+hardware_sessions = HardwareSessionScheduler()
+
+
+async def claim_encoder_session(
+    config: "ChannelRecordingConfig",
+    recording_format: str,
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+    ffmpeg_path: Path,
+) -> Tuple[Optional[str], Optional[str], Mapping[str, Any], Mapping[str, Any]]:
+    """Take a hardware encoder session for a recording, falling back when none is free.
+
+    Returns (family held, family that was full, HEVC settings, AV1 settings).
+    """
+    limits = config.hardware_sessions
+    if av1_settings.get("enable"):
+        selected, fallbacks, probe = (
+            av1_settings,
+            AV1_SOFTWARE_FALLBACK_ENCODERS,
+            probe_av1_encoder,
+        )
+    elif hevc_settings.get("enable") and recording_format != "webm":
+        selected, fallbacks, probe = (
+            hevc_settings,
+            HEVC_SOFTWARE_FALLBACK_ENCODERS,
+            probe_hevc_encoder,
+        )
+    else:
+        return None, None, hevc_settings, av1_settings
+
+    family = encoder_session_family(str(selected.get("encoder", "")))
+    if not limits.get("enable") or family is None:
+        return None, None, hevc_settings, av1_settings
+    if hardware_sessions.try_acquire(family, limits["max_sessions"].get(family)):
+        return family, None, hevc_settings, av1_settings
+
+    fallback_settings = dict(selected)
+    fallback_settings["enable"] = False
+    if limits["fallback"] == "software":
+        for encoder in fallbacks:
+            candidate = {**selected, "encoder": encoder}
+            works, _ = await probe(ffmpeg_path, candidate)
+            if works:
+                fallback_settings = candidate
+                break
+    used = (
+        f"software encoder {fallback_settings['encoder']}"
+        if fallback_settings["enable"]
+        else "stream copy"
+    )
+    logger.warning(
+        f"All {family} encoder sessions are in use; recording "
+        f"{config.channel.get('name', 'Unknown')} with {used}."
+    )
+    if selected is av1_settings:
+        return None, family, hevc_settings, fallback_settings
+    return None, family, fallback_settings, av1_settings
+
+
+def recording_format_fallbacks(av1_settings: Mapping[str, Any]) -> Tuple[str, ...]:
+    """Formats to try, in order, when ffmpeg can't write the configured one."""
+    return ("mkv",) if av1_settings.get("enable") else ("mkv", "ts")
+
+
+def writable_recording_format(
+    recording_format: str,
+    av1_settings: Mapping[str, Any],
+    capabilities: Optional[FfmpegCapabilities],
+) -> Tuple[str, Optional[str]]:
+    """Return the format ffmpeg can write, and why the requested one can't be."""
+    missing = capabilities.missing_for_format(recording_format) if capabilities else None
+    if missing is None:
+        return recording_format, None
+    for fallback_format in recording_format_fallbacks(av1_settings):
+        if not capabilities.missing_for_format(fallback_format):
+            return fallback_format, missing
+    return recording_format, missing
+
+
+def warm_ffmpeg_key(
+    recording_format: str,
+    output_dir: Path,
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+) -> Tuple[Any, ...]:
+    """Everything a recording ffmpeg command depends on besides the file name.
+
+    The settings are the resolved ones, after probing and fallbacks, so a warm
+    ffmpeg is only adopted by a recording that would build the same command.
+    """
+    return (
+        recording_format,
+        str(output_dir),
+        tuple(sorted(hevc_settings.items())),
+        tuple(sorted(av1_settings.items())),
+    )
+
+
+async def planned_warm_ffmpeg(
+    config: "ChannelRecordingConfig", ffmpeg_path: Path
+) -> Optional[Tuple[str, Mapping[str, Any], Mapping[str, Any]]]:
+    """The (format, HEVC, AV1) a copy of record_stream would start ffmpeg with.
+
+    Returns None for setups whose recordings never adopt a warm ffmpeg.
+    """
+    if (
+        config.multi_output.get("enable")
+        or config.segmentation.get("enable")
+        or deferred_transcode_formats(config) is not None
+        or config.pipe_mode == "direct"
+    ):
+        return None
+    recording_format, _ = writable_recording_format(
+        recording_format_for(config.output_format, config.av1_settings),
+        config.av1_settings,
+        await get_ffmpeg_capabilities(ffmpeg_path),
+    )
+    if (
+        config.ts_passthrough.get("enable")
+        and recording_format == "ts"
+        and not config.hevc_settings.get("enable")
+        and not config.av1_settings.get("enable")
+    ):
+        # The stream is written without ffmpeg.
+        return None
+    hevc_settings, av1_settings = await resolve_encoder_settings(
+        config.hevc_settings, config.av1_settings, ffmpeg_path
+    )
+    return recording_format, hevc_settings, av1_settings
+
+
+async def bind_warm_output(
+    process: asyncio.subprocess.Process, placeholder_path: Path, output_path: Path
+) -> None:
+    """Give an adopted warm ffmpeg's output its real name once ffmpeg creates it.
+
+    ffmpeg probes its input before opening the output, so the placeholder only
+    appears after the first data arrives. Renaming the open file is fine on POSIX.
+    """
+    while process.returncode is None and not placeholder_path.exists():
+        await asyncio.sleep(WARM_OUTPUT_POLL_SECONDS)
+    with contextlib.suppress(FileNotFoundError):
+        placeholder_path.replace(output_path)
+
+
+@dataclass
+class WarmFfmpeg:
+    process: asyncio.subprocess.Process
+    key: Tuple[Any, ...]
+    placeholder_path: Path
+    started_at: float
+
+
+class WarmProcessPool:
+    """Keeps ffmpeg and pre-imported streamlink processes ready for channels about to go live."""
+
+    def __init__(self) -> None:
+        self.settings: Mapping[str, Any] = normalize_warm_pool_settings(None)
+        self._ffmpeg: Dict[str, WarmFfmpeg] = {}
+        self._streamlink: List[asyncio.subprocess.Process] = []
+
+    async def _discard_ffmpeg(self, warm: WarmFfmpeg) -> None:
+        await terminate_process(warm.process, "warm ffmpeg")
+        with contextlib.suppress(OSError):
+            warm.placeholder_path.unlink(missing_ok=True)
+
+    async def _spawn_ffmpeg(
+        self, config: "ChannelRecordingConfig", ffmpeg_path: Path
+    ) -> Optional[WarmFfmpeg]:
+        channel = config.channel
+        # Encoder probes run here, so they are cached by the time the channel goes live.
+        plan = await planned_warm_ffmpeg(config, ffmpeg_path)
+        if plan is None:
+            return None
+        recording_format, hevc_settings, av1_settings = plan
+        output_dir = resolve_output_dir(channel.get("output_dir", "."))
+        key = warm_ffmpeg_key(recording_format, output_dir, hevc_settings, av1_settings)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        placeholder_path = output_dir / (
+            f".warm-{channel['id']}-{time.monotonic_ns()}.{recording_format}.part"
+        )
+        command = build_recording_ffmpeg_command(
+            ffmpeg_path,
+            recording_format,
+            hevc_settings,
+            av1_settings,
+            channel.get("name", "Unknown"),
+            placeholder_path,
+        )
+        process = await create_isolated_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        logger.debug(f"Pre-spawned ffmpeg for {channel.get('name', 'Unknown')}.")
+        return WarmFfmpeg(process, key, placeholder_path, time.monotonic())
+
+    async def take_ffmpeg(
+        self, channel_id: str, key: Tuple[Any, ...]
+    ) -> Optional[WarmFfmpeg]:
+        warm = self._ffmpeg.pop(channel_id, None)
+        if warm is None:
+            return None
+        if warm.key == key and warm.process.returncode is None:
+            return warm
+        await self._discard_ffmpeg(warm)
+        return None
+
+    def take_streamlink(self) -> Optional[asyncio.subprocess.Process]:
+        while self._streamlink:
+            process = self._streamlink.pop(0)
+            if process.returncode is None:
+                return process
+        return None
+
+    async def refresh(
+        self,
+        candidates: Mapping[str, "ChannelRecordingConfig"],
+        ffmpeg_path: Path,
+        streamlink_spares: int,
+    ) -> None:
+        now = time.monotonic()
+        for channel_id, warm in list(self._ffmpeg.items()):
+            config = candidates.get(channel_id)
+            plan = (
+                await planned_warm_ffmpeg(config, ffmpeg_path) if config is not None else None
+            )
+            if (
+                plan is None
+                or warm.process.returncode is not None
+                or now - warm.started_at > WARM_FFMPEG_MAX_AGE_SECONDS
+                or warm.key
+                != warm_ffmpeg_key(
+                    plan[0],
+                    resolve_output_dir(config.channel.get("output_dir", ".")),
+                    plan[1],
+                    plan[2],
+                )
+            ):
+                del self._ffmpeg[channel_id]
+                await self._discard_ffmpeg(warm)
+
+        # A renamed placeholder keeps its open handle only on POSIX.
+        if os.name != "nt":
+            for channel_id, config in candidates.items():
+                if channel_id in self._ffmpeg:
+                    continue
+                if len(self._ffmpeg) >= self.settings["max_ffmpeg"]:
+                    break
+                try:
+                    warm = await self._spawn_ffmpeg(config, ffmpeg_path)
+                    if warm is not None:
+                        self._ffmpeg[channel_id] = warm
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Could not pre-spawn ffmpeg for {channel_id}: {e}")
+
+        self._streamlink = [p for p in self._streamlink if p.returncode is None]
+        while len(self._streamlink) > streamlink_spares:
+            await terminate_process(self._streamlink.pop(), "warm streamlink")
+        while len(self._streamlink) < streamlink_spares:
+            try:
+                self._streamlink.append(
+                    await create_isolated_subprocess_exec(
+                        sys.executable,
+                        "-c",
+                        STREAMLINK_WARM_BOOTSTRAP,
+                        stdin=asyncio.subprocess.PIPE,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                    )
+                )
+            except OSError as e:
+                logger.debug(f"Could not pre-spawn streamlink: {e}")
+                break
+
+    async def close(self) -> None:
+        warm_ffmpeg, self._ffmpeg = list(self._ffmpeg.values()), {}
+        warm_streamlink, self._streamlink = self._streamlink, []
+        await asyncio.gather(
+            *(self._discard_ffmpeg(warm) for warm in warm_ffmpeg),
+            *(terminate_process(process, "warm streamlink") for process in warm_streamlink),
+            return_exceptions=True,
+        )
+
+
+async def resolve_encoder_settings(
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+    ffmpeg_path: Path,
+) -> Tuple[Mapping[str, Any], Mapping[str, Any]]:
+    """Probe the configured encoders and return the (HEVC, AV1) settings to record with."""
+    active_av1_settings = await resolve_av1_settings_for_recording(
+        av1_settings, ffmpeg_path
+    )
+    if active_av1_settings.get("enable", False):
+        return hevc_settings, active_av1_settings
+    active_hevc_settings = await resolve_hevc_settings_for_recording(
+        hevc_settings, ffmpeg_path
+    )
+    return active_hevc_settings, active_av1_settings
+
+
+async def probe_configured_encoders(
+    settings: RecorderSettings, ffmpeg_path: Path
+) -> None:
+    """Warm the probe caches at startup so the first go-live doesn't wait on ffmpeg."""
+    await get_ffmpeg_capabilities(ffmpeg_path)
+    if settings.av1_settings.get("enable"):
+        probe, selected, fallbacks = (
+            probe_av1_encoder,
+            dict(settings.av1_settings),
+            AV1_SOFTWARE_FALLBACK_ENCODERS,
+        )
+        selected.setdefault("encoder", "libsvtav1")
+    elif settings.hevc_settings.get("enable"):
+        probe, selected, fallbacks = (
+            probe_hevc_encoder,
+            dict(settings.hevc_settings),
+            HEVC_SOFTWARE_FALLBACK_ENCODERS,
+        )
+        selected.setdefault("encoder", "libx265")
+    else:
+        return
+
+    # The fallbacks are probed alongside in case the selected encoder fails.
+    encoders = list(dict.fromkeys([selected["encoder"], *fallbacks]))
+    results = await asyncio.gather(
+        *(probe(ffmpeg_path, {**selected, "encoder": encoder}) for encoder in encoders)
+    )
+    for encoder, (works, _) in zip(encoders, results):
+        logger.debug(f"Encoder probe for {encoder}: {'usable' if works else 'not usable'}.")
+
+
+def build_hevc_encoding_args(
+    hevc_settings: Mapping[str, Any], recording_format: str
+) -> List[str]:
+    encoder = hevc_settings.get("encoder", "libx265")
+    bitrate = hevc_settings.get("bitrate", "2500k")
+    max_bitrate = hevc_settings.get(
+        "max_bitrate", "10000k"
+    )
+    preset = hevc_settings.get("preset", "ultrafast")
+
+    try:
+        max_val = int(max_bitrate.lower().replace("k", ""))
+        bufsize = f"{max_val * 2}k"
+    except ValueError:
+        bufsize = "16000k"
+
+    common_hevc_args = []
+    if recording_format == "ts":
+        common_hevc_args.extend(
+            [
+                "-bsf:a",
+                "aac_adtstoasc",
+                "-bsf:v",
+                "hevc_mp4toannexb",
+            ]
+        )
+
+    if encoder == "libx265":
+        x265_params = (
+            "rc-lookahead=20:b-adapt=2:bframes=3:scenecut=40"
+        )
+        encoding_args = [
+            "-c:v",
+            "libx265",
+            "-preset",
+            preset,
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-tune",
+            "zerolatency",
+            "-tag:v",
+            "hvc1",
+            "-x265-params",
+            x265_params,
+            "-c:a",
+            "copy",
+        ]
+
+    elif encoder == "hevc_nvenc":
+        nv_preset = "p4"
+        if (
+            "fast" in preset
+            or "super" in preset
+            or "ultra" in preset
+        ):
+            nv_preset = "p1"
+        elif "slow" in preset:
+            nv_preset = "p6"
+        elif (
+            preset.startswith("p")
+            and len(preset) == 2
+            and preset[1].isdigit()
+        ):
+            nv_preset = preset
+
+        encoding_args = [
+            "-c:v",
+            "hevc_nvenc",
+            "-preset",
+            nv_preset,
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-rc",
+            "vbr",
+            "-spatial-aq",
+            "1",
+            "-tag:v",
+            "hvc1",
+            "-c:a",
+            "copy",
         ]
-    if encoder == "hevc_vaapi":
-        return [
+
+    elif encoder == "hevc_qsv":
+        encoding_args = [
+            "-c:v",
+            "hevc_qsv",
+            "-preset",
+            preset,
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-tag:v",
+            "hvc1",
+            "-c:a",
+            "copy",
+        ]
+
+    elif encoder == "hevc_amf":
+        encoding_args = [
+            "-c:v",
+            "hevc_amf",
+            "-usage",
+            "transcoding",
+            "-rc",
+            "vbr_peak",
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-tag:v",
+            "hvc1",
+            "-c:a",
+            "copy",
+        ]
+        if "fast" in preset:
+            encoding_args.extend(["-quality", "speed"])
+        else:
+            encoding_args.extend(["-quality", "balanced"])
+
+    elif encoder == "hevc_vaapi":
+        encoding_args = [
             "-vf",
             "format=nv12,hwupload",
             "-c:v",
@@ -1078,9 +4319,14 @@ def build_hevc_probe_args(hevc_settings: Dict[str, Any]) -> List[str]:
             max_bitrate,
             "-bufsize",
             bufsize,
+            "-tag:v",
+            "hvc1",
+            "-c:a",
+            "copy",
         ]
-    if encoder == "hevc_videotoolbox":
-        return [
+
+    elif encoder == "hevc_videotoolbox":
+        encoding_args = [
             "-c:v",
             "hevc_videotoolbox",
             "-allow_sw",
@@ -1093,914 +4339,2197 @@ def build_hevc_probe_args(hevc_settings: Dict[str, Any]) -> List[str]:
             max_bitrate,
             "-bufsize",
             bufsize,
+            "-tag:v",
+            "hvc1",
+            "-c:a",
+            "copy",
+        ]
+
+    else:
+        x265_params = (
+            "rc-lookahead=20:b-adapt=2:bframes=3:scenecut=40"
+        )
+        encoding_args = [
+            "-c:v",
+            "libx265",
+            "-preset",
+            preset,
+            "-b:v",
+            bitrate,
+            "-maxrate",
+            max_bitrate,
+            "-bufsize",
+            bufsize,
+            "-tune",
+            "zerolatency",
+            "-tag:v",
+            "hvc1",
+            "-x265-params",
+            x265_params,
+            "-c:a",
+            "copy",
         ]
+
+    encoding_args.extend(common_hevc_args)
+    return encoding_args
+
+
+def hardware_device_args(
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+    recording_format: str,
+) -> List[str]:
+    """Input options that VAAPI encoders need before the input is opened."""
+    if av1_settings.get("enable", False):
+        vaapi = av1_settings.get("encoder", "libsvtav1") == "av1_vaapi"
+    else:
+        vaapi = (
+            hevc_settings.get("enable", False)
+            and recording_format != "webm"
+            and hevc_settings.get("encoder", "libx265") == "hevc_vaapi"
+        )
+    if not vaapi:
+        return []
+    # Attempt to use the default render device
     return [
-        "-c:v",
-        "libx265",
-        "-preset",
-        preset,
-        "-b:v",
-        bitrate,
-        "-maxrate",
-        max_bitrate,
-        "-bufsize",
-        bufsize,
-        "-tune",
-        "zerolatency",
+        "-init_hw_device",
+        "vaapi=vaapi0:/dev/dri/renderD128",
+        "-filter_hw_device",
+        "vaapi0",
+    ]
+
+
+def segment_duration(
+    segmentation: Mapping[str, Any],
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+) -> int:
+    """Segment length in seconds, shortened so encoded segments stay under max_size_mb."""
+    seconds = segmentation["segment_seconds"]
+    if av1_settings.get("enable"):
+        max_kbps = bitrate_to_kbps(av1_settings.get("max_bitrate"))
+    elif hevc_settings.get("enable"):
+        max_kbps = bitrate_to_kbps(hevc_settings.get("max_bitrate"))
+    else:
+        # A copied stream's bitrate isn't known up front, so only the duration applies.
+        max_kbps = None
+    if segmentation["max_size_mb"] and max_kbps:
+        size_seconds = segmentation["max_size_mb"] * 1024 * 1024 * 8 // (max_kbps * 1000)
+        seconds = max(10, min(seconds, size_seconds))
+    return seconds
+
+
+class SegmentedOutput:
+    """One ffmpeg output split into keyframe-aligned segments.
+
+    ffmpeg's segment muxer appends each segment it closes to a CSV list. The
+    segments are renamed from .part as they appear there and added to an index
+    file, so downstream jobs can pick them up while the broadcast is running.
+    """
+
+    def __init__(
+        self,
+        temp_output_path: Path,
+        segment_seconds: int,
+        on_segment: Optional[Callable[[Path], Any]] = None,
+    ) -> None:
+        base_name, extension = os.path.splitext(temp_output_path.name[: -len(".part")])
+        self.directory = temp_output_path.parent
+        self.segment_seconds = segment_seconds
+        self.leftover_pattern = (
+            f"{glob.escape(base_name)}.[0-9]*{glob.escape(extension)}.part"
+        )
+        self.pattern_path = self.directory / (
+            f"{base_name.replace('%', '%%')}.%03d{extension}.part"
+        )
+        self.list_path = self.directory / f"{base_name}.segments.csv.part"
+        self.index_path = unique_path(self.directory / f"{base_name}.index.csv")
+        self.on_segment = on_segment
+        self.segments: List[Path] = []
+        self._list_offset = 0
+        self._lock = asyncio.Lock()
+
+    def output_args(self, recording_format: str) -> List[str]:
+        return [
+            "-f",
+            "segment",
+            "-segment_format",
+            OUTPUT_FORMAT_MUXERS[recording_format],
+            "-segment_time",
+            str(self.segment_seconds),
+            "-reset_timestamps",
+            "1",
+            "-segment_list",
+            str(self.list_path),
+            "-segment_list_type",
+            "csv",
+            str(self.pattern_path),
+        ]
+
+    def keyframe_args(self) -> List[str]:
+        """Encoder options that put a keyframe where each segment should start."""
+        return ["-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})"]
+
+    async def collect(self) -> None:
+        """Finalize the segments ffmpeg has closed since the last call."""
+        async with self._lock:
+            try:
+                async with aiofiles.open(self.list_path, "r", encoding="utf-8") as file:
+                    await file.seek(self._list_offset)
+                    text = await file.read()
+            except FileNotFoundError:
+                return
+            # Only whole lines; ffmpeg may be halfway through writing the next one.
+            complete = text[: text.rfind("\n") + 1]
+            self._list_offset += len(complete.encode("utf-8"))
+            finalized = []
+            index = io.StringIO()
+            index_writer = csv.writer(index, lineterminator="\n")
+            for row in csv.reader(complete.splitlines()):
+                if not row or not row[0].endswith(".part"):
+                    continue
+                final_path = await asyncio.to_thread(self._finalize_segment, row[0])
+                if final_path is None:
+                    continue
+                finalized.append(final_path)
+                index_writer.writerow([final_path.name, *row[1:3]])
+            if not finalized:
+                return
+            self.segments.extend(finalized)
+            async with aiofiles.open(
+                self.index_path, "a", encoding="utf-8", newline=""
+            ) as index_file:
+                await index_file.write(index.getvalue())
+        for segment in finalized:
+            logger.info(f"Recording segment saved to {segment}")
+            if self.on_segment is not None:
+                await self.on_segment(segment)
+
+    def _finalize_segment(self, name: str) -> Optional[Path]:
+        """Rename a closed segment from .part; empty ones are deleted instead."""
+        temp_path = self.directory / name
+        try:
+            if temp_path.stat().st_size == 0:
+                temp_path.unlink(missing_ok=True)
+                return None
+        except FileNotFoundError:
+            return None
+        final_path = unique_path(temp_path.with_name(name[: -len(".part")]))
+        temp_path.replace(final_path)
+        return final_path
+
+    def _remove_leftovers(self) -> List[Path]:
+        """Delete the list and empty unfinished segments; return the non-empty ones."""
+        leftovers = []
+        for leftover in self.directory.glob(self.leftover_pattern):
+            if leftover.stat().st_size == 0:
+                leftover.unlink(missing_ok=True)
+            else:
+                leftovers.append(leftover)
+        self.list_path.unlink(missing_ok=True)
+        return leftovers
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(SEGMENT_LIST_POLL_SECONDS)
+            await self.collect()
+
+    async def finish(self, returncode: Optional[int], output_name: str) -> None:
+        """Finalize the remaining segments once ffmpeg has exited."""
+        await self.collect()
+        for leftover in await asyncio.to_thread(self._remove_leftovers):
+            logger.warning(
+                f"Leaving incomplete recording segment at {leftover} "
+                f"because the {output_name} exited with return code {returncode}."
+            )
+
+
+@dataclass
+class RenditionOutput:
+    """A transcoded file written by the same ffmpeg as the copy archive."""
+
+    name: str
+    recording_format: str
+    hevc_settings: Mapping[str, Any]
+    av1_settings: Mapping[str, Any]
+    height: int
+    temp_output_path: Path
+    final_output_path: Path
+    segments: Optional[SegmentedOutput] = None
+
+
+def scaled_encoding_args(encoding_args: List[str], height: int) -> List[str]:
+    """Scale to the given height ahead of any filter the encoder already needs."""
+    if not height:
+        return encoding_args
+    scale = f"scale=-2:{height}"
+    if "-vf" in encoding_args:
+        index = encoding_args.index("-vf") + 1
+        encoding_args = list(encoding_args)
+        encoding_args[index] = f"{scale},{encoding_args[index]}"
+        return encoding_args
+    return ["-vf", scale, *encoding_args]
+
+
+def recording_output_args(
+    recording_format: str,
+    output_path: Path,
+    segments: Optional[SegmentedOutput] = None,
+) -> List[str]:
+    """Muxer options and path for one output of the recording ffmpeg."""
+    output_args = []
+    if recording_format in {"ts", "mkv"}:
+        output_args.append("-copy_unknown")
+
+    if segments is not None:
+        output_args.extend(segments.output_args(recording_format))
+    elif recording_format == "ts":
+        output_args.extend(
+            [
+                "-f",
+                "mpegts",
+                "-mpegts_flags",
+                "resend_headers",
+                "-mpegts_copyts",
+                "0",
+                "-avoid_negative_ts",
+                "make_zero",
+                "-muxpreload",
+                "0",
+                "-muxdelay",
+                "0",
+                "-avioflags",
+                "direct",
+                str(output_path),
+            ]
+        )
+    elif recording_format == "mkv":
+        output_args.extend(["-f", "matroska", str(output_path)])
+    elif recording_format == "webm":
+        output_args.extend(["-f", "webm", str(output_path)])
+    return output_args
+
+
+def build_recording_ffmpeg_command(
+    ffmpeg_path: Path,
+    recording_format: str,
+    active_hevc_settings: Mapping[str, Any],
+    active_av1_settings: Mapping[str, Any],
+    channel_name: str,
+    temp_output_path: Path,
+    renditions: Sequence[RenditionOutput] = (),
+    segments: Optional[SegmentedOutput] = None,
+) -> List[str]:
+    """Build the ffmpeg command; the settings come from resolve_encoder_settings.
+
+    Each rendition is added as another output, so one demux of the input feeds
+    the main recording and every transcoded rendition.
+    """
+    encoding_args = []
+
+    enable_av1 = active_av1_settings.get("enable", False)
+    enable_hevc = (
+        active_hevc_settings.get("enable", False)
+        and not enable_av1
+    )
+
+    device_args = hardware_device_args(
+        active_hevc_settings, active_av1_settings, recording_format
+    )
+    for rendition in renditions:
+        device_args = device_args or hardware_device_args(
+            rendition.hevc_settings, rendition.av1_settings, rendition.recording_format
+        )
+
+    base_input_args = [
+        str(ffmpeg_path),
+        *device_args,
+        "-fflags",
+        "+genpts+discardcorrupt",
+        "-i",
+        "pipe:0",
+        "-y",
+    ]
+
+    metadata_args = [
+        "-map_metadata:s:a",
+        "0:s:a",
+        "-map_metadata:s:v",
+        "0:s:v",
+    ]
+
+    if enable_av1:
+        encoding_args = build_av1_encoding_args(
+            active_av1_settings, recording_format
+        )
+        encoding_args.extend(metadata_args)
+    elif recording_format == "webm":
+        if enable_hevc:
+            logger.warning(
+                f"HEVC settings are ignored for WebM output on {channel_name}."
+            )
+        encoding_args = [
+            "-c:v",
+            "libvpx-vp9",
+            "-deadline",
+            "realtime",
+            "-cpu-used",
+            "5",
+            "-b:v",
+            "0",
+            "-crf",
+            "32",
+            "-c:a",
+            "libopus",
+            "-b:a",
+            "128k",
+        ]
+
+    elif enable_hevc:
+        encoding_args = build_hevc_encoding_args(
+            active_hevc_settings, recording_format
+        )
+        encoding_args.extend(metadata_args)
+
+    else:
+        encoding_args = ["-c", "copy", *metadata_args]
+        if recording_format == "ts":
+            encoding_args.extend(
+                [
+                    "-bsf:v",
+                    "h264_mp4toannexb",
+                    "-bsf:a",
+                    "aac_adtstoasc",
+                ]
+            )
+
+    if segments is not None and (enable_av1 or enable_hevc or recording_format == "webm"):
+        encoding_args.extend(segments.keyframe_args())
+    output_args = [
+        "-progress",
+        "pipe:2",
+        *recording_output_args(recording_format, temp_output_path, segments),
+    ]
+    for rendition in renditions:
+        if rendition.av1_settings.get("enable", False):
+            rendition_args = build_av1_encoding_args(
+                rendition.av1_settings, rendition.recording_format
+            )
+        else:
+            rendition_args = build_hevc_encoding_args(
+                rendition.hevc_settings, rendition.recording_format
+            )
+        if rendition.segments is not None:
+            rendition_args.extend(rendition.segments.keyframe_args())
+        output_args.extend(
+            [
+                *scaled_encoding_args(rendition_args, rendition.height),
+                *metadata_args,
+                *recording_output_args(
+                    rendition.recording_format,
+                    rendition.temp_output_path,
+                    rendition.segments,
+                ),
+            ]
+        )
+
+    return base_input_args + encoding_args + output_args
+
+
+async def start_stream_source(
+    sandbox: RecordingProcessSandbox,
+    config: ChannelRecordingConfig,
+    live_info: Mapping[str, Any],
+    ffmpeg_path: Path,
+    api_client: Optional[ChzzkApiClient],
+    warm_pool: Optional[WarmProcessPool],
+) -> Tuple[Optional[asyncio.subprocess.Process], Any]:
+    """Start the configured stream backend and return (streamlink process, reader)."""
+    channel = config.channel
+    cookies = config.cookies
+    tuner = segment_thread_tuner(config)
+    sandbox.segment_tuner = tuner
+    stream_segment_threads = tuner.threads if tuner else config.stream_segment_threads
+    channel_name = channel.get("name", "Unknown")
+    channel_id = str(channel.get("id", "Unknown"))
+    stream_url = f"https://chzzk.naver.com/live/{channel_id}"
+
+    handoff_path = write_live_detail_handoff(channel_id, live_info)
+    if handoff_path is not None:
+        sandbox.add_temp_file(handoff_path)
+
+    if config.recording_backend == "library":
+        # Resolve and read the stream in this process on the worker thread pool
+        stream_reader = sandbox.attach_stream_reader(
+            StreamlinkLibraryStream(channel_name)
+        )
+        await stream_reader.open(
+            stream_url,
+            cookies,
+            stream_segment_threads,
+            ffmpeg_path,
+            handoff_path,
+        )
+        return None, stream_reader
+    if config.recording_backend == "native" and api_client is not None:
+        # Download the HLS segments ourselves on the event loop
+        stream_reader = sandbox.attach_stream_reader(
+            NativeHLSStream(
+                api_client,
+                channel,
+                get_auth_headers(cookies),
+                stream_segment_threads,
+                tuner,
+            )
+        )
+        await stream_reader.open(live_info)
+        return None, stream_reader
+
+    # Start streamlink process
+    sandbox.stream_reader = None
+    streamlink_cmd = [
+        "streamlink",
+        "--stdout",
+        stream_url,
+        "best",
+        "--hls-live-restart",
+        "--plugin-dirs",
+        str(PLUGIN_DIR_PATH),
+        "--stream-segment-threads",
+        str(stream_segment_threads),
+        *streamlink_http_header_args(cookies),
+        "--ffmpeg-ffmpeg",
+        str(ffmpeg_path),
+        "--ffmpeg-copyts",
+        "--ffmpeg-start-at-zero",
+        "--hls-segment-stream-data",
     ]
+    if handoff_path is not None:
+        streamlink_cmd.extend(["--chzzk-live-detail-file", str(handoff_path)])
+    if tuner is not None:
+        # Segment timings are only logged at debug level
+        streamlink_cmd.extend(["--loglevel", "debug"])
+
+    warm_streamlink = (
+        warm_pool.take_streamlink()
+        if warm_pool is not None and sandbox.relays_stream
+        else None
+    )
+    if warm_streamlink is not None:
+        stream_process = await sandbox.adopt_streamlink(warm_streamlink, streamlink_cmd)
+    else:
+        stream_process = await sandbox.start_streamlink(streamlink_cmd)
+    if sandbox.relays_stream and stream_process.stdout is None:
+        raise RuntimeError("streamlink stdout pipe was not created")
+    return stream_process, None
+
+
+def start_stream_source_tasks(
+    sandbox: RecordingProcessSandbox,
+    stream_process: Optional[asyncio.subprocess.Process],
+    stream_reader: Any,
+    writer: Any,
+    head: bytes = b"",
+) -> Tuple[Optional[asyncio.Task], asyncio.Task]:
+    """Start relaying a stream source; return (pipe task, task that ends with the source)."""
+    if stream_reader is not None:
+        pipe_task = sandbox.create_task(stream_reader.pump(writer))
+        return pipe_task, pipe_task
+
+    pipe_task = None
+    if sandbox.relays_stream:
+        pipe_task = sandbox.create_task(
+            pipe_stream_to_stdin(
+                stream_process.stdout, writer, sandbox.channel_name, head
+            )
+        )
+    sandbox.create_task(
+        read_log_stream(
+            stream_process.stderr,
+            "streamlink",
+            sandbox.channel_id,
+            sandbox.segment_tuner,
+        )
+    )
+    return pipe_task, sandbox.create_task(stream_process.wait())
+
+
+async def reconnect_stream_source(
+    recording: ActiveRecording,
+    sandbox: RecordingProcessSandbox,
+    live_info: Mapping[str, Any],
+    ffmpeg_path: Path,
+    api_client: Optional[ChzzkApiClient],
+    ffmpeg_wait_task: asyncio.Task,
+    downgraded_family: Optional[str] = None,
+    governor: Optional[PresetGovernor] = None,
+) -> Optional[Tuple[Optional[asyncio.subprocess.Process], Any]]:
+    """Restart the stream source of a live broadcast, or return None to finish the file."""
+    config = recording.config
+    channel = config.channel
+    channel_name = channel.get("name", "Unknown")
+    window = config.reconnect["window_seconds"]
+    deadline = time.monotonic() + window
+    delay = RECONNECT_BASE_DELAY_SECONDS
+    await sandbox.stop_stream()
+
+    while time.monotonic() < deadline and not ffmpeg_wait_task.done():
+        if await wait_for_shutdown(delay):
+            return None
+        delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+
+        if recording.pending_config is not None:
+            changed = set(recording.config.changed_fields(recording.pending_config))
+            if not changed <= RECONNECT_SOURCE_FIELDS:
+                logger.info(
+                    f"Settings for {channel_name} changed ({', '.join(sorted(changed))}); "
+                    "starting a new file instead of reconnecting."
+                )
+                recording.restart_now = True
+                return None
+            recording.apply_pending()
+            config = recording.config
+
+        if downgraded_family is not None and hardware_sessions.available(
+            downgraded_family,
+            config.hardware_sessions["max_sessions"].get(downgraded_family),
+        ):
+            # Switching encoders needs a new ffmpeg, so the next file gets the slot.
+            logger.info(
+                f"A {downgraded_family} encoder session is free again; "
+                f"starting a new file for {channel_name}."
+            )
+            recording.restart_now = True
+            return None
+
+        if governor is not None and governor.pending:
+            # The faster preset needs a new ffmpeg, so it starts with the next file.
+            logger.info(
+                f"Restarting the encode for {channel_name} with a faster preset."
+            )
+            recording.restart_now = True
+            return None
+
+        current_info = live_info
+        if api_client is not None:
+            api_client.invalidate(channel["id"])
+            status, current_info = await get_live_info(
+                channel, get_auth_headers(config.cookies), api_client
+            )
+            if status != "OPEN":
+                return None
+            if current_info.get("liveId") != live_info.get("liveId"):
+                logger.info(f"{channel_name} started a new broadcast; starting a new file.")
+                recording.restart_now = True
+                return None
+
+        try:
+            source = await start_stream_source(
+                sandbox, config, current_info, ffmpeg_path, api_client, None
+            )
+        except Exception as e:
+            logger.warning(f"Reconnect attempt for {channel_name} failed: {e}")
+            await sandbox.stop_stream()
+            continue
+        return source
+
+    logger.info(f"Could not reconnect {channel_name} within {window} seconds.")
+    return None
+
+
+async def prepare_renditions(
+    config: ChannelRecordingConfig,
+    archive_path: Path,
+    capabilities: Optional[FfmpegCapabilities],
+    ffmpeg_path: Path,
+    families: List[str],
+) -> List[RenditionOutput]:
+    """Resolve the encoders of the configured renditions and claim their sessions.
+
+    Each hardware session family is appended to families as soon as it is held,
+    so the caller can release them even if this fails partway through.
+    """
+    channel_name = config.channel.get("name", "Unknown")
+    base_name = os.path.splitext(archive_path.name[: -len(".part")])[0]
+    renditions: List[RenditionOutput] = []
+    for rendition in config.multi_output["renditions"]:
+        if rendition["codec"] == "av1":
+            hevc_settings, av1_settings = normalize_hevc_settings(None), rendition
+        else:
+            hevc_settings, av1_settings = rendition, normalize_av1_settings(None)
+        hevc_settings, av1_settings = await resolve_encoder_settings(
+            hevc_settings, av1_settings, ffmpeg_path
+        )
+        recording_format = rendition["format"]
+        if capabilities is not None and capabilities.missing_for_format(recording_format):
+            recording_format = "mkv"
+        family, _, hevc_settings, av1_settings = await claim_encoder_session(
+            config, recording_format, hevc_settings, av1_settings, ffmpeg_path
+        )
+        if family is not None:
+            families.append(family)
+        if not hevc_settings.get("enable") and not av1_settings.get("enable"):
+            logger.warning(
+                f"No encoder is available for the {rendition['name']} rendition "
+                f"of {channel_name}; skipping it."
+            )
+            continue
+        temp_output_path = archive_path.with_name(
+            shorten_filename(f"{base_name}.{rendition['name']}.{recording_format}.part")
+        )
+        renditions.append(
+            RenditionOutput(
+                name=rendition["name"],
+                recording_format=recording_format,
+                hevc_settings=hevc_settings,
+                av1_settings=av1_settings,
+                height=rendition["height"],
+                temp_output_path=temp_output_path,
+                final_output_path=temp_output_path.with_name(temp_output_path.name[:-5]),
+            )
+        )
+    return renditions
+
+
+def finalize_recording_file(
+    temp_output_path: Path,
+    final_output_path: Path,
+    returncode: Optional[int],
+    output_name: str,
+    channel_name: str,
+) -> Optional[Path]:
+    """Atomically move a finished .part file into place and return where it went."""
+    if not temp_output_path.exists():
+        return None
+    if temp_output_path.stat().st_size == 0:
+        temp_output_path.unlink(missing_ok=True)
+        logger.warning(f"Discarded empty recording file for {channel_name}.")
+        return None
+    if returncode != 0:
+        logger.warning(
+            f"Leaving incomplete recording file at {temp_output_path} "
+            f"because the {output_name} exited with return code {returncode}."
+        )
+        return None
+    destination_path = unique_path(final_output_path)
+    temp_output_path.replace(destination_path)
+    logger.info(f"Recording saved to {destination_path}")
+    return destination_path
+
+
+async def record_stream(
+    recording: ActiveRecording,
+    live_info: Dict[str, Any],
+    ffmpeg_path: Path,
+    api_client: Optional[ChzzkApiClient] = None,
+    warm_pool: Optional[WarmProcessPool] = None,
+    transcode_queue: Optional["TranscodeQueue"] = None,
+    remux_pool: Optional["RemuxPool"] = None,
+) -> None:
+    config = recording.config
+    channel = config.channel
+    hevc_settings = config.hevc_settings
+    av1_settings = config.av1_settings
+    deferred_formats = (
+        deferred_transcode_formats(config) if transcode_queue is not None else None
+    )
+    if deferred_formats is not None:
+        # Record with -c copy now; the transcode queue compresses the file later.
+        hevc_settings = {**hevc_settings, "enable": False}
+        av1_settings = {**av1_settings, "enable": False}
+    multi_output = bool(
+        config.multi_output.get("enable") and config.multi_output["renditions"]
+    )
+    if multi_output:
+        # The archive is an untouched copy; the renditions carry the encodes.
+        hevc_settings = {**hevc_settings, "enable": False}
+        av1_settings = {**av1_settings, "enable": False}
+    channel_name = channel.get("name", "Unknown")
+    channel_id = str(channel.get("id", "Unknown"))
+    output_format = normalize_output_format(config.output_format)
+    logger.info(f"Attempting to record stream for channel: {channel_name}")
+
+    recording_started = False
+    temp_output_path: Optional[Path] = None
+    final_output_path: Optional[Path] = None
+    active_attempt: Optional[RecordingProcessSandbox] = None
+    session_family: Optional[str] = None
+    downgraded_family: Optional[str] = None
+    governor: Optional[PresetGovernor] = None
+    renditions: List[RenditionOutput] = []
+    rendition_families: List[str] = []
+    segmented = bool(config.segmentation.get("enable"))
+    segments: Optional[SegmentedOutput] = None
+    remux = (
+        remux_pool is not None
+        and config.remux.get("enable")
+        and deferred_formats is None
+    )
+
+    async def queue_remux(output_path: Path) -> None:
+        if output_path.suffix == ".ts":
+            remux_pool.submit(output_path)
+
+    async def queue_transcode(output_path: Path) -> None:
+        try:
+            await transcode_queue.enqueue(
+                output_path,
+                deferred_formats[1],
+                config.hevc_settings,
+                config.av1_settings,
+            )
+            logger.info(f"Queued {output_path.name} for transcoding.")
+        except sqlite3.Error as e:
+            logger.error(f"Could not queue {output_path} for transcoding: {e}")
+
+    try:
+        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+        live_title = sanitize_filename_component(
+            live_info.get("liveTitle", ""), fallback="untitled"
+        )
+        output_dir = resolve_output_dir(channel.get("output_dir", "."))
+        recording_format = recording_format_for(output_format, av1_settings)
+        if deferred_formats is not None:
+            recording_format = deferred_formats[0]
+        elif multi_output and recording_format == "webm":
+            # WebM can't hold the stream's H.264/AAC without re-encoding.
+            recording_format = "mkv"
+        elif recording_format != output_format:
+            logger.warning(
+                f"AV1 output is not supported with TS for {channel_name}. Falling back to MKV."
+            )
+        capabilities = await get_ffmpeg_capabilities(ffmpeg_path)
+        fallback_format, missing = writable_recording_format(
+            recording_format, av1_settings, capabilities
+        )
+        if fallback_format != recording_format:
+            logger.warning(
+                f"Cannot record {recording_format.upper()} for {channel_name} ({missing}). "
+                f"Falling back to {fallback_format.upper()}."
+            )
+            recording_format = fallback_format
+        temp_output_file = shorten_filename(
+            f"[{current_time.replace(':', '_')}] {channel_name} {live_title}.{recording_format}.part"
+        )
+        final_output_file = temp_output_file[:-5]  # Remove '.part'
+        temp_output_path = output_dir / temp_output_file
+        final_output_path = output_dir / final_output_file
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if multi_output:
+            renditions = await prepare_renditions(
+                config, temp_output_path, capabilities, ffmpeg_path, rendition_families
+            )
+
+        # Copy-mode TS recordings can skip ffmpeg when the stream is already MPEG-TS
+        ts_passthrough = (
+            config.ts_passthrough.get("enable", False)
+            and not renditions
+            and not segmented
+            and recording_format == "ts"
+            and not hevc_settings.get("enable")
+            and not av1_settings.get("enable")
+        )
+        active_attempt = RecordingProcessSandbox(
+            channel_name,
+            channel_id,
+            "relay" if ts_passthrough else config.pipe_mode,
+        )
+        stream_process, stream_reader = await start_stream_source(
+            active_attempt, config, live_info, ffmpeg_path, api_client, warm_pool
+        )
+
+        stream_head = b""
+        output_writer = None
+        if ts_passthrough:
+            if stream_reader is not None:
+                head = await stream_reader.peek(TS_SNIFF_PACKETS * TS_PACKET_SIZE)
+            else:
+                stream_head = await read_stream_head(
+                    stream_process.stdout, TS_SNIFF_PACKETS * TS_PACKET_SIZE
+                )
+                head = stream_head
+            if looks_like_mpegts(head):
+                output_writer = await active_attempt.open_passthrough_writer(
+                    temp_output_path, config.ts_passthrough
+                )
+                logger.info(f"Writing MPEG-TS for {channel_name} without ffmpeg.")
+            else:
+                logger.info(
+                    f"Stream for {channel_name} is not MPEG-TS. Recording through ffmpeg."
+                )
+
+        ffmpeg_process = None
+        warm_ffmpeg = None
+        warm_output_task = None
+        if output_writer is None:
+            active_hevc_settings, active_av1_settings = await resolve_encoder_settings(
+                hevc_settings, av1_settings, ffmpeg_path
+            )
+            if active_hevc_settings.get("enable") or active_av1_settings.get("enable"):
+                governor = preset_governor(config)
+            if governor is not None:
+                active_hevc_settings, active_av1_settings = governor.apply(
+                    active_hevc_settings, active_av1_settings
+                )
+            (
+                session_family,
+                downgraded_family,
+                active_hevc_settings,
+                active_av1_settings,
+            ) = await claim_encoder_session(
+                config,
+                recording_format,
+                active_hevc_settings,
+                active_av1_settings,
+                ffmpeg_path,
+            )
+            if segmented:
+                # Each finished segment goes on to the transcode queue or the remux pool.
+                on_segment = queue_remux if remux else None
+                segments = SegmentedOutput(
+                    temp_output_path,
+                    segment_duration(
+                        config.segmentation, active_hevc_settings, active_av1_settings
+                    ),
+                    queue_transcode if deferred_formats is not None else on_segment,
+                )
+                for rendition in renditions:
+                    rendition.segments = SegmentedOutput(
+                        rendition.temp_output_path,
+                        segment_duration(
+                            config.segmentation,
+                            rendition.hevc_settings,
+                            rendition.av1_settings,
+                        ),
+                        on_segment,
+                    )
+        if (
+            output_writer is None
+            and downgraded_family is None
+            and deferred_formats is None
+            and (governor is None or governor.steps == 0)
+            and not renditions
+            and not segmented
+            and warm_pool is not None
+            and active_attempt.relays_stream
+        ):
+            warm_ffmpeg = await warm_pool.take_ffmpeg(
+                channel_id,
+                warm_ffmpeg_key(
+                    recording_format, output_dir, active_hevc_settings, active_av1_settings
+                ),
+            )
+        if warm_ffmpeg is not None:
+            ffmpeg_process = active_attempt.adopt_ffmpeg(warm_ffmpeg.process)
+            warm_output_task = active_attempt.create_task(
+                bind_warm_output(
+                    ffmpeg_process, warm_ffmpeg.placeholder_path, temp_output_path
+                )
+            )
+            logger.info(f"Using a pre-spawned ffmpeg for {channel_name}.")
+        if ffmpeg_process is None and output_writer is None:
+            # Start ffmpeg process
+            ffmpeg_cmd = build_recording_ffmpeg_command(
+                ffmpeg_path,
+                recording_format,
+                active_hevc_settings,
+                active_av1_settings,
+                channel_name,
+                temp_output_path,
+                renditions,
+                segments,
+            )
+
+            ffmpeg_process = await active_attempt.start_ffmpeg(ffmpeg_cmd)
+            if ffmpeg_process.stderr is None or (
+                active_attempt.relays_stream and ffmpeg_process.stdin is None
+            ):
+                raise RuntimeError("ffmpeg pipes were not created")
+        output_stdin = output_writer if output_writer is not None else ffmpeg_process.stdin
+
+        if config.spool.get("enable") and active_attempt.relays_stream:
+            # Let ingest run ahead of a stalled ffmpeg or disk instead of losing segments
+            spool = SpoolBuffer(
+                output_stdin,
+                channel_id,
+                config.spool["memory_mb"] * 1024 * 1024,
+                config.spool["disk_mb"] * 1024 * 1024,
+                Path(config.spool["directory"]) if config.spool["directory"] else None,
+            )
+            active_attempt.create_task(spool.pump())
+            output_stdin = spool
+
+        if not recording_started:
+            logger.info(
+                f"Recording started for {channel_name} at {current_time}."
+            )
+            recording_started = True
+            recording_start_time = current_time
 
+        # Initialize channel progress data
+        async with channel_progress_lock:
+            channel_progress[channel_id] = {
+                "channel_name": channel_name,
+                "bitrate": "N/A",
+                "download_speed": "N/A",
+                "total_size": "N/A",
+                "out_time": "N/A",
+                "recording_start_time": recording_start_time,
+            }
 
-def probe_hevc_encoder(
-    ffmpeg_path: Path, hevc_settings: Dict[str, Any]
-) -> Tuple[bool, str]:
-    encoder = str(hevc_settings.get("encoder", "libx265"))
-    cache_key = (
-        str(ffmpeg_path),
-        encoder,
-        str(hevc_settings.get("bitrate", "2500k")),
-        str(hevc_settings.get("max_bitrate", "10000k")),
-        str(hevc_settings.get("preset", "ultrafast")),
-    )
-    if cache_key in HEVC_ENCODER_PROBE_CACHE:
-        return HEVC_ENCODER_PROBE_CACHE[cache_key]
+        # Reconnects need ffmpeg's stdin to outlive each stream source
+        reconnect = config.reconnect.get("enable") and active_attempt.relays_stream
+        pipe_task, stream_wait_task = start_stream_source_tasks(
+            active_attempt,
+            stream_process,
+            stream_reader,
+            ReconnectableInput(output_stdin) if reconnect else output_stdin,
+            stream_head,
+        )
+        if ffmpeg_process is not None:
+            if governor is not None:
+                governor.start()
+            active_attempt.create_task(
+                read_stream(ffmpeg_process.stderr, channel_id, "stderr", governor)
+            )
+            for output_segments in (
+                segments,
+                *(rendition.segments for rendition in renditions),
+            ):
+                if output_segments is not None:
+                    active_attempt.create_task(
+                        output_segments.watch(), cancel_on_cleanup=True
+                    )
+            ffmpeg_wait_task = active_attempt.create_task(ffmpeg_process.wait())
+        else:
+            ffmpeg_wait_task = active_attempt.create_task(output_writer.wait())
+        shutdown_wait_task = active_attempt.create_task(
+            shutdown_event.wait(), cancel_on_cleanup=True
+        )
 
-    input_args = [str(ffmpeg_path), "-hide_banner", "-loglevel", "error"]
-    if encoder == "hevc_vaapi":
-        input_args.extend(
-            [
-                "-init_hw_device",
-                "vaapi=vaapi0:/dev/dri/renderD128",
-                "-filter_hw_device",
-                "vaapi0",
-            ]
+        while True:
+            done, _ = await asyncio.wait(
+                [ffmpeg_wait_task, stream_wait_task, shutdown_wait_task],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not reconnect or done != {stream_wait_task}:
+                break
+            if pipe_task is not None:
+                await drain_task(pipe_task, timeout=10)
+            logger.warning(f"Stream for {channel_name} dropped. Reconnecting...")
+            source = await reconnect_stream_source(
+                recording,
+                active_attempt,
+                live_info,
+                ffmpeg_path,
+                api_client,
+                ffmpeg_wait_task,
+                downgraded_family,
+                governor,
+            )
+            if source is None:
+                break
+            stream_process, stream_reader = source
+            if output_writer is not None:
+                output_writer.mark_discontinuity()
+            logger.info(
+                f"Reconnected {channel_name}; continuing {temp_output_path.name} "
+                f"after a gap at {time.strftime('%H:%M:%S')}."
+            )
+            pipe_task, stream_wait_task = start_stream_source_tasks(
+                active_attempt,
+                stream_process,
+                stream_reader,
+                ReconnectableInput(output_stdin),
+            )
+        if reconnect and not output_stdin.is_closing():
+            # Sources never close ffmpeg's stdin in reconnect mode; end the input now.
+            if pipe_task is not None and shutdown_wait_task in done:
+                await active_attempt.stop_stream()
+                await drain_task(pipe_task, timeout=10)
+            output_stdin.close()
+
+        completed_by = None
+        if shutdown_wait_task in done:
+            completed_by = "shutdown"
+            await active_attempt.stop_stream()
+            if pipe_task is not None:
+                await drain_task(pipe_task, timeout=10)
+            if not await wait_for_task_completion(
+                ffmpeg_wait_task,
+                f"ffmpeg finalize for {channel_name}",
+                FFMPEG_FINALIZE_TIMEOUT_SECONDS,
+            ):
+                await terminate_process(ffmpeg_process, "ffmpeg")
+
+        if ffmpeg_wait_task in done:
+            completed_by = "ffmpeg"
+            await active_attempt.stop_stream()
+        elif stream_wait_task in done:
+            completed_by = "streamlink"
+            if not await wait_for_task_completion(
+                ffmpeg_wait_task,
+                f"ffmpeg after streamlink ended for {channel_name}",
+                FFMPEG_FINALIZE_TIMEOUT_SECONDS,
+            ):
+                await terminate_process(ffmpeg_process, "ffmpeg")
+
+        if stream_wait_task and not stream_wait_task.done():
+            await active_attempt.stop_stream()
+            await drain_task(stream_wait_task)
+        if ffmpeg_wait_task and not ffmpeg_wait_task.done():
+            await terminate_process(ffmpeg_process, "ffmpeg")
+            await drain_task(ffmpeg_wait_task)
+
+        if ffmpeg_process is not None:
+            ffmpeg_returncode = ffmpeg_process.returncode
+            output_name = "ffmpeg process"
+        else:
+            ffmpeg_returncode = output_writer.returncode
+            output_name = "TS passthrough writer"
+        stream_returncode = active_attempt.stream_returncode
+        logger.info(
+            f"{output_name} for {channel_name} exited with return code {ffmpeg_returncode}."
         )
-    input_args.extend(
-        [
-            "-f",
-            "lavfi",
-            "-i",
-            "testsrc2=size=64x64:rate=1",
-            "-frames:v",
-            "1",
-        ]
-    )
+        logger.info(
+            f"Stream recording process for {channel_name} exited with return code {stream_returncode}."
+        )
+        if ffmpeg_process is not None and ffmpeg_returncode not in (0, None):
+            logger.warning(
+                f"ffmpeg failed for {channel_name}; see the ffmpeg stderr lines above for the root cause."
+            )
+        if (
+            stream_returncode not in (0, None)
+            and completed_by not in {"ffmpeg", "shutdown"}
+        ):
+            logger.warning(
+                f"streamlink failed for {channel_name}; see the streamlink stderr lines above for the root cause."
+            )
+        if recording_started:
+            logger.info(f"Recording stopped for {channel_name}.")
+            recording_started = False
+
+        if warm_output_task is not None:
+            # ffmpeg has exited, so the placeholder has its final name or never appeared.
+            await warm_output_task
+
+        # Atomically rename the temporary files to final output
+        for rendition in renditions:
+            if rendition.segments is not None:
+                await rendition.segments.finish(ffmpeg_returncode, output_name)
+                continue
+            saved_path = finalize_recording_file(
+                rendition.temp_output_path,
+                rendition.final_output_path,
+                ffmpeg_returncode,
+                output_name,
+                channel_name,
+            )
+            if remux and saved_path is not None:
+                await queue_remux(saved_path)
+        if segments is not None:
+            await segments.finish(ffmpeg_returncode, output_name)
+        elif temp_output_path and final_output_path:
+            saved_path = finalize_recording_file(
+                temp_output_path,
+                final_output_path,
+                ffmpeg_returncode,
+                output_name,
+                channel_name,
+            )
+            if saved_path is not None:
+                final_output_path = saved_path
+                if deferred_formats is not None:
+                    await queue_transcode(final_output_path)
+                elif remux:
+                    await queue_remux(final_output_path)
 
-    probe_cmd = input_args + build_hevc_probe_args(hevc_settings) + [
-        "-an",
+    except asyncio.CancelledError:
+        logger.info(f"Recording task for {channel_name} was cancelled.")
+        raise
+    except Exception as e:
+        logger.exception(f"Error occurred while recording {channel_name}: {e}")
+    finally:
+        if active_attempt is not None:
+            await active_attempt.cleanup()
+        if session_family is not None:
+            hardware_sessions.release(session_family)
+        for family in rendition_families:
+            hardware_sessions.release(family)
+        if governor is not None:
+            governor.escalate()
+        if recording_started:
+            logger.info(f"Recording stopped for {channel_name}.")
+            if temp_output_path and temp_output_path.exists():
+                logger.warning(
+                    f"Leaving unfinished recording file at {temp_output_path}."
+                )
+        # Remove progress data
+        async with channel_progress_lock:
+            channel_progress.pop(channel_id, None)
+
+
+def clock_minutes(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def in_time_window(now: float, start_time: str, end_time: str) -> bool:
+    """Whether local time is inside [start_time, end_time), which may wrap midnight."""
+    if not start_time or not end_time:
+        return True
+    local_time = time.localtime(now)
+    minute = local_time.tm_hour * 60 + local_time.tm_min
+    start, end = clock_minutes(start_time), clock_minutes(end_time)
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def low_priority_subprocess_kwargs(niceness: int) -> Dict[str, Any]:
+    if niceness <= 0:
+        return {}
+    if os.name == "nt":
+        priority = (
+            subprocess.IDLE_PRIORITY_CLASS
+            if niceness >= 15
+            else subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        )
+        return {"creationflags": isolated_subprocess_kwargs()["creationflags"] | priority}
+    return {"preexec_fn": lambda: os.nice(niceness)}
+
+
+def deferred_transcode_formats(
+    config: "ChannelRecordingConfig",
+) -> Optional[Tuple[str, str]]:
+    """Return (format recorded live, format transcoded to) when transcoding is deferred."""
+    if not config.deferred_transcode.get("enable"):
+        return None
+    output_format = normalize_output_format(config.output_format)
+    if not config.av1_settings.get("enable") and (
+        not config.hevc_settings.get("enable") or output_format == "webm"
+    ):
+        return None
+    # WebM can't hold the stream's H.264/AAC, so copy into MKV until the transcode.
+    live_format = "mkv" if output_format == "webm" else output_format
+    return live_format, recording_format_for(output_format, config.av1_settings)
+
+
+def build_transcode_command(
+    ffmpeg_path: Path,
+    source_path: Path,
+    output_path: Path,
+    output_format: str,
+    hevc_settings: Mapping[str, Any],
+    av1_settings: Mapping[str, Any],
+) -> List[str]:
+    if av1_settings.get("enable", False):
+        encoding_args = build_av1_encoding_args(av1_settings, output_format)
+    else:
+        encoding_args = build_hevc_encoding_args(hevc_settings, output_format)
+    return [
+        str(ffmpeg_path),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-nostdin",
+        *hardware_device_args(hevc_settings, av1_settings, output_format),
+        "-i",
+        str(source_path),
+        *encoding_args,
+        "-map_metadata",
+        "0",
         "-f",
-        "null",
-        "-",
+        OUTPUT_FORMAT_MUXERS[output_format],
+        "-y",
+        str(output_path),
     ]
 
-    try:
-        result = subprocess.run(
-            probe_cmd,
-            capture_output=True,
-            text=True,
-            timeout=15,
-            check=False,
-        )
-        message = (result.stderr or result.stdout or "").strip()
-        probe_result = (result.returncode == 0, message)
-    except (OSError, subprocess.SubprocessError) as e:
-        probe_result = (False, str(e))
-
-    HEVC_ENCODER_PROBE_CACHE[cache_key] = probe_result
-    return probe_result
 
+@dataclass(frozen=True)
+class TranscodeJob:
+    job_id: int
+    source_path: Path
+    output_format: str
+    hevc_settings: Mapping[str, Any]
+    av1_settings: Mapping[str, Any]
+
+
+class TranscodeQueue:
+    """Persistent queue of finished copy-mode recordings waiting to be transcoded.
+
+    Jobs live in SQLite so they survive restarts and can be shared by worker
+    processes; the concurrency limit counts running jobs across all of them.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transcode_jobs (
+            job_id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL UNIQUE,
+            output_format TEXT NOT NULL,
+            hevc_settings TEXT NOT NULL,
+            av1_settings TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            heartbeat REAL NOT NULL DEFAULT 0,
+            enqueued_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, database_path: Path = TRANSCODE_QUEUE_DB_FILE_PATH) -> None:
+        self.database_path = database_path
+        self.added = asyncio.Event()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transcode-db"
+        )
 
-def resolve_hevc_settings_for_recording(
-    hevc_settings: Dict[str, Any], ffmpeg_path: Path
-) -> Dict[str, Any]:
-    if not hevc_settings.get("enable", False):
-        return hevc_settings
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.database_path),
+                timeout=10,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.executescript(self.SCHEMA)
+            self._connection = connection
+        return self._connection
 
-    active_settings = dict(hevc_settings)
-    selected_encoder = str(active_settings.get("encoder", "libx265"))
-    encoder_works, probe_message = probe_hevc_encoder(ffmpeg_path, active_settings)
-    if encoder_works:
-        return active_settings
+    def _transaction(self, func: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(db, time.time())
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return result
+
+    async def _run(self, func: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._transaction, func)
+
+    async def enqueue(
+        self,
+        source_path: Path,
+        output_format: str,
+        hevc_settings: Mapping[str, Any],
+        av1_settings: Mapping[str, Any],
+    ) -> None:
+        row = (
+            str(source_path),
+            output_format,
+            orjson.dumps(dict(hevc_settings)).decode(),
+            orjson.dumps(dict(av1_settings)).decode(),
+        )
+        await self._run(
+            lambda db, now: db.execute(
+                "INSERT INTO transcode_jobs "
+                "(source, output_format, hevc_settings, av1_settings, status, enqueued_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?) ON CONFLICT (source) DO UPDATE SET "
+                "output_format = excluded.output_format, "
+                "hevc_settings = excluded.hevc_settings, "
+                "av1_settings = excluded.av1_settings, "
+                "status = 'queued', attempts = 0",
+                (*row, now),
+            )
+        )
+        self.added.set()
+
+    def _claim(
+        self, db: sqlite3.Connection, now: float, concurrency: int
+    ) -> Optional[TranscodeJob]:
+        db.execute(
+            "UPDATE transcode_jobs SET status = 'queued' "
+            "WHERE status = 'running' AND heartbeat < ?",
+            (now - TRANSCODE_STALE_SECONDS,),
+        )
+        (running,) = db.execute(
+            "SELECT COUNT(*) FROM transcode_jobs WHERE status = 'running'"
+        ).fetchone()
+        if running >= concurrency:
+            return None
+        row = db.execute(
+            "SELECT job_id, source, output_format, hevc_settings, av1_settings "
+            "FROM transcode_jobs WHERE status = 'queued' ORDER BY enqueued_at LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute(
+            "UPDATE transcode_jobs SET status = 'running', heartbeat = ?, "
+            "attempts = attempts + 1 WHERE job_id = ?",
+            (now, row[0]),
+        )
+        return TranscodeJob(
+            job_id=row[0],
+            source_path=Path(row[1]),
+            output_format=row[2],
+            hevc_settings=MappingProxyType(orjson.loads(row[3])),
+            av1_settings=MappingProxyType(orjson.loads(row[4])),
+        )
 
-    logger.warning(
-        f"HEVC encoder '{selected_encoder}' is not usable with the current "
-        f"FFmpeg/hardware setup: {summarize_probe_error(probe_message)}"
-    )
+    async def claim(self, concurrency: int) -> Optional[TranscodeJob]:
+        """Take the oldest queued job unless `concurrency` jobs are already running."""
+        return await self._run(lambda db, now: self._claim(db, now, concurrency))
 
-    for fallback_encoder in HEVC_SOFTWARE_FALLBACK_ENCODERS:
-        if fallback_encoder == selected_encoder:
-            continue
-        fallback_settings = dict(active_settings)
-        fallback_settings["encoder"] = fallback_encoder
-        fallback_works, fallback_message = probe_hevc_encoder(
-            ffmpeg_path, fallback_settings
-        )
-        if fallback_works:
-            logger.warning(
-                f"Using HEVC encoder '{fallback_encoder}' instead of "
-                f"'{selected_encoder}' for this recording."
+    async def heartbeat(self, job_id: int) -> None:
+        await self._run(
+            lambda db, now: db.execute(
+                "UPDATE transcode_jobs SET heartbeat = ? WHERE job_id = ?", (now, job_id)
             )
-            return fallback_settings
-        logger.warning(
-            f"HEVC fallback encoder '{fallback_encoder}' is not usable: "
-            f"{summarize_probe_error(fallback_message)}"
         )
 
-    disabled_settings = dict(active_settings)
-    disabled_settings["enable"] = False
-    logger.warning("No usable HEVC encoder found. Recording without HEVC encoding.")
-    return disabled_settings
+    async def complete(self, job_id: int) -> None:
+        await self._run(
+            lambda db, now: db.execute(
+                "DELETE FROM transcode_jobs WHERE job_id = ?", (job_id,)
+            )
+        )
 
+    async def fail(self, job_id: int) -> None:
+        """Queue the job again, or park it as failed after too many attempts."""
+        await self._run(
+            lambda db, now: db.execute(
+                "UPDATE transcode_jobs SET status = CASE WHEN attempts >= ? "
+                "THEN 'failed' ELSE 'queued' END WHERE job_id = ?",
+                (TRANSCODE_MAX_ATTEMPTS, job_id),
+            )
+        )
 
-def build_av1_encoding_args(
-    av1_settings: Dict[str, Any], recording_format: str
-) -> List[str]:
-    encoder = av1_settings.get("encoder", "libsvtav1")
-    bitrate = av1_settings.get("bitrate", "2500k")
-    max_bitrate = av1_settings.get("max_bitrate", "10000k")
-    preset = str(av1_settings.get("preset", "8")).strip()
-    bufsize = calculate_bufsize(max_bitrate)
+    async def requeue(self, job_id: int) -> None:
+        """Put back a job that was interrupted; the attempt doesn't count."""
+        await self._run(
+            lambda db, now: db.execute(
+                "UPDATE transcode_jobs SET status = 'queued', attempts = attempts - 1 "
+                "WHERE job_id = ?",
+                (job_id,),
+            )
+        )
 
-    if encoder == "libaom-av1":
-        encoding_args = [
-            "-c:v",
-            "libaom-av1",
-            "-cpu-used",
-            numeric_preset(preset, "6"),
-            "-b:v",
-            bitrate,
-            *capped_vbr_args(bitrate, max_bitrate, bufsize),
-        ]
-    elif encoder == "av1_nvenc":
-        encoding_args = [
-            "-c:v",
-            "av1_nvenc",
-            "-preset",
-            nvenc_preset(preset),
-            "-b:v",
-            bitrate,
-            "-maxrate",
-            max_bitrate,
-            "-bufsize",
-            bufsize,
-            "-rc",
-            "vbr",
-        ]
-    elif encoder == "av1_qsv":
-        encoding_args = [
-            "-c:v",
-            "av1_qsv",
-            "-preset",
-            preset,
-            "-b:v",
-            bitrate,
-            *capped_vbr_args(bitrate, max_bitrate, bufsize),
-        ]
-    elif encoder == "av1_amf":
-        encoding_args = [
-            "-c:v",
-            "av1_amf",
-            "-usage",
-            "transcoding",
-            "-rc",
-            "vbr_peak",
-            "-b:v",
-            bitrate,
-            *capped_vbr_args(bitrate, max_bitrate, bufsize),
-        ]
-    elif encoder == "av1_vaapi":
-        encoding_args = [
-            "-vf",
-            "format=nv12,hwupload",
-            "-c:v",
-            "av1_vaapi",
-            "-rc_mode",
-            "VBR",
-            "-b:v",
-            bitrate,
-            *capped_vbr_args(bitrate, max_bitrate, bufsize),
-        ]
-    else:
-        encoding_args = [
-            "-c:v",
-            "libsvtav1",
-            "-preset",
-            numeric_preset(preset, "8"),
-            "-b:v",
-            bitrate,
-            "-svtav1-params",
-            "rc=1",
-        ]
+    async def close(self) -> None:
+        if self._connection is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._connection.close
+            )
+            self._connection = None
+        self._executor.shutdown(wait=False)
 
-    if recording_format == "webm":
-        encoding_args.extend(["-c:a", "libopus", "-b:a", "128k"])
-    else:
-        encoding_args.extend(["-c:a", "copy"])
 
-    return encoding_args
+def transcode_output_path(source_path: Path, output_format: str, keep_source: bool) -> Path:
+    if keep_source:
+        return unique_path(source_path.with_name(f"{source_path.stem}.transcoded.{output_format}"))
+    output_path = source_path.with_suffix(f".{output_format}")
+    # The rename overwrites the source, so the output may share its name.
+    return output_path if output_path == source_path else unique_path(output_path)
 
 
-async def record_stream(
-    channel: Dict[str, Any],
-    headers: Dict[str, str],
-    session: aiohttp.ClientSession,
-    delay: int,
-    timeout: int,
+async def run_transcode_job(
+    queue: TranscodeQueue,
+    job: TranscodeJob,
     ffmpeg_path: Path,
-    stream_segment_threads: int,
-    hevc_settings: Dict[str, Any],
-    av1_settings: Dict[str, Any],
-    output_format: str,
+    settings: Mapping[str, Any],
 ) -> None:
-    channel_name = channel.get("name", "Unknown")
-    channel_id = str(channel.get("id", "Unknown"))
-    output_format = normalize_output_format(output_format)
-    logger.info(f"Attempting to record stream for channel: {channel_name}")
-    await asyncio.sleep(delay)
+    source_path = job.source_path
+    if not source_path.exists():
+        logger.warning(f"Dropping transcode of {source_path}: the file no longer exists.")
+        await queue.complete(job.job_id)
+        return
+
+    hevc_settings, av1_settings = await resolve_encoder_settings(
+        job.hevc_settings, job.av1_settings, ffmpeg_path
+    )
+    if not hevc_settings.get("enable") and not av1_settings.get("enable"):
+        logger.warning(f"No usable encoder to transcode {source_path}; keeping the copy.")
+        await queue.complete(job.job_id)
+        return
+
+    output_path = transcode_output_path(
+        source_path, job.output_format, settings["keep_source"]
+    )
+    temp_output_path = output_path.with_name(f"{output_path.name}.part")
+    command = build_transcode_command(
+        ffmpeg_path,
+        source_path,
+        temp_output_path,
+        job.output_format,
+        hevc_settings,
+        av1_settings,
+    )
+    logger.info(f"Transcoding {source_path.name} to {output_path.name}.")
+    process = None
+    try:
+        process = await create_isolated_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            **low_priority_subprocess_kwargs(settings["niceness"]),
+        )
+        log_task = asyncio.create_task(
+            read_log_stream(process.stderr, "ffmpeg transcode", source_path.name)
+        )
+        while True:
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(process.wait()), timeout=TRANSCODE_HEARTBEAT_SECONDS
+                )
+                break
+            except asyncio.TimeoutError:
+                try:
+                    await queue.heartbeat(job.job_id)
+                except sqlite3.Error as e:
+                    # A locked database must not abandon ffmpeg; the next beat may get through.
+                    logger.warning(f"Could not record progress of {source_path.name}: {e}")
+        await log_task
+    except asyncio.CancelledError:
+        await terminate_process(process, "ffmpeg transcode")
+        with contextlib.suppress(OSError):
+            temp_output_path.unlink(missing_ok=True)
+        await queue.requeue(job.job_id)
+        raise
+    except OSError as e:
+        logger.error(f"Could not start ffmpeg to transcode {source_path}: {e}")
+        await queue.fail(job.job_id)
+        return
 
-    if channel.get("active", "on") == "off":
-        logger.info(f"{channel_name} channel is inactive. Skipping recording.")
+    if process.returncode != 0:
+        logger.warning(
+            f"Transcoding {source_path.name} failed with return code {process.returncode}."
+        )
+        with contextlib.suppress(OSError):
+            temp_output_path.unlink(missing_ok=True)
+        await queue.fail(job.job_id)
         return
 
-    recording_started = False
-    temp_output_path: Optional[Path] = None
-    final_output_path: Optional[Path] = None
-    active_attempt: Optional[RecordingProcessSandbox] = None
-
     try:
-        while not shutdown_event.is_set():
-            stream_url = f"https://chzzk.naver.com/live/{channel['id']}"
-            if stream_url:
-                logger.debug(f"Found stream URL for channel: {channel_name}")
-                try:
-                    cookies = await get_session_cookies()
-                    while not shutdown_event.is_set():
-                        cookies = await get_session_cookies()
-                        headers = get_auth_headers(cookies)
-                        status, live_info = await get_live_info(
-                            channel, headers, session
-                        )
-                        if status == "OPEN":
-                            break
+        temp_output_path.replace(output_path)
+    except OSError as e:
+        logger.error(f"Could not save the transcode of {source_path}: {e}")
+        with contextlib.suppress(OSError):
+            temp_output_path.unlink(missing_ok=True)
+        await queue.fail(job.job_id)
+        return
+    # When the names match, the replace above already overwrote the source.
+    if not settings["keep_source"] and source_path != output_path:
+        try:
+            source_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not delete {source_path} after transcoding: {e}")
+    await queue.complete(job.job_id)
+    logger.info(f"Transcoded recording saved to {output_path}")
 
-                        logger.info(
-                            f"Waiting for the channel '{channel_name}' to go live..."
-                        )
-                        try:
-                            await asyncio.wait_for(
-                                shutdown_event.wait(), timeout=timeout
-                            )
-                        except asyncio.TimeoutError:
-                            continue
 
-                    if shutdown_event.is_set():
-                        break
+async def run_transcode_queue(
+    queue: TranscodeQueue,
+    ffmpeg_path: Path,
+    get_settings: Callable[[], Mapping[str, Any]],
+) -> None:
+    """Start queued transcodes while the feature is on and inside its time window.
 
-                    current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                    live_title = sanitize_filename_component(
-                        live_info.get("liveTitle", ""), fallback="untitled"
-                    )
-                    output_dir = resolve_output_dir(channel.get("output_dir", "."))
-                    recording_format = output_format
-                    if av1_settings.get("enable") and recording_format == "ts":
-                        logger.warning(
-                            f"AV1 output is not supported with TS for {channel_name}. Falling back to MKV."
-                        )
-                        recording_format = "mkv"
-                    temp_output_file = shorten_filename(
-                        f"[{current_time.replace(':', '_')}] {channel_name} {live_title}.{recording_format}.part"
-                    )
-                    final_output_file = temp_output_file[:-5]  # Remove '.part'
-                    temp_output_path = output_dir / temp_output_file
-                    final_output_path = output_dir / final_output_file
+    The window only gates new jobs; a transcode that is running finishes.
+    """
+    running: Set[asyncio.Task] = set()
 
-                    output_dir.mkdir(parents=True, exist_ok=True)
+    def finished(task: asyncio.Task) -> None:
+        running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Transcode job failed: {task.exception()}")
 
-                    active_attempt = RecordingProcessSandbox(channel_name, channel_id)
+    try:
+        while True:
+            queue.added.clear()
+            settings = get_settings()
+            if settings.get("enable") and in_time_window(
+                time.time(), settings["start_time"], settings["end_time"]
+            ):
+                while len(running) < settings["concurrency"]:
                     try:
-                        # Start streamlink process
-                        streamlink_cmd = [
-                            "streamlink",
-                            "--stdout",
-                            stream_url,
-                            "best",
-                            "--hls-live-restart",
-                            "--plugin-dirs",
-                            str(PLUGIN_DIR_PATH),
-                            "--stream-segment-threads",
-                            str(stream_segment_threads),
-                            *streamlink_http_header_args(cookies),
-                            "--ffmpeg-ffmpeg",
-                            str(ffmpeg_path),
-                            "--ffmpeg-copyts",
-                            "--ffmpeg-start-at-zero",
-                            "--hls-segment-stream-data",
-                        ]
-
-                        stream_process = await active_attempt.start_streamlink(
-                            streamlink_cmd
-                        )
-                        if stream_process.stdout is None:
-                            raise RuntimeError("streamlink stdout pipe was not created")
+                        job = await queue.claim(settings["concurrency"])
+                    except sqlite3.Error as e:
+                        logger.warning(f"Failed to read the transcode queue: {e}")
+                        job = None
+                    if job is None:
+                        break
+                    task = asyncio.create_task(
+                        run_transcode_job(queue, job, ffmpeg_path, settings)
+                    )
+                    running.add(task)
+                    task.add_done_callback(finished)
+
+            added_task = asyncio.create_task(queue.added.wait())
+            await asyncio.wait(
+                [added_task, *running],
+                timeout=TRANSCODE_POLL_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            added_task.cancel()
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
 
-                        # Start ffmpeg process
-                        base_input_args = []
-                        encoding_args = []
 
-                        active_av1_settings = resolve_av1_settings_for_recording(
-                            av1_settings, ffmpeg_path
-                        )
-                        enable_av1 = active_av1_settings.get("enable", False)
-                        av1_encoder = (
-                            active_av1_settings.get("encoder", "libsvtav1")
-                            if enable_av1
-                            else None
-                        )
-                        active_hevc_settings = hevc_settings
-                        if not enable_av1:
-                            active_hevc_settings = resolve_hevc_settings_for_recording(
-                                hevc_settings, ffmpeg_path
-                            )
-                        enable_hevc = (
-                            active_hevc_settings.get("enable", False)
-                            and not enable_av1
-                        )
-                        encoder = (
-                            active_hevc_settings.get("encoder", "libx265")
-                            if enable_hevc
-                            else None
-                        )
+def build_remux_command(
+    ffmpeg_path: Path, source_path: Path, output_path: Path, remux_format: str
+) -> List[str]:
+    command = [
+        str(ffmpeg_path),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-nostdin",
+        "-i",
+        str(source_path),
+        "-map",
+        "0:v?",
+        "-map",
+        "0:a?",
+        "-c",
+        "copy",
+        "-map_metadata",
+        "0",
+    ]
+    if remux_format == "mp4":
+        # Put the index up front so players can seek before the whole file loads.
+        command.extend(["-movflags", "+faststart"])
+    return [
+        *command,
+        "-f",
+        REMUX_FORMAT_MUXERS[remux_format],
+        "-y",
+        str(output_path),
+    ]
 
-                        # Handle VAAPI initialization before input
-                        if (
-                            enable_hevc
-                            and recording_format != "webm"
-                            and encoder == "hevc_vaapi"
-                        ) or (enable_av1 and av1_encoder == "av1_vaapi"):
-                            # Attempt to use the default render device
-                            base_input_args = [
-                                str(ffmpeg_path),
-                                "-init_hw_device",
-                                "vaapi=vaapi0:/dev/dri/renderD128",
-                                "-filter_hw_device",
-                                "vaapi0",
-                                "-fflags",
-                                "+genpts+discardcorrupt",
-                                "-i",
-                                "pipe:0",
-                                "-y",
-                            ]
-                        else:
-                            base_input_args = [
-                                str(ffmpeg_path),
-                                "-fflags",
-                                "+genpts+discardcorrupt",
-                                "-i",
-                                "pipe:0",
-                                "-y",
-                            ]
-
-                        metadata_args = [
-                            "-map_metadata:s:a",
-                            "0:s:a",
-                            "-map_metadata:s:v",
-                            "0:s:v",
-                        ]
 
-                        if enable_av1:
-                            encoding_args = build_av1_encoding_args(
-                                active_av1_settings, recording_format
-                            )
-                            encoding_args.extend(metadata_args)
-                        elif recording_format == "webm":
-                            if enable_hevc:
-                                logger.warning(
-                                    f"HEVC settings are ignored for WebM output on {channel_name}."
-                                )
-                            encoding_args = [
-                                "-c:v",
-                                "libvpx-vp9",
-                                "-deadline",
-                                "realtime",
-                                "-cpu-used",
-                                "5",
-                                "-b:v",
-                                "0",
-                                "-crf",
-                                "32",
-                                "-c:a",
-                                "libopus",
-                                "-b:a",
-                                "128k",
-                            ]
-
-                        elif enable_hevc:
-                            bitrate = active_hevc_settings.get("bitrate", "2500k")
-                            max_bitrate = active_hevc_settings.get(
-                                "max_bitrate", "10000k"
-                            )
-                            preset = active_hevc_settings.get("preset", "ultrafast")
-
-                            try:
-                                max_val = int(max_bitrate.lower().replace("k", ""))
-                                bufsize = f"{max_val * 2}k"
-                            except ValueError:
-                                bufsize = "16000k"
-
-                            common_hevc_args = [*metadata_args]
-                            if recording_format == "ts":
-                                common_hevc_args.extend(
-                                    [
-                                        "-bsf:a",
-                                        "aac_adtstoasc",
-                                        "-bsf:v",
-                                        "hevc_mp4toannexb",
-                                    ]
-                                )
-
-                            if encoder == "libx265":
-                                x265_params = (
-                                    "rc-lookahead=20:b-adapt=2:bframes=3:scenecut=40"
-                                )
-                                encoding_args = [
-                                    "-c:v",
-                                    "libx265",
-                                    "-preset",
-                                    preset,
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tune",
-                                    "zerolatency",
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-x265-params",
-                                    x265_params,
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            elif encoder == "hevc_nvenc":
-                                nv_preset = "p4"
-                                if (
-                                    "fast" in preset
-                                    or "super" in preset
-                                    or "ultra" in preset
-                                ):
-                                    nv_preset = "p1"
-                                elif "slow" in preset:
-                                    nv_preset = "p6"
-                                elif (
-                                    preset.startswith("p")
-                                    and len(preset) == 2
-                                    and preset[1].isdigit()
-                                ):
-                                    nv_preset = preset
-
-                                encoding_args = [
-                                    "-c:v",
-                                    "hevc_nvenc",
-                                    "-preset",
-                                    nv_preset,
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-rc",
-                                    "vbr",
-                                    "-spatial-aq",
-                                    "1",
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            elif encoder == "hevc_qsv":
-                                encoding_args = [
-                                    "-c:v",
-                                    "hevc_qsv",
-                                    "-preset",
-                                    preset,
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            elif encoder == "hevc_amf":
-                                encoding_args = [
-                                    "-c:v",
-                                    "hevc_amf",
-                                    "-usage",
-                                    "transcoding",
-                                    "-rc",
-                                    "vbr_peak",
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-c:a",
-                                    "copy",
-                                ]
-                                if "fast" in preset:
-                                    encoding_args.extend(["-quality", "speed"])
-                                else:
-                                    encoding_args.extend(["-quality", "balanced"])
-
-                            elif encoder == "hevc_vaapi":
-                                encoding_args = [
-                                    "-vf",
-                                    "format=nv12,hwupload",
-                                    "-c:v",
-                                    "hevc_vaapi",
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            elif encoder == "hevc_videotoolbox":
-                                encoding_args = [
-                                    "-c:v",
-                                    "hevc_videotoolbox",
-                                    "-allow_sw",
-                                    "1",
-                                    "-realtime",
-                                    "true",
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            else:
-                                x265_params = (
-                                    "rc-lookahead=20:b-adapt=2:bframes=3:scenecut=40"
-                                )
-                                encoding_args = [
-                                    "-c:v",
-                                    "libx265",
-                                    "-preset",
-                                    preset,
-                                    "-b:v",
-                                    bitrate,
-                                    "-maxrate",
-                                    max_bitrate,
-                                    "-bufsize",
-                                    bufsize,
-                                    "-tune",
-                                    "zerolatency",
-                                    "-tag:v",
-                                    "hvc1",
-                                    "-x265-params",
-                                    x265_params,
-                                    "-c:a",
-                                    "copy",
-                                ]
-
-                            encoding_args.extend(common_hevc_args)
-
-                        else:
-                            encoding_args = ["-c", "copy", *metadata_args]
-                            if recording_format == "ts":
-                                encoding_args.extend(
-                                    [
-                                        "-bsf:v",
-                                        "h264_mp4toannexb",
-                                        "-bsf:a",
-                                        "aac_adtstoasc",
-                                    ]
-                                )
-
-                        output_args = ["-progress", "pipe:2"]
-                        if recording_format in {"ts", "mkv"}:
-                            output_args.append("-copy_unknown")
-
-                        if recording_format == "ts":
-                            output_args.extend(
-                                [
-                                    "-f",
-                                    "mpegts",
-                                    "-mpegts_flags",
-                                    "resend_headers",
-                                    "-mpegts_copyts",
-                                    "0",
-                                    "-avoid_negative_ts",
-                                    "make_zero",
-                                    "-muxpreload",
-                                    "0",
-                                    "-muxdelay",
-                                    "0",
-                                    "-avioflags",
-                                    "direct",
-                                    str(temp_output_path),
-                                ]
-                            )
-                        elif recording_format == "mkv":
-                            output_args.extend(["-f", "matroska", str(temp_output_path)])
-                        elif recording_format == "webm":
-                            output_args.extend(["-f", "webm", str(temp_output_path)])
+async def read_media_duration(ffmpeg_path: Path, path: Path) -> Optional[float]:
+    """The duration in a file's container header, as ffmpeg reports it."""
+    process = await create_isolated_subprocess_exec(
+        str(ffmpeg_path),
+        "-hide_banner",
+        "-nostdin",
+        "-i",
+        str(path),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    # ffmpeg exits with an error because there is no output; the header is printed first.
+    _, stderr = await process.communicate()
+    match = FFMPEG_DURATION_PATTERN.search(stderr.decode(errors="ignore"))
+    return parse_time(match.group(1)) if match else None
 
-                        ffmpeg_cmd = base_input_args + encoding_args + output_args
 
-                        ffmpeg_process = await active_attempt.start_ffmpeg(ffmpeg_cmd)
-                        if ffmpeg_process.stdin is None or ffmpeg_process.stderr is None:
-                            raise RuntimeError("ffmpeg pipes were not created")
+async def remux_recording(
+    source_path: Path, ffmpeg_path: Path, settings: Mapping[str, Any]
+) -> None:
+    remux_format = settings["format"]
+    output_path = unique_path(source_path.with_suffix(f".{remux_format}"))
+    temp_output_path = output_path.with_name(f"{output_path.name}.part")
+    command = build_remux_command(ffmpeg_path, source_path, temp_output_path, remux_format)
+    logger.info(f"Remuxing {source_path.name} to {output_path.name}.")
+    process = None
+    output_duration = None
+    try:
+        # Measured on the recording itself; the remux's own progress would only
+        # confirm that ffmpeg wrote what it read.
+        source_duration = await read_media_duration(ffmpeg_path, source_path)
+        if source_duration is None:
+            logger.warning(
+                f"Could not read the duration of {source_path.name}; not remuxing it."
+            )
+            return
+        process = await create_isolated_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            **low_priority_subprocess_kwargs(settings["niceness"]),
+        )
+        log_task = asyncio.create_task(
+            read_log_stream(process.stderr, "ffmpeg remux", source_path.name)
+        )
+        await process.wait()
+        await log_task
+        if process.returncode == 0:
+            output_duration = await read_media_duration(ffmpeg_path, temp_output_path)
+    except asyncio.CancelledError:
+        await terminate_process(process, "ffmpeg remux")
+        with contextlib.suppress(OSError):
+            temp_output_path.unlink(missing_ok=True)
+        raise
+    except OSError as e:
+        logger.error(f"Could not run ffmpeg to remux {source_path}: {e}")
+        with contextlib.suppress(OSError):
+            temp_output_path.unlink(missing_ok=True)
+        return
 
-                        if not recording_started:
-                            logger.info(
-                                f"Recording started for {channel_name} at {current_time}."
-                            )
-                            recording_started = True
-                            recording_start_time = current_time
-
-                        # Initialize channel progress data
-                        async with channel_progress_lock:
-                            channel_progress[channel_id] = {
-                                "channel_name": channel_name,
-                                "bitrate": "N/A",
-                                "download_speed": "N/A",
-                                "total_size": "N/A",
-                                "out_time": "N/A",
-                                "recording_start_time": recording_start_time,
-                            }
-
-                        pipe_task = active_attempt.create_task(
-                            pipe_stream_to_stdin(
-                                stream_process.stdout, ffmpeg_process.stdin, channel_name
-                            )
-                        )
-                        stream_stderr_task = active_attempt.create_task(
-                            read_log_stream(stream_process.stderr, "streamlink", channel_id)
-                        )
-                        ffmpeg_stderr_task = active_attempt.create_task(
-                            read_stream(ffmpeg_process.stderr, channel_id, "stderr")
-                        )
-                        ffmpeg_wait_task = active_attempt.create_task(ffmpeg_process.wait())
-                        stream_wait_task = active_attempt.create_task(stream_process.wait())
-                        shutdown_wait_task = active_attempt.create_task(
-                            shutdown_event.wait(), cancel_on_cleanup=True
-                        )
+    if process.returncode != 0:
+        logger.warning(
+            f"Remuxing {source_path.name} failed with return code {process.returncode}."
+        )
+    elif output_duration is None or (
+        abs(output_duration - source_duration) > settings["duration_tolerance_seconds"]
+    ):
+        logger.warning(
+            f"Remux of {source_path.name} is {output_duration or 0:.1f}s long but the "
+            f"source is {source_duration:.1f}s; keeping the source only."
+        )
+    else:
+        try:
+            temp_output_path.replace(output_path)
+            if settings["delete_source"]:
+                source_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.error(f"Could not save the remux of {source_path}: {e}")
+        else:
+            logger.info(f"Remuxed recording saved to {output_path}")
+            return
+    with contextlib.suppress(OSError):
+        temp_output_path.unlink(missing_ok=True)
+
+
+class RemuxPool:
+    """Remuxes finished recordings in the background with a bounded set of workers.
+
+    The work happens in low-priority ffmpeg processes, so the event loop only
+    waits on them. Pending remuxes live in memory; a file still queued at
+    shutdown is left as recorded.
+    """
+
+    def __init__(
+        self, ffmpeg_path: Path, get_settings: Callable[[], Mapping[str, Any]]
+    ) -> None:
+        self.ffmpeg_path = ffmpeg_path
+        self.get_settings = get_settings
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.running: Set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + len(self.running)
+
+    def submit(self, source_path: Path) -> None:
+        self.queue.put_nowait(source_path)
+        post_processing_depth["Remux"] = self.depth
+        logger.info(f"Queued {source_path.name} for remuxing.")
+
+    def finished(self, task: asyncio.Task) -> None:
+        self.running.discard(task)
+        post_processing_depth["Remux"] = self.depth
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Remux job failed: {task.exception()}")
+
+    async def run(self) -> None:
+        try:
+            while True:
+                source_path = await self.queue.get()
+                while len(self.running) >= self.get_settings()["workers"]:
+                    await asyncio.wait(self.running, return_when=asyncio.FIRST_COMPLETED)
+                post_processing_depth["Remux"] = self.depth
+                if not source_path.exists():
+                    logger.warning(f"Dropping remux of {source_path}: the file no longer exists.")
+                    continue
+                capabilities = await get_ffmpeg_capabilities(self.ffmpeg_path)
+                settings = self.get_settings()
+                muxer = REMUX_FORMAT_MUXERS[settings["format"]]
+                if capabilities is not None and muxer not in capabilities.muxers:
+                    logger.warning(
+                        f"ffmpeg was built without the {muxer} muxer; "
+                        f"not remuxing {source_path.name}."
+                    )
+                    continue
+                task = asyncio.create_task(
+                    remux_recording(source_path, self.ffmpeg_path, settings)
+                )
+                self.running.add(task)
+                task.add_done_callback(self.finished)
+                post_processing_depth["Remux"] = self.depth
+        finally:
+            for task in self.running:
+                task.cancel()
+            await asyncio.gather(*self.running, return_exceptions=True)
+            post_processing_depth.pop("Remux", None)
 
-                        done, _ = await asyncio.wait(
-                            [ffmpeg_wait_task, stream_wait_task, shutdown_wait_task],
-                            return_when=asyncio.FIRST_COMPLETED,
-                        )
 
-                        completed_by = None
-                        stop_after_attempt = False
-                        if shutdown_wait_task in done:
-                            completed_by = "shutdown"
-                            stop_after_attempt = True
-                            await terminate_process(stream_process, "streamlink")
-                            await drain_task(pipe_task, timeout=10)
-                            if not await wait_for_task_completion(
-                                ffmpeg_wait_task,
-                                f"ffmpeg finalize for {channel_name}",
-                                FFMPEG_FINALIZE_TIMEOUT_SECONDS,
-                            ):
-                                await terminate_process(ffmpeg_process, "ffmpeg")
-
-                        if ffmpeg_wait_task in done:
-                            completed_by = "ffmpeg"
-                            await terminate_process(stream_process, "streamlink")
-                        elif stream_wait_task in done:
-                            completed_by = "streamlink"
-                            if not await wait_for_task_completion(
-                                ffmpeg_wait_task,
-                                f"ffmpeg after streamlink ended for {channel_name}",
-                                FFMPEG_FINALIZE_TIMEOUT_SECONDS,
-                            ):
-                                await terminate_process(ffmpeg_process, "ffmpeg")
-
-                        if stream_wait_task and not stream_wait_task.done():
-                            await terminate_process(stream_process, "streamlink")
-                            await drain_task(stream_wait_task)
-                        if ffmpeg_wait_task and not ffmpeg_wait_task.done():
-                            await terminate_process(ffmpeg_process, "ffmpeg")
-                            await drain_task(ffmpeg_wait_task)
-
-                        ffmpeg_returncode = ffmpeg_process.returncode
-                        stream_returncode = stream_process.returncode
-                        logger.info(
-                            f"ffmpeg process for {channel_name} exited with return code {ffmpeg_returncode}."
-                        )
-                        logger.info(
-                            f"Stream recording process for {channel_name} exited with return code {stream_returncode}."
-                        )
-                        if ffmpeg_returncode not in (0, None):
-                            logger.warning(
-                                f"ffmpeg failed for {channel_name}; see the ffmpeg stderr lines above for the root cause."
-                            )
-                        if (
-                            stream_returncode not in (0, None)
-                            and completed_by not in {"ffmpeg", "shutdown"}
-                        ):
-                            logger.warning(
-                                f"streamlink failed for {channel_name}; see the streamlink stderr lines above for the root cause."
-                            )
-                        if recording_started:
-                            logger.info(f"Recording stopped for {channel_name}.")
-                            recording_started = False
-
-                        # Atomically rename the temporary file to final output
-                        if temp_output_path and final_output_path and temp_output_path.exists():
-                            if temp_output_path.stat().st_size == 0:
-                                temp_output_path.unlink(missing_ok=True)
-                                logger.warning(
-                                    f"Discarded empty recording file for {channel_name}."
-                                )
-                            elif ffmpeg_returncode != 0:
-                                logger.warning(
-                                    f"Leaving incomplete recording file at {temp_output_path} "
-                                    f"because ffmpeg exited with return code {ffmpeg_returncode}."
-                                )
-                            else:
-                                destination_path = unique_path(final_output_path)
-                                temp_output_path.replace(destination_path)
-                                final_output_path = destination_path
-                                logger.info(f"Recording saved to {final_output_path}")
-
-                        # Remove progress data
-                        async with channel_progress_lock:
-                            channel_progress.pop(channel_id, None)
+def load_live_history(file_path: Path) -> Dict[str, List[float]]:
+    try:
+        data = orjson.loads(file_path.read_bytes())
+    except FileNotFoundError:
+        return {}
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable live history at {file_path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
 
-                        if stop_after_attempt:
-                            break
+    history = {}
+    for channel_id, events in data.items():
+        if isinstance(events, list):
+            history[str(channel_id)] = [
+                float(event) for event in events if isinstance(event, (int, float))
+            ][-LIVE_HISTORY_MAX_EVENTS:]
+    return history
+
+
+def seconds_into_day(timestamp: float) -> int:
+    local_time = time.localtime(timestamp)
+    return local_time.tm_hour * 3600 + local_time.tm_min * 60 + local_time.tm_sec
+
+
+class AdaptivePollPolicy:
+    """Learns when channels usually go live and scales their poll intervals."""
+
+    def __init__(
+        self,
+        settings: Dict[str, Any],
+        history_path: Path = LIVE_HISTORY_FILE_PATH,
+    ) -> None:
+        self.settings = settings
+        self.history_path = history_path
+        self._history = load_live_history(history_path)
+        self._misses: Dict[str, int] = {}
+        self._save_task: Optional[asyncio.Task] = None
+        self._unsaved = False
+
+    def record_live(self, channel_id: str) -> None:
+        self._misses.pop(channel_id, None)
+        events = self._history.setdefault(channel_id, [])
+        events.append(time.time())
+        del events[:-LIVE_HISTORY_MAX_EVENTS]
+        self._unsaved = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_history())
+
+    async def _save_history(self) -> None:
+        # Events recorded while a write is in flight go out together in the next one.
+        while self._unsaved:
+            self._unsaved = False
+            snapshot = {channel_id: list(events) for channel_id, events in self._history.items()}
+            try:
+                await asyncio.to_thread(save_json_secure, self.history_path, snapshot)
+            except OSError as e:
+                logger.warning(f"Failed to save live history: {e}")
+
+    def in_live_window(self, channel_id: str, now: float) -> bool:
+        window = self.settings["window_minutes"] * 60
+        cutoff = now - LIVE_HISTORY_RECENT_DAYS * 86400
+        now_of_day = seconds_into_day(now)
+        matches = 0
+        for event in self._history.get(channel_id, []):
+            if event < cutoff:
+                continue
+            # Distance on the 24-hour clock, so 23:50 and 00:10 are 20 minutes apart.
+            distance = abs(seconds_into_day(event) - now_of_day)
+            if min(distance, 86400 - distance) <= window:
+                matches += 1
+        return matches >= ADAPTIVE_POLL_MIN_MATCHES
+
+    def next_interval(self, channel_id: str, status: str, base: float) -> float:
+        misses = self._misses.get(channel_id, 0) + 1
+        self._misses[channel_id] = misses
+        if not self.settings.get("enable"):
+            return base
+
+        now = time.time()
+        if status != "BLOCK" and self.in_live_window(channel_id, now):
+            return min(base, self.settings["fast_interval"])
+
+        events = self._history.get(channel_id)
+        if (
+            status != "BLOCK"
+            and events
+            and now - events[-1] < ADAPTIVE_POLL_ACTIVE_DAYS * 86400
+        ):
+            return base
+
+        # Blocked channels back off on every poll, dormant ones every few polls.
+        exponent = misses if status == "BLOCK" else misses // ADAPTIVE_POLL_BACKOFF_STEP
+        max_interval = max(base, self.settings["max_interval"])
+        return min(base * 2 ** min(exponent, 16), max_interval)
+
+
+class LiveStatusScheduler:
+    """Polls every offline channel from one timer heap with bounded concurrency."""
+
+    def __init__(
+        self,
+        client: ChzzkApiClient,
+        on_live: Callable[[Dict[str, Any], Dict[str, Any]], None],
+        interval: float,
+        policy: "AdaptivePollPolicy",
+        concurrency: int = LIVE_STATUS_POLL_CONCURRENCY,
+    ) -> None:
+        self.client = client
+        self.on_live = on_live
+        self.interval = interval
+        self.policy = policy
+        self.headers: Dict[str, str] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._polls: Set[asyncio.Task] = set()
+
+    def __contains__(self, channel_id: object) -> bool:
+        return channel_id in self._entries
+
+    def channel_ids(self) -> Set[str]:
+        return set(self._entries)
+
+    def schedule(self, channel: Dict[str, Any], delay: float = 0.0) -> None:
+        channel_id = str(channel["id"])
+        sequence = next(self._sequence)
+        self._entries[channel_id] = (sequence, channel)
+        heapq.heappush(
+            self._heap, (time.monotonic() + max(0.0, delay), sequence, channel_id)
+        )
+        self._wakeup.set()
+
+    def set_interval(self, interval: float) -> None:
+        """Apply a new base interval, pulling in checks that are now overdue."""
+        self.interval = interval
+        latest_due = time.monotonic() + interval
+        for due, sequence, channel_id in list(self._heap):
+            if due > latest_due and self._is_current(sequence, channel_id):
+                self.schedule(self._entries[channel_id][1], interval)
+
+    def update_channel(self, channel: Dict[str, Any]) -> None:
+        channel_id = str(channel["id"])
+        entry = self._entries.get(channel_id)
+        if entry is not None:
+            self._entries[channel_id] = (entry[0], channel)
+
+    def discard(self, channel_id: str) -> None:
+        # Heap entries are dropped lazily once their sequence no longer matches.
+        self._entries.pop(channel_id, None)
+
+    def _is_current(self, sequence: int, channel_id: str) -> bool:
+        entry = self._entries.get(channel_id)
+        return entry is not None and entry[0] == sequence
+
+    def _next_delay(self) -> Optional[float]:
+        while self._heap:
+            due, sequence, channel_id = self._heap[0]
+            if self._is_current(sequence, channel_id):
+                return max(0.0, due - time.monotonic())
+            heapq.heappop(self._heap)
+        return None
 
-                    finally:
-                        if active_attempt is not None:
-                            await active_attempt.cleanup()
-                            active_attempt = None
+    async def run(self) -> None:
+        try:
+            while not shutdown_event.is_set():
+                self._wakeup.clear()
+                delay = self._next_delay()
+                if delay is None or delay > 0:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
 
-                except asyncio.CancelledError:
-                    logger.info(f"Recording task for {channel_name} was cancelled.")
-                    if recording_started:
-                        logger.info(f"Recording stopped for {channel_name}.")
-                        recording_started = False
-                    break
-                except Exception as e:
-                    logger.exception(
-                        f"Error occurred while recording {channel_name}: {e}"
-                    )
-                    if recording_started:
-                        logger.info(f"Recording stopped for {channel_name}.")
-                        recording_started = False
-                    if active_attempt is not None:
-                        await active_attempt.cleanup()
-                        active_attempt = None
-            else:
-                logger.error(f"No stream URL available for {channel_name}")
-                if recording_started:
-                    logger.info(f"Recording stopped for {channel_name}.")
-                    recording_started = False
+                _, sequence, channel_id = heapq.heappop(self._heap)
+                await self._semaphore.acquire()
+                if not self._is_current(sequence, channel_id):
+                    self._semaphore.release()
+                    continue
+                task = asyncio.create_task(self._poll(sequence, channel_id))
+                self._polls.add(task)
+                task.add_done_callback(self._polls.discard)
+        finally:
+            for task in self._polls:
+                task.cancel()
+            await asyncio.gather(*self._polls, return_exceptions=True)
 
-            # Wait for shutdown event or timeout
-            try:
-                await asyncio.wait_for(shutdown_event.wait(), timeout=timeout)
-            except asyncio.TimeoutError:
-                continue
+    async def _poll(self, sequence: int, channel_id: str) -> None:
+        try:
+            if not self._is_current(sequence, channel_id):
+                return
+            channel = self._entries[channel_id][1]
+            status, live_info = await get_live_info(channel, self.headers, self.client)
+        finally:
+            self._semaphore.release()
 
-    finally:
-        if active_attempt is not None:
-            await active_attempt.cleanup()
-        if recording_started and temp_output_path and temp_output_path.exists():
-            logger.warning(
-                f"Leaving unfinished recording file at {temp_output_path}."
+        # The channel may have been removed or rescheduled while the request ran.
+        if not self._is_current(sequence, channel_id):
+            return
+        channel = self._entries[channel_id][1]
+        if status != "OPEN":
+            interval = self.policy.next_interval(channel_id, status, self.interval)
+            logger.debug(
+                f"Waiting for the channel '{channel['name']}' to go live "
+                f"(next check in {interval:.0f}s)..."
             )
-        # Remove progress data
-        async with channel_progress_lock:
-            channel_progress.pop(channel_id, None)
+            self.schedule(channel, interval)
+            return
+
+        del self._entries[channel_id]
+        self.policy.record_live(channel_id)
+        try:
+            self.on_live(channel, live_info)
+        except Exception as e:
+            logger.exception(f"Failed to start recording for {channel['name']}: {e}")
+            self.schedule(channel, self.interval)
 
 
-async def manage_recording_tasks():
-    active_tasks: Dict[str, asyncio.Task] = {}
-    (
-        timeout,
-        stream_segment_threads,
-        channels,
-        delays,
-        hevc_settings,
-        av1_settings,
-        output_format,
-    ) = await load_settings()
-    cookies = await get_session_cookies()
-    headers = get_auth_headers(cookies)
+async def manage_recording_tasks(shard: Optional[Tuple[int, int]] = None):
+    recordings: Dict[str, ActiveRecording] = {}
+    monitored_channels: Dict[str, Mapping[str, Any]] = {}
+    channel_configs: Dict[str, ChannelRecordingConfig] = {}
+    await config_service.reload(force=True)
+    settings = config_service.snapshot
     ffmpeg_path = await setup_paths()
 
     if not ffmpeg_path or not ffmpeg_path.exists():
         logger.error("ffmpeg executable not found. Exiting.")
         return
+    coordinator = None
+    shard_ring = None
+    if settings.coordination.get("enable"):
+        # Every worker process is its own node; leases replace the local shard ring.
+        node_id = settings.coordination["node_id"]
+        if shard is not None:
+            node_id = f"{node_id}#{shard[0]}"
+        coordinator = LeaseCoordinator(
+            Path(settings.coordination["database"] or COORDINATION_DB_FILE_PATH),
+            node_id,
+            settings.coordination["lease_seconds"],
+        )
+        logger.info(
+            f"Coordinating channels as node {node_id} through {coordinator.database_path}."
+        )
+    elif shard is not None:
+        shard_ring = ConsistentHashRing(range(shard[1]))
+    warm_pool = WarmProcessPool()
+    transcode_queue = TranscodeQueue(
+        Path(settings.deferred_transcode["database"] or TRANSCODE_QUEUE_DB_FILE_PATH)
+    )
+    remux_pool = RemuxPool(ffmpeg_path, lambda: config_service.snapshot.remux)
+
+    def configured_channel_ids() -> Set[str]:
+        return {
+            channel["id"]
+            for channel in config_service.snapshot.channels
+            if channel.get("active", "on") == "on"
+        }
+
+    def owns_channel(channel_id: str) -> bool:
+        if coordinator is not None:
+            return channel_id in coordinator.owned or channel_id in recordings
+        return shard_ring is None or shard_ring.node_for(channel_id) == shard[0]
+
+    async def run_recording(
+        recording: ActiveRecording, live_info: Dict[str, Any]
+    ) -> None:
+        channel = recording.config.channel
+        if coordinator is not None and not await coordinator.claim_live(
+            live_info.get("liveId"), channel["id"]
+        ):
+            logger.info(
+                f"Live {live_info.get('liveId')} of {channel.get('name', 'Unknown')} "
+                "is already being recorded by another node."
+            )
+            return
+        await record_stream(
+            recording,
+            live_info,
+            ffmpeg_path,
+            api_client,
+            warm_pool,
+            transcode_queue,
+            remux_pool,
+        )
+
+    async def maintain_warm_pool() -> None:
+        library_loaded = False
+        while True:
+            snapshot = config_service.snapshot
+            warm_pool.settings = snapshot.warm_pool
+            candidates = {}
+            spares = 0
+            if snapshot.warm_pool.get("enable"):
+                if snapshot.recording_backend == "library" and not library_loaded:
+                    # Import streamlink and the plugin before the first go-live.
+                    await asyncio.get_running_loop().run_in_executor(
+                        streamlink_executor(), load_streamlink_plugin
+                    )
+                    library_loaded = True
+                now = time.time()
+                candidates = {
+                    channel_id: config
+                    for channel_id, config in channel_configs.items()
+                    if channel_id not in recordings
+                    and scheduler.policy.in_live_window(channel_id, now)
+                }
+                if snapshot.recording_backend == "subprocess":
+                    spares = snapshot.warm_pool["streamlink_spares"]
+            try:
+                await warm_pool.refresh(candidates, ffmpeg_path, spares)
+            except Exception as e:
+                logger.warning(f"Failed to refresh the warm process pool: {e}")
+            await asyncio.sleep(WARM_POOL_REFRESH_SECONDS)
+
+    def start_recording(channel: Mapping[str, Any], live_info: Dict[str, Any]) -> None:
+        channel_id = str(channel["id"])
+        recording = ActiveRecording(
+            ChannelRecordingConfig.from_settings(channel, config_service.snapshot)
+        )
+        recording.task = asyncio.create_task(run_recording(recording, live_info))
+        recordings[channel_id] = recording
+        recording.task.add_done_callback(
+            lambda finished: finish_recording(channel_id, finished)
+        )
+
+    def finish_recording(channel_id: str, task: asyncio.Task) -> None:
+        recording = recordings.get(channel_id)
+        restart_now = False
+        if recording is not None and recording.task is task:
+            del recordings[channel_id]
+            restart_now = recording.restart_now
+        if shutdown_event.is_set() or task.cancelled():
+            return
+        channel = monitored_channels.get(channel_id)
+        if channel is not None and (restart_now or channel_id not in scheduler):
+            scheduler.schedule(channel, 0 if restart_now else config_service.snapshot.timeout)
 
     request_timeout = aiohttp.ClientTimeout(total=30)
     async with aiohttp.ClientSession(timeout=request_timeout) as session:
+        api_client = ChzzkApiClient(session)
+        scheduler = LiveStatusScheduler(
+            api_client,
+            start_recording,
+            settings.timeout,
+            AdaptivePollPolicy(settings.adaptive_polling),
+        )
+        scheduler_task = asyncio.create_task(scheduler.run())
+        config_watch_task = asyncio.create_task(config_service.watch())
+        shutdown_wait_task = asyncio.create_task(shutdown_event.wait())
+        warm_pool_task = asyncio.create_task(maintain_warm_pool())
+        # Probe in the background; a recording that needs a result joins the probe.
+        encoder_probe_task = asyncio.create_task(
+            probe_configured_encoders(settings, ffmpeg_path)
+        )
+        transcode_task = asyncio.create_task(
+            run_transcode_queue(
+                transcode_queue,
+                ffmpeg_path,
+                lambda: config_service.snapshot.deferred_transcode,
+            )
+        )
+        remux_task = asyncio.create_task(remux_pool.run())
+        lease_task = None
+        if coordinator is not None:
+            try:
+                await coordinator.refresh(configured_channel_ids(), set())
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to acquire channel leases: {e}")
+            lease_task = asyncio.create_task(
+                coordinator.run(configured_channel_ids, lambda: set(recordings))
+            )
         try:
             while not shutdown_event.is_set():
-                (
-                    new_timeout,
-                    new_stream_segment_threads,
-                    new_channels,
-                    new_delays,
-                    new_hevc_settings,
-                    new_av1_settings,
-                    new_output_format,
-                ) = await load_settings()
-                active_channels = 0
-
-                current_channel_ids = {
-                    str(channel.get("id")) for channel in new_channels
+                settings = config_service.snapshot
+                scheduler.headers = get_auth_headers(settings.cookies)
+                scheduler.policy.settings = settings.adaptive_polling
+                if settings.timeout != scheduler.interval:
+                    scheduler.set_interval(settings.timeout)
+
+                monitored_channels = {
+                    channel["id"]: channel
+                    for channel in settings.channels
+                    if channel.get("active", "on") == "on" and owns_channel(channel["id"])
+                }
+                previous_configs = channel_configs
+                channel_configs = {
+                    channel_id: ChannelRecordingConfig.from_settings(channel, settings)
+                    for channel_id, channel in monitored_channels.items()
                 }
+                _, _, updated_channels = diff_channel_configs(
+                    previous_configs, channel_configs
+                )
 
-                # Cancel tasks for removed or deactivated channels
-                for channel_id in list(active_tasks.keys()):
-                    if channel_id not in current_channel_ids:
-                        task = active_tasks.pop(channel_id)
-                        task.cancel()
+                # Stop monitoring and recording removed or deactivated channels
+                known_channel_ids = scheduler.channel_ids() | set(recordings)
+                for channel_id in known_channel_ids - set(monitored_channels):
+                    scheduler.discard(channel_id)
+                    recording = recordings.pop(channel_id, None)
+                    if recording is not None and recording.task is not None:
+                        recording.task.cancel()
                         logger.info(
                             f"Cancelled recording task for deactivated channel: {channel_id}"
                         )
-                        # Remove progress data
-                        async with channel_progress_lock:
-                            channel_progress.pop(channel_id, None)
-
-                for channel in new_channels:
-                    channel_id = str(channel.get("id"))
-                    if not channel_id:
-                        logger.warning("Channel ID is missing in configuration.")
-                        continue
-                    if channel_id not in active_tasks:
-                        if channel.get("active", "on") == "on":
-                            task = asyncio.create_task(
-                                record_stream(
-                                    channel,
-                                    headers,
-                                    session,
-                                    new_delays.get(channel.get("identifier"), 0),
-                                    new_timeout,
-                                    ffmpeg_path,
-                                    new_stream_segment_threads,
-                                    new_hevc_settings,
-                                    new_av1_settings,
-                                    new_output_format,
-                                )
-                            )
-                            active_tasks[channel_id] = task
-                            active_channels += 1
+                    elif coordinator is not None and channel_id in configured_channel_ids():
+                        logger.info(f"Channel {channel_id} is now leased to another node.")
+                    else:
+                        logger.info(
+                            f"Stopped monitoring deactivated channel: {channel_id}"
+                        )
+                    # Remove progress data
+                    async with channel_progress_lock:
+                        channel_progress.pop(channel_id, None)
+
+                for channel_id, channel in monitored_channels.items():
+                    changed_fields = updated_channels.get(channel_id, [])
+                    if channel_id in recordings:
+                        if changed_fields:
+                            recordings[channel_id].stage(channel_configs[channel_id])
                             logger.info(
-                                f"Started recording task for new active channel: {channel.get('name', 'Unknown')}"
+                                f"Settings changed for {channel['name']} "
+                                f"({', '.join(changed_fields)}); applying at the next reconnect."
                             )
-                    else:
-                        if channel.get("active", "on") == "off":
-                            task = active_tasks.pop(channel_id)
-                            task.cancel()
+                        continue
+                    if channel_id in scheduler:
+                        scheduler.update_channel(channel)
+                        if changed_fields:
                             logger.info(
-                                f"Cancelled recording task for deactivated channel: {channel.get('name', 'Unknown')}"
+                                f"Applied new settings to idle channel {channel['name']} "
+                                f"({', '.join(changed_fields)})."
                             )
-                            # Remove progress data
-                            async with channel_progress_lock:
-                                channel_progress.pop(channel_id, None)
-                        else:
-                            active_channels += 1
+                        continue
+                    scheduler.schedule(
+                        channel, settings.delays.get(channel.get("identifier"), 0)
+                    )
+                    logger.info(
+                        f"Started monitoring new active channel: {channel.get('name', 'Unknown')}"
+                    )
 
-                if active_channels == 0:
+                if not monitored_channels:
                     logger.info("All channels are inactive. No active recordings.")
 
-                # Wait for shutdown event or 10 seconds
-                try:
-                    await asyncio.wait_for(shutdown_event.wait(), timeout=10)
-                except asyncio.TimeoutError:
-                    continue
+                # Wait for shutdown, the next configuration change or a lease change
+                wait_tasks = [
+                    asyncio.create_task(config_service.wait_for_update()),
+                    shutdown_wait_task,
+                ]
+                if coordinator is not None:
+                    coordinator.changed.clear()
+                    wait_tasks.append(asyncio.create_task(coordinator.changed.wait()))
+                await asyncio.wait(wait_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in wait_tasks:
+                    if task is not shutdown_wait_task:
+                        task.cancel()
         except asyncio.CancelledError:
             logger.info("Recording management task was cancelled.")
         finally:
-            active_recording_tasks = list(active_tasks.values())
+            helper_tasks = [
+                scheduler_task,
+                config_watch_task,
+                shutdown_wait_task,
+                warm_pool_task,
+                encoder_probe_task,
+                transcode_task,
+            ]
+            for task in helper_tasks:
+                task.cancel()
+            await asyncio.gather(*helper_tasks, return_exceptions=True)
+            await warm_pool.close()
+            active_recording_tasks = [
+                recording.task
+                for recording in recordings.values()
+                if recording.task is not None
+            ]
             if active_recording_tasks:
                 done, pending = await asyncio.wait(
                     active_recording_tasks,
@@ -2016,6 +6545,16 @@ async def manage_recording_tasks():
                     for task in pending:
                         task.cancel()
                     await asyncio.gather(*pending, return_exceptions=True)
+            # Recordings that finished during shutdown have queued their transcodes by now.
+            await transcode_queue.close()
+            remux_task.cancel()
+            await asyncio.gather(remux_task, return_exceptions=True)
+            if coordinator is not None:
+                # Leases stay renewed while recordings finalize, then go to other nodes.
+                if lease_task is not None:
+                    lease_task.cancel()
+                    await asyncio.gather(lease_task, return_exceptions=True)
+                await coordinator.release()
 
 
 def handle_shutdown():
@@ -2050,15 +6589,22 @@ async def display_progress():
                         table.add_column("Total Size")
                         table.add_column("Out Time")
                         table.add_column("Start Time")
-
-                        table.add_row(
+                        row = [
                             progress_data.get("channel_name", "Unknown"),
                             progress_data.get("bitrate", "N/A"),
                             progress_data.get("download_speed", "N/A"),
                             progress_data.get("total_size", "N/A"),
                             progress_data.get("out_time", "N/A"),
                             progress_data.get("recording_start_time", "N/A"),
-                        )
+                        ]
+                        if "spool" in progress_data:
+                            table.add_column("Spool")
+                            row.append(progress_data["spool"])
+                        if "encode_speed" in progress_data:
+                            table.add_column("Encode Speed")
+                            row.append(progress_data["encode_speed"])
+
+                        table.add_row(*row)
 
                         # Wrap each channel's table in a panel
                         panel = Panel(
@@ -2071,6 +6617,14 @@ async def display_progress():
                         Panel("No active recordings.", title="Recording Progress")
                     )
 
+            queued = [
+                f"{stage}: {depth} file(s)"
+                for stage, depth in post_processing_depth.items()
+                if depth
+            ]
+            if queued:
+                channel_panels.append(Panel("\n".join(queued), title="Post-processing"))
+
             # Group all channel panels together
             progress_display = Group(*channel_panels)
 
@@ -2093,6 +6647,324 @@ async def display_progress():
             await asyncio.sleep(0.1)
 
 
+def hash_ring_key(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """Maps channel ids to nodes so adding or removing a node moves few channels."""
+
+    def __init__(self, nodes: Iterable[Any], replicas: int = WORKER_HASH_REPLICAS) -> None:
+        self._ring = sorted(
+            (hash_ring_key(f"node-{node}-{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    def node_for(self, value: str) -> Any:
+        index = bisect.bisect(self._keys, hash_ring_key(value)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class LeaseCoordinator:
+    """Claims channels through renewable leases in a SQLite file shared by recorder nodes."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS nodes (
+            node_id TEXT PRIMARY KEY,
+            heartbeat REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS channel_leases (
+            channel_id TEXT PRIMARY KEY,
+            node_id TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS recorded_lives (
+            live_id TEXT PRIMARY KEY,
+            channel_id TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            claimed_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, database_path: Path, node_id: str, lease_seconds: int) -> None:
+        self.database_path = database_path
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.owned: Set[str] = set()
+        self.changed = asyncio.Event()
+        self._connection: Optional[sqlite3.Connection] = None
+        # One thread owns the connection; SQLite calls block on file locks.
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lease-db"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.database_path),
+                timeout=max(1, self.lease_seconds / 3),
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.executescript(self.SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _transaction(self, func: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(db, time.time())
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return result
+
+    async def _run(self, func: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._transaction, func)
+
+    def _live_nodes(self, db: sqlite3.Connection, now: float) -> List[str]:
+        return [
+            row[0]
+            for row in db.execute(
+                "SELECT node_id FROM nodes WHERE heartbeat >= ?",
+                (now - self.lease_seconds,),
+            )
+        ]
+
+    def _sync(
+        self,
+        db: sqlite3.Connection,
+        now: float,
+        channel_ids: Set[str],
+        recording_ids: Set[str],
+    ) -> Set[str]:
+        db.execute(
+            "INSERT INTO nodes (node_id, heartbeat) VALUES (?, ?) "
+            "ON CONFLICT (node_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (self.node_id, now),
+        )
+        ring = ConsistentHashRing(sorted(self._live_nodes(db, now)))
+        expires = now + self.lease_seconds
+        owned = set()
+        for channel_id in sorted(channel_ids):
+            # Keep leases for running recordings until they finish, even after a rebalance.
+            if ring.node_for(channel_id) != self.node_id and channel_id not in recording_ids:
+                continue
+            cursor = db.execute(
+                "INSERT INTO channel_leases (channel_id, node_id, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (channel_id) DO UPDATE SET "
+                "node_id = excluded.node_id, expires = excluded.expires "
+                "WHERE channel_leases.node_id = excluded.node_id "
+                "OR channel_leases.expires < ?",
+                (channel_id, self.node_id, expires, now),
+            )
+            if cursor.rowcount:
+                owned.add(channel_id)
+
+        held = [
+            row[0]
+            for row in db.execute(
+                "SELECT channel_id FROM channel_leases WHERE node_id = ?",
+                (self.node_id,),
+            )
+        ]
+        db.executemany(
+            "DELETE FROM channel_leases WHERE channel_id = ? AND node_id = ?",
+            [(channel_id, self.node_id) for channel_id in held if channel_id not in owned],
+        )
+        db.execute(
+            "DELETE FROM nodes WHERE heartbeat < ?",
+            (now - COORDINATION_NODE_EXPIRY_LEASES * self.lease_seconds,),
+        )
+        db.execute(
+            "DELETE FROM recorded_lives WHERE claimed_at < ?",
+            (now - COORDINATION_LIVE_RETENTION_SECONDS,),
+        )
+        return owned
+
+    async def refresh(self, channel_ids: Set[str], recording_ids: Set[str]) -> None:
+        owned = await self._run(
+            lambda db, now: self._sync(db, now, channel_ids, recording_ids)
+        )
+        if owned != self.owned:
+            self.owned = owned
+            self.changed.set()
+
+    async def run(
+        self,
+        channel_ids: Callable[[], Set[str]],
+        recording_ids: Callable[[], Set[str]],
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.refresh(channel_ids(), recording_ids())
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to renew channel leases in {self.database_path}: {e}")
+
+    def _claim_live(
+        self, db: sqlite3.Connection, now: float, live_id: str, channel_id: str
+    ) -> bool:
+        row = db.execute(
+            "SELECT node_id FROM recorded_lives WHERE live_id = ?", (live_id,)
+        ).fetchone()
+        if row is not None and row[0] != self.node_id:
+            if row[0] in self._live_nodes(db, now):
+                return False
+            logger.info(f"Taking over live {live_id} from unresponsive node {row[0]}.")
+        db.execute(
+            "INSERT INTO recorded_lives (live_id, channel_id, node_id, claimed_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (live_id) DO UPDATE SET "
+            "node_id = excluded.node_id, claimed_at = excluded.claimed_at",
+            (live_id, channel_id, self.node_id, now),
+        )
+        return True
+
+    async def claim_live(self, live_id: Any, channel_id: str) -> bool:
+        """Record that this node owns a broadcast; False if a live node already does."""
+        if live_id in (None, ""):
+            return True
+        try:
+            return await self._run(
+                lambda db, now: self._claim_live(db, now, str(live_id), channel_id)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not claim live {live_id} in {self.database_path}: {e}")
+            return True
+
+    async def release(self) -> None:
+        def release_all(db: sqlite3.Connection, now: float) -> None:
+            db.execute("DELETE FROM channel_leases WHERE node_id = ?", (self.node_id,))
+            db.execute("DELETE FROM nodes WHERE node_id = ?", (self.node_id,))
+
+        try:
+            await self._run(release_all)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to release channel leases in {self.database_path}: {e}")
+        finally:
+            if self._connection is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._connection.close
+                )
+                self._connection = None
+            self._executor.shutdown(wait=False)
+
+
+def worker_shard_from_env() -> Optional[Tuple[int, int]]:
+    """Return (index, count) when this process was started as a recording worker."""
+    value = os.environ.get(WORKER_ENV_VAR, "")
+    index, _, count = value.partition("/")
+    if not index.isdigit() or not count.isdigit() or int(index) >= int(count):
+        return None
+    return int(index), int(count)
+
+
+def flush_worker_events() -> None:
+    events = []
+    while not log_queue.empty():
+        events.append({"type": "log", "message": log_queue.get_nowait()})
+    events.append({"type": "progress", "channels": channel_progress})
+    sys.stdout.buffer.write(b"".join(orjson.dumps(event) + b"\n" for event in events))
+    sys.stdout.buffer.flush()
+
+
+async def publish_worker_events() -> None:
+    """Stream this worker's log lines and progress to the supervisor over stdout."""
+    while True:
+        try:
+            async with channel_progress_lock:
+                flush_worker_events()
+        except (BrokenPipeError, ValueError):
+            # The supervisor is gone; finish the recordings and exit.
+            shutdown_event.set()
+            return
+        await asyncio.sleep(WORKER_EVENT_INTERVAL_SECONDS)
+
+
+async def stop_worker_on_shutdown(
+    process: asyncio.subprocess.Process, index: int
+) -> None:
+    await shutdown_event.wait()
+    if process.returncode is not None:
+        return
+    # Workers finalize their recordings on SIGTERM.
+    signal_process_group(process)
+    try:
+        await asyncio.wait_for(process.wait(), timeout=WORKER_SHUTDOWN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"Recording worker {index} did not stop in time. Killing it.")
+        signal_process_group(process, force=True)
+
+
+async def run_worker(index: int, count: int) -> None:
+    worker_progress: Set[str] = set()
+    while not shutdown_event.is_set():
+        process = await create_isolated_subprocess_exec(
+            sys.executable,
+            str(Path(__file__).resolve()),
+            env={**os.environ, WORKER_ENV_VAR: f"{index}/{count}"},
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=WORKER_EVENT_LINE_LIMIT,
+        )
+        logger.info(f"Started recording worker {index} (pid {process.pid}).")
+        stderr_task = asyncio.create_task(
+            read_log_stream(process.stderr, "worker", str(index))
+        )
+        stop_task = asyncio.create_task(stop_worker_on_shutdown(process, index))
+        try:
+            # Keep reading until EOF so a finalizing worker never blocks on a full pipe.
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    event = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # e.g. the startup banner
+                if event.get("type") == "log":
+                    with contextlib.suppress(asyncio.QueueFull):
+                        log_queue.put_nowait(event.get("message", ""))
+                elif event.get("type") == "progress":
+                    channels = event.get("channels") or {}
+                    async with channel_progress_lock:
+                        for channel_id in worker_progress - set(channels):
+                            channel_progress.pop(channel_id, None)
+                        channel_progress.update(channels)
+                    worker_progress = set(channels)
+            await process.wait()
+        finally:
+            stop_task.cancel()
+            await asyncio.gather(stop_task, return_exceptions=True)
+            await drain_task(stderr_task)
+            async with channel_progress_lock:
+                for channel_id in worker_progress:
+                    channel_progress.pop(channel_id, None)
+            worker_progress = set()
+
+        if not shutdown_event.is_set():
+            logger.warning(
+                f"Recording worker {index} exited with return code {process.returncode}. "
+                f"Restarting in {WORKER_RESTART_DELAY_SECONDS} seconds."
+            )
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    shutdown_event.wait(), timeout=WORKER_RESTART_DELAY_SECONDS
+                )
+
+
+async def supervise_workers(count: int) -> None:
+    logger.info(f"Sharding channels across {count} recording worker processes.")
+    await asyncio.gather(*(run_worker(index, count) for index in range(count)))
+
+
 async def main() -> None:
     # Register signal handlers for graceful shutdown
     loop = asyncio.get_running_loop()
@@ -2104,10 +6976,29 @@ async def main() -> None:
         # We'll handle KeyboardInterrupt exception instead.
         pass
 
+    shard = worker_shard_from_env()
+    if shard is not None:
+        publish_task = asyncio.create_task(publish_worker_events())
+        try:
+            await manage_recording_tasks(shard)
+        except Exception as e:
+            logger.exception(f"Recording worker {shard[0]} failed: {e}")
+        finally:
+            publish_task.cancel()
+            await asyncio.gather(publish_task, return_exceptions=True)
+            with contextlib.suppress(BrokenPipeError, ValueError):
+                flush_worker_events()
+        return
+
+    await config_service.reload(force=True)
+    workers = config_service.snapshot.workers
     display_task = asyncio.create_task(display_progress())
 
     try:
-        await manage_recording_tasks()
+        if workers > 1:
+            await supervise_workers(workers)
+        else:
+            await manage_recording_tasks()
     except KeyboardInterrupt:
         logger.info("Received KeyboardInterrupt. Shutting down...")
         handle_shutdown()
@@ -1,3 +1,4 @@
+import json
 import logging
 import re
 import time
@@ -6,7 +7,7 @@ from dataclasses import dataclass
 from urllib.parse import urlparse, parse_qs, urlunparse
 
 from streamlink.exceptions import StreamError
-from streamlink.plugin import Plugin, pluginmatcher
+from streamlink.plugin import Plugin, pluginargument, pluginmatcher
 from streamlink.plugin.api import validate
 from streamlink.stream.hls import (
     HLSStream,
@@ -17,6 +18,8 @@ from streamlink.stream.hls import (
 
 log = logging.getLogger(__name__)
 
+LIVE_DETAIL_HANDOFF_MAX_AGE = 30  # seconds
+
 
 def stream_error_status_code(err: StreamError) -> Optional[int]:
     response = getattr(err, "response", None)
@@ -185,6 +188,36 @@ class ChzzkAPI:
         "https://api.chzzk.naver.com/service/v3/channels/{channel_id}/live-detail"
     )
 
+    def _response_schema(self, *schemas: validate.Schema) -> validate.Schema:
+        return validate.Schema(
+            validate.parse_json(),
+            validate.any(
+                validate.all(
+                    {
+                        "code": int,
+                        "message": str,
+                    },
+                    validate.transform(lambda data: ("error", data["message"])),
+                ),
+                validate.all(
+                    {
+                        "code": 200,
+                        "content": None,
+                    },
+                    validate.transform(lambda _: ("success", None)),
+                ),
+                validate.all(
+                    {
+                        "code": 200,
+                        "content": dict,
+                    },
+                    validate.get("content"),
+                    *schemas,
+                    validate.transform(lambda data: ("success", data)),
+                ),
+            ),
+        )
+
     def _query_api(
         self, url: str, *schemas: validate.Schema
     ) -> Tuple[str, Union[Dict[str, Any], str]]:
@@ -192,43 +225,12 @@ class ChzzkAPI:
             url,
             acceptable_status=(200, 404),
             headers={"Referer": "https://chzzk.naver.com/"},
-            schema=validate.Schema(
-                validate.parse_json(),
-                validate.any(
-                    validate.all(
-                        {
-                            "code": int,
-                            "message": str,
-                        },
-                        validate.transform(lambda data: ("error", data["message"])),
-                    ),
-                    validate.all(
-                        {
-                            "code": 200,
-                            "content": None,
-                        },
-                        validate.transform(lambda _: ("success", None)),
-                    ),
-                    validate.all(
-                        {
-                            "code": 200,
-                            "content": dict,
-                        },
-                        validate.get("content"),
-                        *schemas,
-                        validate.transform(lambda data: ("success", data)),
-                    ),
-                ),
-            ),
+            schema=self._response_schema(*schemas),
         )
         return response
 
-    def get_live_detail(self, channel_id: str) -> Tuple[str, Union[LiveDetail, str]]:
-        """
-        Get live stream details for a given channel.
-        """
-        return self._query_api(
-            self._CHANNELS_LIVE_DETAIL_URL.format(channel_id=channel_id),
+    def _live_detail_schemas(self) -> Tuple[validate.Schema, ...]:
+        return (
             {
                 "status": str,
                 "liveId": int,
@@ -272,6 +274,47 @@ class ChzzkAPI:
             ),
         )
 
+    def get_live_detail(self, channel_id: str) -> Tuple[str, Union[LiveDetail, str]]:
+        """
+        Get live stream details for a given channel.
+        """
+        return self._query_api(
+            self._CHANNELS_LIVE_DETAIL_URL.format(channel_id=channel_id),
+            *self._live_detail_schemas(),
+        )
+
+    def load_live_detail_handoff(
+        self, path: str, channel_id: str
+    ) -> Optional[Tuple[str, Union[LiveDetail, str]]]:
+        """
+        Load live stream details that the recorder already fetched for this channel.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                handoff = json.load(f)
+        except (OSError, ValueError) as err:
+            log.debug(f"Ignoring unreadable live detail handoff: {err}")
+            return None
+
+        if not isinstance(handoff, dict) or handoff.get("channel_id") != channel_id:
+            log.debug("Ignoring live detail handoff for another channel.")
+            return None
+        fetched_at = handoff.get("fetched_at")
+        if (
+            not isinstance(fetched_at, (int, float))
+            or time.time() - fetched_at > LIVE_DETAIL_HANDOFF_MAX_AGE
+        ):
+            log.debug("Ignoring stale live detail handoff.")
+            return None
+
+        try:
+            return self._response_schema(*self._live_detail_schemas()).validate(
+                handoff.get("response")
+            )
+        except validate.ValidationError as err:
+            log.debug(f"Ignoring invalid live detail handoff: {err}")
+            return None
+
 
 @pluginmatcher(
     name="live",
@@ -279,6 +322,11 @@ class ChzzkAPI:
         r"https?://chzzk\.naver\.com/live/(?P<channel_id>[A-Za-z0-9_-]{1,128})",
     ),
 )
+@pluginargument(
+    "live-detail-file",
+    metavar="PATH",
+    help="Live detail response already fetched by the recorder, used instead of a new API request.",
+)
 class Chzzk(Plugin):
     """
     Plugin for Chzzk live streams.
@@ -294,7 +342,13 @@ class Chzzk(Plugin):
         self.title: Optional[str] = None
 
     def _get_live(self, channel_id: str) -> Optional[Dict[str, HLSStream]]:
-        datatype, data = self._api.get_live_detail(channel_id)
+        live_detail = None
+        handoff_path = self.options.get("live-detail-file")
+        if handoff_path:
+            live_detail = self._api.load_live_detail_handoff(handoff_path, channel_id)
+        if live_detail is None:
+            live_detail = self._api.get_live_detail(channel_id)
+        datatype, data = live_detail
         if datatype == "error":
             log.error(data)
             return None
@@ -14,6 +14,10 @@ MIN_RESCAN_INTERVAL_SECONDS = 1
 MAX_RESCAN_INTERVAL_SECONDS = 3600
 DEFAULT_OUTPUT_FORMAT = "ts"
 ALLOWED_OUTPUT_FORMATS = {"ts", "mkv", "webm"}
+DEFAULT_PIPE_MODE = "relay"
+ALLOWED_PIPE_MODES = {"relay", "direct"}
+DEFAULT_RECORDING_BACKEND = "subprocess"
+ALLOWED_RECORDING_BACKENDS = {"subprocess", "library", "native"}
 
 default_config = {
     "channels": [],
@@ -21,6 +25,8 @@ default_config = {
     "timeout": DEFAULT_RESCAN_INTERVAL_SECONDS,
     "stream_segment_threads": 2,
     "output_format": DEFAULT_OUTPUT_FORMAT,
+    "pipe_mode": DEFAULT_PIPE_MODE,
+    "recording_backend": DEFAULT_RECORDING_BACKEND,
     "hevc_settings": {
         "enable": False,
         "encoder": "libx265",
@@ -35,6 +41,98 @@ default_config = {
         "max_bitrate": "10000k",
         "preset": "8",
     },
+    "ts_passthrough": {
+        "enable": False,
+        "resend_tables": True,
+        "fix_continuity": True,
+    },
+    "spool": {
+        "enable": False,
+        "memory_mb": 64,
+        "disk_mb": 1024,
+        "directory": "",
+    },
+    "warm_pool": {
+        "enable": False,
+        "max_ffmpeg": 4,
+        "streamlink_spares": 1,
+    },
+    "reconnect": {
+        "enable": False,
+        "window_seconds": 60,
+    },
+    "segment_thread_tuning": {
+        "enable": False,
+        "min_threads": 1,
+        "max_threads": 8,
+    },
+    "hardware_sessions": {
+        "enable": False,
+        "fallback": "software",
+        "max_sessions": {
+            "nvenc": 8,
+            "qsv": 8,
+            "amf": 4,
+            "vaapi": 8,
+            "videotoolbox": 4,
+        },
+    },
+    "deferred_transcode": {
+        "enable": False,
+        "concurrency": 1,
+        "niceness": 10,
+        "start_time": "",
+        "end_time": "",
+        "keep_source": False,
+        "database": "",
+    },
+    "preset_governor": {
+        "enable": False,
+        "min_speed": 0.95,
+        "window_seconds": 60,
+        "allow_copy": True,
+    },
+    "remux": {
+        "enable": False,
+        "format": "mp4",
+        "workers": 1,
+        "niceness": 10,
+        "delete_source": False,
+        "duration_tolerance_seconds": 2,
+    },
+    "segmentation": {
+        "enable": False,
+        "segment_seconds": 3600,
+        "max_size_mb": 0,
+    },
+    "multi_output": {
+        "enable": False,
+        "renditions": [
+            {
+                "name": "proxy",
+                "codec": "hevc",
+                "format": "mkv",
+                "height": 480,
+                "encoder": "libx265",
+                "bitrate": "800k",
+                "max_bitrate": "1200k",
+                "preset": "ultrafast",
+            }
+        ],
+    },
+    "adaptive_polling": {
+        "enable": False,
+        "fast_interval": 5,
+        "max_interval": 600,
+        "window_minutes": 30,
+    },
+    "workers": 1,
+    "coordination": {
+        "enable": False,
+        "database": "",
+        "node_id": "",
+        "lease_seconds": 30,
+    },
     "log_enabled": True,
     "cookies": {"NID_SES": "", "NID_AUT": ""},
 }
@@ -74,6 +172,15 @@ def deep_merge_defaults(config, defaults):
     return merged
 
 
+def normalize_clock_time(value):
+    hours, _, minutes = str(value or "").strip().partition(":")
+    if not hours.isdigit() or not minutes.isdigit():
+        return ""
+    if int(hours) > 23 or int(minutes) > 59:
+        return ""
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
 def clamp_int(value, default, min_value, max_value):
     try:
         parsed = int(value)
@@ -100,6 +207,37 @@ def normalize_output_format(value):
     return text if text in ALLOWED_OUTPUT_FORMATS else DEFAULT_OUTPUT_FORMAT
 
 
+def normalize_rendition(rendition):
+    defaults = default_config["multi_output"]["renditions"][0]
+    rendition = deep_merge_defaults(
+        rendition if isinstance(rendition, dict) else {}, defaults
+    )
+    name = str(rendition.get("name") or "").strip()
+    rendition["name"] = name if SAFE_FFMPEG_VALUE.fullmatch(name) else "proxy"
+    if rendition.get("codec") not in ("hevc", "av1"):
+        rendition["codec"] = "hevc"
+    output_format = normalize_output_format(rendition.get("format"))
+    if rendition["codec"] == "hevc":
+        if rendition.get("encoder") not in ALLOWED_ENCODERS:
+            rendition["encoder"] = "libx265"
+        if output_format == "webm":
+            output_format = "mkv"
+        default_preset = "ultrafast"
+    else:
+        if rendition.get("encoder") not in ALLOWED_AV1_ENCODERS:
+            rendition["encoder"] = "libsvtav1"
+        if output_format == "ts":
+            output_format = "mkv"
+        default_preset = "8"
+    rendition["format"] = output_format
+    rendition["height"] = clamp_int(rendition.get("height"), 480, 0, 4320)
+    rendition["bitrate"] = normalize_bitrate(rendition.get("bitrate"), "800k")
+    rendition["max_bitrate"] = normalize_bitrate(rendition.get("max_bitrate"), "1200k")
+    preset = str(rendition.get("preset") or default_preset).strip()
+    rendition["preset"] = preset if SAFE_FFMPEG_VALUE.fullmatch(preset) else default_preset
+    return rendition
+
+
 def normalize_config(config):
     config = deep_merge_defaults(config, default_config)
     config["timeout"] = clamp_int(
@@ -111,7 +249,14 @@ def normalize_config(config):
     config["stream_segment_threads"] = clamp_int(
         config.get("stream_segment_threads"), 2, 1, 16
     )
+    config["workers"] = clamp_int(config.get("workers"), 1, 1, 64)
     config["output_format"] = normalize_output_format(config.get("output_format"))
+    pipe_mode = str(config.get("pipe_mode") or DEFAULT_PIPE_MODE).strip().lower()
+    config["pipe_mode"] = pipe_mode if pipe_mode in ALLOWED_PIPE_MODES else DEFAULT_PIPE_MODE
+    backend = str(config.get("recording_backend") or DEFAULT_RECORDING_BACKEND).strip().lower()
+    config["recording_backend"] = (
+        backend if backend in ALLOWED_RECORDING_BACKENDS else DEFAULT_RECORDING_BACKEND
+    )
 
     channels = []
     for index, channel in enumerate(config.get("channels", []), start=1):
@@ -157,6 +302,143 @@ def normalize_config(config):
         hevc["enable"] = False
     config["av1_settings"] = av1
 
+    passthrough = deep_merge_defaults(
+        config.get("ts_passthrough", {}), default_config["ts_passthrough"]
+    )
+    config["ts_passthrough"] = {
+        key: bool(passthrough.get(key)) for key in default_config["ts_passthrough"]
+    }
+
+    spool = deep_merge_defaults(config.get("spool", {}), default_config["spool"])
+    spool["enable"] = bool(spool.get("enable"))
+    spool["memory_mb"] = clamp_int(spool.get("memory_mb"), 64, 1, 4096)
+    spool["disk_mb"] = clamp_int(spool.get("disk_mb"), 1024, 0, 1024 * 1024)
+    spool["directory"] = CONTROL_CHARS.sub("", str(spool.get("directory") or "")).strip()
+    config["spool"] = spool
+
+    warm_pool = deep_merge_defaults(config.get("warm_pool", {}), default_config["warm_pool"])
+    warm_pool["enable"] = bool(warm_pool.get("enable"))
+    warm_pool["max_ffmpeg"] = clamp_int(warm_pool.get("max_ffmpeg"), 4, 0, 64)
+    warm_pool["streamlink_spares"] = clamp_int(warm_pool.get("streamlink_spares"), 1, 0, 16)
+    config["warm_pool"] = warm_pool
+
+    reconnect = deep_merge_defaults(config.get("reconnect", {}), default_config["reconnect"])
+    reconnect["enable"] = bool(reconnect.get("enable"))
+    reconnect["window_seconds"] = clamp_int(reconnect.get("window_seconds"), 60, 1, 3600)
+    config["reconnect"] = reconnect
+
+    tuning = deep_merge_defaults(
+        config.get("segment_thread_tuning", {}), default_config["segment_thread_tuning"]
+    )
+    tuning["enable"] = bool(tuning.get("enable"))
+    tuning["min_threads"] = clamp_int(tuning.get("min_threads"), 1, 1, 16)
+    tuning["max_threads"] = clamp_int(
+        tuning.get("max_threads"), 8, tuning["min_threads"], 16
+    )
+    config["segment_thread_tuning"] = tuning
+
+    sessions = deep_merge_defaults(
+        config.get("hardware_sessions", {}), default_config["hardware_sessions"]
+    )
+    sessions["enable"] = bool(sessions.get("enable"))
+    if sessions.get("fallback") not in ("software", "copy"):
+        sessions["fallback"] = "software"
+    limits = sessions.get("max_sessions")
+    limits = limits if isinstance(limits, dict) else {}
+    sessions["max_sessions"] = {
+        family: clamp_int(limits.get(family), default, 1, 64)
+        for family, default in default_config["hardware_sessions"]["max_sessions"].items()
+    }
+    config["hardware_sessions"] = sessions
+
+    transcode = deep_merge_defaults(
+        config.get("deferred_transcode", {}), default_config["deferred_transcode"]
+    )
+    transcode["enable"] = bool(transcode.get("enable"))
+    transcode["concurrency"] = clamp_int(transcode.get("concurrency"), 1, 1, 16)
+    transcode["niceness"] = clamp_int(transcode.get("niceness"), 10, 0, 19)
+    for key in ("start_time", "end_time"):
+        transcode[key] = normalize_clock_time(transcode.get(key))
+    transcode["keep_source"] = bool(transcode.get("keep_source"))
+    transcode["database"] = CONTROL_CHARS.sub("", str(transcode.get("database") or "")).strip()
+    config["deferred_transcode"] = transcode
+
+    governor = deep_merge_defaults(
+        config.get("preset_governor", {}), default_config["preset_governor"]
+    )
+    governor["enable"] = bool(governor.get("enable"))
+    try:
+        min_speed = float(governor.get("min_speed"))
+    except (TypeError, ValueError):
+        min_speed = 0.95
+    governor["min_speed"] = min(max(min_speed, 0.5), 1.0)
+    governor["window_seconds"] = clamp_int(governor.get("window_seconds"), 60, 10, 3600)
+    governor["allow_copy"] = bool(governor.get("allow_copy"))
+    config["preset_governor"] = governor
+
+    remux = deep_merge_defaults(config.get("remux", {}), default_config["remux"])
+    remux["enable"] = bool(remux.get("enable"))
+    remux_format = str(remux.get("format") or "").strip().lower().lstrip(".")
+    remux["format"] = remux_format if remux_format in ("mp4", "mkv") else "mp4"
+    remux["workers"] = clamp_int(remux.get("workers"), 1, 1, 16)
+    remux["niceness"] = clamp_int(remux.get("niceness"), 10, 0, 19)
+    remux["delete_source"] = bool(remux.get("delete_source"))
+    remux["duration_tolerance_seconds"] = clamp_int(
+        remux.get("duration_tolerance_seconds"), 2, 0, 600
+    )
+    config["remux"] = remux
+
+    segmentation = deep_merge_defaults(
+        config.get("segmentation", {}), default_config["segmentation"]
+    )
+    segmentation["enable"] = bool(segmentation.get("enable"))
+    segmentation["segment_seconds"] = clamp_int(
+        segmentation.get("segment_seconds"), 3600, 60, 24 * 3600
+    )
+    segmentation["max_size_mb"] = clamp_int(
+        segmentation.get("max_size_mb"), 0, 0, 1024 * 1024
+    )
+    config["segmentation"] = segmentation
+
+    multi_output = config.get("multi_output")
+    multi_output = multi_output if isinstance(multi_output, dict) else {}
+    renditions = multi_output.get("renditions")
+    if not isinstance(renditions, list):
+        renditions = default_config["multi_output"]["renditions"]
+    config["multi_output"] = {
+        "enable": bool(multi_output.get("enable")),
+        "renditions": [normalize_rendition(rendition) for rendition in renditions],
+    }
+
+    coordination = deep_merge_defaults(
+        config.get("coordination", {}), default_config["coordination"]
+    )
+    coordination["enable"] = bool(coordination.get("enable"))
+    coordination["database"] = CONTROL_CHARS.sub(
+        "", str(coordination.get("database") or "")
+    ).strip()
+    coordination["node_id"] = CONTROL_CHARS.sub(
+        "", str(coordination.get("node_id") or "")
+    ).strip()
+    coordination["lease_seconds"] = clamp_int(coordination.get("lease_seconds"), 30, 5, 600)
+    config["coordination"] = coordination
+
+    adaptive = deep_merge_defaults(
+        config.get("adaptive_polling", {}), default_config["adaptive_polling"]
+    )
+    adaptive["enable"] = bool(adaptive.get("enable"))
+    adaptive["fast_interval"] = clamp_int(
+        adaptive.get("fast_interval"),
+        5,
+        MIN_RESCAN_INTERVAL_SECONDS,
+        MAX_RESCAN_INTERVAL_SECONDS,
+    )
+    adaptive["max_interval"] = clamp_int(
+        adaptive.get("max_interval"), 600, MIN_RESCAN_INTERVAL_SECONDS, 24 * 3600
+    )
+    adaptive["window_minutes"] = clamp_int(adaptive.get("window_minutes"), 30, 1, 720)
+    config["adaptive_polling"] = adaptive
+
     cookies = config.get("cookies", {})
     if not isinstance(cookies, dict):
         cookies = {}
@@ -0,0 +1,120 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+
+def channel_config(**settings) -> chzzk_record.ChannelRecordingConfig:
+    return chzzk_record.ChannelRecordingConfig.from_settings(
+        {"id": "sessiontest", "name": "sessions"},
+        chzzk_record.parse_settings(settings),
+    )
+
+
+class RenditionSessionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.sessions = chzzk_record.HardwareSessionScheduler()
+        patcher = mock.patch.object(chzzk_record, "hardware_sessions", self.sessions)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_sessions_claimed_before_a_failure_reach_the_caller(self) -> None:
+        config = channel_config(
+            hardware_sessions={"enable": True, "max_sessions": {"nvenc": 2}},
+            multi_output={
+                "enable": True,
+                "renditions": [
+                    {"name": "first", "encoder": "hevc_nvenc"},
+                    {"name": "second", "encoder": "hevc_nvenc"},
+                ],
+            },
+        )
+        first = config.multi_output["renditions"][0]
+        resolve = mock.AsyncMock(
+            side_effect=[(first, {"enable": False}), RuntimeError("probe failed")]
+        )
+        families = []
+        with mock.patch.object(chzzk_record, "resolve_encoder_settings", resolve):
+            with self.assertRaises(RuntimeError):
+                await chzzk_record.prepare_renditions(
+                    config, Path("/tmp/rec.ts.part"), None, Path("ffmpeg"), families
+                )
+        self.assertEqual(families, ["nvenc"])
+        self.assertFalse(self.sessions.available("nvenc", 1))
+        for family in families:
+            self.sessions.release(family)
+        self.assertTrue(self.sessions.available("nvenc", 1))
+
+
+class ClaimSessionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.sessions = chzzk_record.HardwareSessionScheduler()
+        patcher = mock.patch.object(chzzk_record, "hardware_sessions", self.sessions)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.probe = mock.AsyncMock(return_value=(True, None))
+        patcher = mock.patch.object(chzzk_record, "probe_hevc_encoder", self.probe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config = channel_config(
+            hardware_sessions={
+                "enable": True,
+                "fallback": "software",
+                "max_sessions": {"nvenc": 1},
+            }
+        )
+        self.hevc = {"enable": True, "encoder": "hevc_nvenc"}
+
+    async def claim(self):
+        return await chzzk_record.claim_encoder_session(
+            self.config, "mkv", self.hevc, {"enable": False}, Path("ffmpeg")
+        )
+
+    async def test_full_family_falls_back_to_software_until_released(self) -> None:
+        family, full, hevc, _ = await self.claim()
+        self.assertEqual((family, full), ("nvenc", None))
+        self.assertEqual(hevc["encoder"], "hevc_nvenc")
+
+        family, full, hevc, _ = await self.claim()
+        self.assertEqual((family, full), (None, "nvenc"))
+        self.assertTrue(hevc["enable"])
+        self.assertEqual(hevc["encoder"], "libx265")
+        self.probe.assert_awaited_once()
+
+        self.sessions.release("nvenc")
+        family, full, hevc, _ = await self.claim()
+        self.assertEqual((family, full), ("nvenc", None))
+        self.assertEqual(hevc["encoder"], "hevc_nvenc")
+
+    async def test_stream_copy_when_no_software_encoder_works(self) -> None:
+        self.probe.return_value = (False, "missing")
+        await self.claim()
+        family, full, hevc, _ = await self.claim()
+        self.assertEqual((family, full), (None, "nvenc"))
+        self.assertFalse(hevc["enable"])
+
+
+class WorkerShareTest(unittest.TestCase):
+    def shares(self, limit: int, count: int) -> list:
+        shares = []
+        for index in range(count):
+            env = {chzzk_record.WORKER_ENV_VAR: f"{index}/{count}"}
+            with mock.patch.dict(chzzk_record.os.environ, env):
+                shares.append(chzzk_record.HardwareSessionScheduler.worker_limit(limit))
+        return shares
+
+    def test_workers_split_the_limit(self) -> None:
+        self.assertEqual(self.shares(5, 2), [3, 2])
+        self.assertEqual(self.shares(2, 3), [1, 1, 0])
+
+    def test_worker_with_no_share_cannot_acquire(self) -> None:
+        sessions = chzzk_record.HardwareSessionScheduler()
+        env = {chzzk_record.WORKER_ENV_VAR: "2/3"}
+        with mock.patch.dict(chzzk_record.os.environ, env):
+            self.assertFalse(sessions.try_acquire("nvenc", 2))
+        self.assertTrue(sessions.try_acquire("nvenc", 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import aiohttp
+
+import chzzk_record
+
+OLD_PLAYLIST = "https://cdn.example/live/playlist.m3u8?token=old"
+NEW_PLAYLIST = "https://cdn.example/live/playlist.m3u8?token=new"
+
+
+def segment(sequence: int, token: str) -> chzzk_record.HLSSegment:
+    uri = f"https://cdn.example/live/seg{sequence}.ts?token={token}"
+    return chzzk_record.HLSSegment(sequence, uri, 2.0, None, False)
+
+
+def expired() -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(mock.Mock(), (), status=403)
+
+
+class SegmentTokenRefreshTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.stream = chzzk_record.NativeHLSStream(
+            mock.Mock(), {"id": "hlstest", "name": "hls"}, {}, parallelism=4
+        )
+        self.stream._playlist_url = OLD_PLAYLIST
+        self.fetched = []
+        self.stream._fetch = self.fetch
+        self.refresh = mock.AsyncMock(side_effect=self.refreshed)
+        self.stream._refresh_playlist_url = self.refresh
+
+    async def refreshed(self) -> bool:
+        await asyncio.sleep(0.01)
+        self.stream._playlist_url = NEW_PLAYLIST
+        return True
+
+    async def fetch(self, url: str) -> bytes:
+        self.fetched.append(url)
+        if url == NEW_PLAYLIST:
+            return (
+                b"#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:10\n"
+                b"#EXTINF:2,\nseg10.ts?token=new\n#EXTINF:2,\nseg11.ts?token=new\n"
+            )
+        if "token=old" in url:
+            raise expired()
+        return url.encode()
+
+    async def test_expired_segments_are_downloaded_with_a_new_token(self) -> None:
+        results = await asyncio.gather(
+            self.stream._download_segment(segment(10, "old"), OLD_PLAYLIST),
+            self.stream._download_segment(segment(11, "old"), OLD_PLAYLIST),
+        )
+        self.assertEqual(
+            results,
+            [
+                b"https://cdn.example/live/seg10.ts?token=new",
+                b"https://cdn.example/live/seg11.ts?token=new",
+            ],
+        )
+        self.refresh.assert_awaited_once()
+        self.assertEqual(self.fetched.count(NEW_PLAYLIST), 1)
+
+    async def test_segment_missing_from_the_new_playlist_is_dropped(self) -> None:
+        with mock.patch.object(chzzk_record.asyncio, "sleep", mock.AsyncMock()):
+            result = await self.stream._download_segment(segment(3, "old"), OLD_PLAYLIST)
+        self.assertIsNone(result)
+        self.refresh.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
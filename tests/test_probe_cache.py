@@ -0,0 +1,45 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+
+class EncoderProbeCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.file_path = self.output_dir / "probe_cache.json"
+        # Any existing file works as the binary the results are keyed on.
+        self.working = [sys.executable, "-c:v", "libx265"]
+        self.failing = [sys.executable, "-c:v", "hevc_nvenc"]
+        cache = chzzk_record.EncoderProbeCache(self.file_path)
+        await cache.put(self.working, (True, ""))
+        await cache.put(self.failing, (False, "OpenEncodeSessionEx failed"))
+
+    async def cached_after(self, seconds: float, probe_cmd: list):
+        cache = chzzk_record.EncoderProbeCache(self.file_path)
+        now = time.time() + seconds
+        with mock.patch.object(chzzk_record.time, "time", return_value=now):
+            return await cache.get(probe_cmd)
+
+    async def test_failures_expire_after_minutes(self) -> None:
+        self.assertEqual(
+            await self.cached_after(60, self.failing), (False, "OpenEncodeSessionEx failed")
+        )
+        expiry = chzzk_record.ENCODER_PROBE_FAILURE_TTL_SECONDS + 1
+        self.assertIsNone(await self.cached_after(expiry, self.failing))
+
+    async def test_successes_are_kept_for_days(self) -> None:
+        expiry = chzzk_record.ENCODER_PROBE_FAILURE_TTL_SECONDS + 1
+        self.assertEqual(await self.cached_after(expiry, self.working), (True, ""))
+        expiry = chzzk_record.ENCODER_PROBE_CACHE_TTL_SECONDS + 1
+        self.assertIsNone(await self.cached_after(expiry, self.working))
+
+
+if __name__ == "__main__":
+    unittest.main()
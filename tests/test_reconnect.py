@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+
+class FakeSandbox:
+    async def stop_stream(self) -> None:
+        pass
+
+
+def channel_config(**settings) -> chzzk_record.ChannelRecordingConfig:
+    return chzzk_record.ChannelRecordingConfig.from_settings(
+        {"id": "reconnecttest", "name": "reconnect"},
+        chzzk_record.parse_settings({"reconnect": {"enable": True}, **settings}),
+    )
+
+
+class ReconnectRestartTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        patcher = mock.patch.object(chzzk_record, "RECONNECT_BASE_DELAY_SECONDS", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ffmpeg_wait = asyncio.get_running_loop().create_future()
+        self.addCleanup(self.ffmpeg_wait.cancel)
+
+    async def reconnect(
+        self, recording: chzzk_record.ActiveRecording, api_client=None, **kwargs
+    ):
+        return await chzzk_record.reconnect_stream_source(
+            recording,
+            FakeSandbox(),
+            {"liveId": 1},
+            Path("ffmpeg"),
+            api_client,
+            self.ffmpeg_wait,
+            **kwargs,
+        )
+
+    async def test_settings_change_restarts_immediately(self) -> None:
+        recording = chzzk_record.ActiveRecording(channel_config())
+        recording.stage(channel_config(output_format="mkv"))
+        self.assertIsNone(await self.reconnect(recording))
+        self.assertTrue(recording.restart_now)
+
+    async def test_new_broadcast_restarts_immediately(self) -> None:
+        recording = chzzk_record.ActiveRecording(channel_config())
+        with mock.patch.object(
+            chzzk_record,
+            "get_live_info",
+            mock.AsyncMock(return_value=("OPEN", {"liveId": 2})),
+        ):
+            self.assertIsNone(await self.reconnect(recording, mock.Mock()))
+        self.assertTrue(recording.restart_now)
+
+    async def test_preset_step_restarts_immediately(self) -> None:
+        recording = chzzk_record.ActiveRecording(channel_config())
+        governor = chzzk_record.PresetGovernor("reconnect")
+        governor.pending = True
+        self.assertIsNone(await self.reconnect(recording, governor=governor))
+        self.assertTrue(recording.restart_now)
+
+    async def test_free_hardware_slot_restarts_immediately(self) -> None:
+        recording = chzzk_record.ActiveRecording(
+            channel_config(hardware_sessions={"enable": True})
+        )
+        with mock.patch.object(
+            chzzk_record, "hardware_sessions", chzzk_record.HardwareSessionScheduler()
+        ):
+            self.assertIsNone(await self.reconnect(recording, downgraded_family="nvenc"))
+        self.assertTrue(recording.restart_now)
+
+    async def test_ended_broadcast_waits_for_the_next_scan(self) -> None:
+        recording = chzzk_record.ActiveRecording(channel_config())
+        with mock.patch.object(
+            chzzk_record,
+            "get_live_info",
+            mock.AsyncMock(return_value=("CLOSE", {})),
+        ):
+            self.assertIsNone(await self.reconnect(recording, mock.Mock()))
+        self.assertFalse(recording.restart_now)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+from tests.test_warm_pool import FFMPEG, sample_stream
+
+
+@unittest.skipUnless(FFMPEG, "ffmpeg is not installed")
+class RemuxDurationCheckTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.source_path = self.output_dir / "recording.mkv"
+        # Written to a file rather than a pipe so the header carries a duration.
+        subprocess.run(
+            [FFMPEG, "-loglevel", "error", "-i", "pipe:0", "-c", "copy", str(self.source_path)],
+            input=sample_stream(FFMPEG, seconds=6),
+            check=True,
+        )
+        self.settings = chzzk_record.normalize_remux_settings(
+            {"enable": True, "format": "mp4", "delete_source": True}
+        )
+
+    async def test_complete_remux_replaces_the_source(self) -> None:
+        await chzzk_record.remux_recording(self.source_path, Path(FFMPEG), self.settings)
+        self.assertTrue((self.output_dir / "recording.mp4").exists())
+        self.assertFalse(self.source_path.exists())
+
+    async def test_truncated_remux_keeps_the_source(self) -> None:
+        build = chzzk_record.build_remux_command
+
+        def truncated(*args):
+            command = build(*args)
+            return [*command[:-1], "-t", "1", command[-1]]
+
+        with mock.patch.object(chzzk_record, "build_remux_command", truncated):
+            await chzzk_record.remux_recording(
+                self.source_path, Path(FFMPEG), self.settings
+            )
+        self.assertTrue(self.source_path.exists())
+        self.assertEqual(sorted(p.name for p in self.output_dir.iterdir()), ["recording.mkv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
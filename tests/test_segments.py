@@ -0,0 +1,48 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+
+class SegmentedOutputTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.on_segment = mock.AsyncMock()
+        self.segments = chzzk_record.SegmentedOutput(
+            self.output_dir / "rec.ts.part", 10, self.on_segment
+        )
+
+    def closed(self, name: str, data: bytes) -> None:
+        (self.output_dir / name).write_bytes(data)
+        with self.segments.list_path.open("a", encoding="utf-8") as file:
+            file.write(f"{name},0.0,10.0\n")
+
+    async def test_closed_segments_are_renamed_and_handed_on(self) -> None:
+        self.closed("rec.000.ts.part", b"\x47" * 188)
+        self.closed("rec.001.ts.part", b"")
+        await self.segments.collect()
+
+        saved = self.output_dir / "rec.000.ts"
+        self.assertEqual(self.segments.segments, [saved])
+        self.assertTrue(saved.exists())
+        self.assertFalse((self.output_dir / "rec.001.ts.part").exists())
+        self.on_segment.assert_awaited_once_with(saved)
+
+    async def test_finish_keeps_unfinished_segments_with_data(self) -> None:
+        self.closed("rec.000.ts.part", b"\x47" * 188)
+        (self.output_dir / "rec.001.ts.part").write_bytes(b"\x47" * 188)
+        (self.output_dir / "rec.002.ts.part").write_bytes(b"")
+        await self.segments.finish(1, "ffmpeg")
+
+        self.assertEqual(
+            sorted(path.name for path in self.output_dir.iterdir()),
+            ["rec.000.ts", "rec.001.ts.part", "rec.index.csv"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+
+def fake_transcode(script: str):
+    """Stand in for ffmpeg with a shell script that gets the output path as $0."""
+
+    def build(ffmpeg_path, source_path, output_path, *args):
+        return ["sh", "-c", script, str(output_path)]
+
+    return build
+
+
+class TranscodeJobTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.source_path = self.output_dir / "recording.ts"
+        self.source_path.write_bytes(b"copy")
+        self.queue = mock.AsyncMock()
+        self.job = chzzk_record.TranscodeJob(
+            1, self.source_path, "mkv", {"enable": True, "encoder": "libx265"}, {}
+        )
+        self.settings = chzzk_record.normalize_deferred_transcode_settings({"enable": True})
+        resolve = mock.AsyncMock(return_value=(self.job.hevc_settings, {}))
+        patcher = mock.patch.object(chzzk_record, "resolve_encoder_settings", resolve)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def run_job(self, script: str) -> None:
+        with mock.patch.object(
+            chzzk_record, "build_transcode_command", fake_transcode(script)
+        ):
+            await chzzk_record.run_transcode_job(
+                self.queue, self.job, Path("ffmpeg"), self.settings
+            )
+
+    async def test_source_is_kept_when_the_output_cannot_be_saved(self) -> None:
+        # Exits cleanly without writing anything, so the rename fails.
+        await self.run_job("exit 0")
+        self.assertEqual(self.source_path.read_bytes(), b"copy")
+        self.queue.fail.assert_awaited_once_with(1)
+        self.queue.complete.assert_not_awaited()
+
+    async def test_source_is_deleted_after_the_output_is_saved(self) -> None:
+        await self.run_job('printf hevc > "$0"')
+        self.assertFalse(self.source_path.exists())
+        self.assertEqual((self.output_dir / "recording.mkv").read_bytes(), b"hevc")
+        self.queue.complete.assert_awaited_once_with(1)
+
+    async def test_locked_database_does_not_abandon_ffmpeg(self) -> None:
+        self.queue.heartbeat.side_effect = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(chzzk_record, "TRANSCODE_HEARTBEAT_SECONDS", 0.05):
+            await self.run_job('sleep 0.3 && printf hevc > "$0"')
+        self.assertTrue(self.queue.heartbeat.await_count > 1)
+        self.assertEqual((self.output_dir / "recording.mkv").read_bytes(), b"hevc")
+        self.queue.complete.assert_awaited_once_with(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import chzzk_record
+
+VIDEO_PID = 0x100
+
+
+def ts_packet(pid: int, counter: int, adaptation: bytes = b"") -> bytes:
+    control = 0x30 if adaptation else 0x10
+    header = bytes([chzzk_record.TS_SYNC_BYTE, pid >> 8, pid & 0xFF, control | counter])
+    body = bytes([len(adaptation)]) + adaptation if adaptation else b""
+    return header + body + b"\xaa" * (chzzk_record.TS_PACKET_SIZE - 4 - len(body))
+
+
+def split_packets(data: bytes) -> list:
+    size = chzzk_record.TS_PACKET_SIZE
+    return [data[offset : offset + size] for offset in range(0, len(data), size)]
+
+
+class DiscontinuityMarkingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+
+    async def written(self, packets: list, fix_continuity: bool = True) -> list:
+        writer = chzzk_record.TSPassthroughWriter(
+            self.output_dir / "out.ts",
+            "tstest",
+            resend_tables=False,
+            fix_continuity=fix_continuity,
+        )
+        await writer.open()
+        writer.write(packets[0])
+        await writer.drain()
+        writer.mark_discontinuity()
+        writer.write(b"".join(packets[1:]))
+        writer.close()
+        self.assertEqual(await writer.wait(), 0)
+        return split_packets((self.output_dir / "out.ts").read_bytes())
+
+    async def test_payload_only_packet_gets_a_marker_packet(self) -> None:
+        packets = [ts_packet(VIDEO_PID, 3), ts_packet(VIDEO_PID, 9), ts_packet(VIDEO_PID, 10)]
+        output = await self.written(packets)
+        self.assertEqual(len(output), 4)
+        marker = output[1]
+        self.assertEqual(((marker[1] & 0x1F) << 8) | marker[2], VIDEO_PID)
+        self.assertEqual(marker[3] & 0x30, 0x20)  # adaptation field only
+        self.assertEqual(marker[4], 183)
+        self.assertTrue(marker[5] & 0x80)
+        # The marker repeats the last counter; the payload continues from it.
+        self.assertEqual([packet[3] & 0x0F for packet in output], [3, 3, 4, 5])
+        self.assertEqual(output[2][4:], packets[1][4:])
+
+    async def test_marker_counter_without_continuity_fixing(self) -> None:
+        packets = [ts_packet(VIDEO_PID, 3), ts_packet(VIDEO_PID, 9)]
+        output = await self.written(packets, fix_continuity=False)
+        self.assertEqual([packet[3] & 0x0F for packet in output], [3, 8, 9])
+
+    async def test_existing_adaptation_field_is_flagged_in_place(self) -> None:
+        packets = [ts_packet(VIDEO_PID, 3), ts_packet(VIDEO_PID, 4, adaptation=b"\x00")]
+        output = await self.written(packets)
+        self.assertEqual(len(output), 2)
+        self.assertTrue(output[1][5] & 0x80)
+
+
+class ResyncTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.writer = chzzk_record.TSPassthroughWriter(
+            self.output_dir / "out.ts", "tstest", resend_tables=False, fix_continuity=False
+        )
+        await self.writer.open()
+
+    async def output(self) -> list:
+        self.writer.close()
+        self.assertEqual(await self.writer.wait(), 0)
+        return split_packets((self.output_dir / "out.ts").read_bytes())
+
+    async def test_reconnect_drops_the_cut_off_packet(self) -> None:
+        old = [ts_packet(VIDEO_PID, counter, adaptation=b"\x00") for counter in range(3)]
+        self.writer.write(b"".join(old) + ts_packet(VIDEO_PID, 3)[:100])
+        await self.writer.drain()
+        self.writer.mark_discontinuity()
+        new = [ts_packet(VIDEO_PID, counter % 16, adaptation=b"\x00") for counter in range(40)]
+        self.writer.write(b"".join(new))
+        await self.writer.drain()
+
+        output = await self.output()
+        self.assertEqual(len(output), 43)
+        self.assertTrue(all(packet[0] == chzzk_record.TS_SYNC_BYTE for packet in output))
+        self.assertEqual(output[:3], old)
+        self.assertTrue(output[3][5] & 0x80)
+        self.assertEqual(output[4:], new[1:])
+
+    async def test_garbage_between_packets_is_skipped(self) -> None:
+        packets = [ts_packet(VIDEO_PID, counter) for counter in range(6)]
+        self.writer.write(b"".join(packets[:3]) + b"\x00" * 50 + b"".join(packets[3:]))
+        await self.writer.drain()
+        self.assertEqual(await self.output(), packets)
+
+
+if __name__ == "__main__":
+    unittest.main()
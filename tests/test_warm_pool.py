@@ -0,0 +1,130 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chzzk_record
+
+FFMPEG = os.environ.get("FFMPEG") or shutil.which("ffmpeg")
+
+
+def sample_stream(ffmpeg: str, seconds: int = 2) -> bytes:
+    return subprocess.run(
+        [
+            ffmpeg,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=duration={seconds}:size=160x120:rate=30",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=duration={seconds}",
+            "-c:v",
+            "libx264",
+            "-c:a",
+            "aac",
+            "-f",
+            "matroska",
+            "pipe:1",
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+
+
+def channel_config(output_dir: Path, **settings) -> chzzk_record.ChannelRecordingConfig:
+    channel = {"id": "warmtest", "name": "warm", "output_dir": str(output_dir)}
+    return chzzk_record.ChannelRecordingConfig.from_settings(
+        channel, chzzk_record.parse_settings({"output_format": "mkv", **settings})
+    )
+
+
+@unittest.skipUnless(FFMPEG, "ffmpeg is not installed")
+class WarmFfmpegHandoffTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        probe_cache = chzzk_record.EncoderProbeCache(self.output_dir / "probe_cache.json")
+        patcher = mock.patch.object(chzzk_record, "encoder_probe_cache", probe_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = chzzk_record.WarmProcessPool()
+        self.pool.settings = chzzk_record.normalize_warm_pool_settings(
+            {"enable": True, "max_ffmpeg": 1, "streamlink_spares": 0}
+        )
+        self.addAsyncCleanup(self.pool.close)
+
+    async def test_adopted_process_writes_the_recording(self) -> None:
+        config = channel_config(self.output_dir)
+        await self.pool.refresh({"warmtest": config}, Path(FFMPEG), 0)
+        spawned = self.pool._ffmpeg["warmtest"].process
+        # ffmpeg waits on its input before it opens the output.
+        self.assertEqual(list(self.output_dir.glob(".warm-*")), [])
+
+        recording_format, hevc, av1 = await chzzk_record.planned_warm_ffmpeg(
+            config, Path(FFMPEG)
+        )
+        key = chzzk_record.warm_ffmpeg_key(recording_format, self.output_dir, hevc, av1)
+        warm = await self.pool.take_ffmpeg("warmtest", key)
+        self.assertIsNotNone(warm)
+        self.assertIs(warm.process, spawned)
+
+        output_path = self.output_dir / "recording.mkv.part"
+        bind_task = asyncio.create_task(
+            chzzk_record.bind_warm_output(warm.process, warm.placeholder_path, output_path)
+        )
+        warm.process.stdin.write(sample_stream(FFMPEG))
+        await warm.process.stdin.drain()
+        warm.process.stdin.close()
+        stderr_task = asyncio.create_task(warm.process.stderr.read())
+        self.assertEqual(await asyncio.wait_for(warm.process.wait(), 30), 0)
+        await stderr_task
+        await asyncio.wait_for(bind_task, 5)
+
+        self.assertGreater(output_path.stat().st_size, 0)
+        self.assertFalse(warm.placeholder_path.exists())
+        duration = await chzzk_record.read_media_duration(Path(FFMPEG), output_path)
+        self.assertGreater(duration, 1.0)
+
+    async def test_copy_recording_does_not_adopt_a_transcoding_ffmpeg(self) -> None:
+        config = channel_config(
+            self.output_dir, hevc_settings={"enable": True, "encoder": "libx265"}
+        )
+        await self.pool.refresh({"warmtest": config}, Path(FFMPEG), 0)
+        recording_format, _, _ = await chzzk_record.planned_warm_ffmpeg(
+            config, Path(FFMPEG)
+        )
+        copy_settings = chzzk_record.normalize_hevc_settings(None)
+        key = chzzk_record.warm_ffmpeg_key(
+            recording_format,
+            self.output_dir,
+            copy_settings,
+            chzzk_record.normalize_av1_settings(None),
+        )
+        self.assertIsNone(await self.pool.take_ffmpeg("warmtest", key))
+
+    async def test_multi_output_channels_are_not_warmed(self) -> None:
+        config = channel_config(self.output_dir, multi_output={"enable": True})
+        await self.pool.refresh({"warmtest": config}, Path(FFMPEG), 0)
+        self.assertNotIn("warmtest", self.pool._ffmpeg)
+
+    async def test_passthrough_and_direct_channels_are_not_warmed(self) -> None:
+        for settings in (
+            {"output_format": "ts", "ts_passthrough": {"enable": True}},
+            {"pipe_mode": "direct"},
+        ):
+            with self.subTest(**settings):
+                config = channel_config(self.output_dir, **settings)
+                self.assertIsNone(await chzzk_record.planned_warm_ffmpeg(config, Path(FFMPEG)))
+
+
+if __name__ == "__main__":
+    unittest.main()